@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+import asyncio
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from lidar_capture import scan_to_arrays
+from lidar_stream import Revolution, FailureBackoff
+
+VERSION = "1.0"
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+
+class AsyncLidar:
+    """Front-end asyncio para ydlidar.CYdLidar
+
+    Todas as chamadas ao dispositivo rodam em uma única thread dedicada
+    (o binding libera o GIL enquanto o driver bloqueia), de modo que um
+    event loop atende vários sensores sem uma thread por chamada.
+
+    Uso:
+        async with AsyncLidar(lidar) as sensor:
+            async for rev in sensor.scans():
+                ...
+    """
+
+    def __init__(self, lidar=None, queue_size=8, scan_factory=None):
+        if lidar is None:
+            import ydlidar  # type: ignore
+            lidar = ydlidar.CYdLidar()
+        self.lidar = lidar
+        self.queue_size = queue_size
+        self._scan_factory = scan_factory
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="AsyncLidar")
+        self._stop = threading.Event()
+        self._reader = None
+
+        # Contadores
+        self.revolutions = 0
+        self.failures = 0
+
+    def setlidaropt(self, optname, value):
+        """Repassa a opção ao CYdLidar (não bloqueia)"""
+        return self.lidar.setlidaropt(optname, value)
+
+    async def _call(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def initialize(self):
+        return await self._call(self.lidar.initialize)
+
+    async def turn_on(self):
+        return await self._call(self.lidar.turnOn)
+
+    async def turn_off(self):
+        await self._stop_reader()
+        return await self._call(self.lidar.turnOff)
+
+    async def disconnecting(self):
+        await self._stop_reader()
+        return await self._call(self.lidar.disconnecting)
+
+    async def close(self):
+        """Desliga, desconecta e encerra a thread dedicada"""
+        try:
+            await self.turn_off()
+            await self.disconnecting()
+        finally:
+            self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        if not await self.initialize():
+            raise ConnectionError("Falha ao inicializar LiDAR - Verifique conexão e porta")
+        if not await self.turn_on():
+            await self.disconnecting()
+            raise RuntimeError("Falha ao iniciar scan - LiDAR pode estar ocupado")
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        return False
+
+    # ------------------------------------------------------------------
+    # Leitura
+    # ------------------------------------------------------------------
+    def _new_scan(self):
+        if self._scan_factory is not None:
+            return self._scan_factory()
+        import ydlidar  # type: ignore
+        return ydlidar.LaserScan()
+
+    def _read_loop(self, loop, queue, credits):
+        """Roda na thread dedicada; entrega revoluções ao loop com call_soon_threadsafe"""
+        scan = self._new_scan()
+        backoff = FailureBackoff()
+        end = _END
+        try:
+            while not self._stop.is_set():
+                # Backpressure: só lê quando o consumidor liberou espaço na fila
+                if not credits.acquire(timeout=0.1):
+                    continue
+                if not self.lidar.doProcessSimple(scan):
+                    self.failures += 1
+                    credits.release()
+                    self._stop.wait(backoff.failure("Falha na leitura do LiDAR"))
+                    continue
+                backoff.success()
+                angle, distance, intensity = scan_to_arrays(scan)
+                rev = Revolution(int(getattr(scan, 'stamp', 0)), angle.copy(), distance.copy(), intensity.copy())
+                self.revolutions += 1
+                loop.call_soon_threadsafe(queue.put_nowait, rev)
+        except Exception as e:
+            logger.error(f"Erro na leitura do LiDAR: {e}")
+            end = e
+        finally:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, end)
+            except RuntimeError:
+                pass  # loop já encerrado
+
+    async def scans(self):
+        """Iterador assíncrono de revoluções (Revolution com arrays NumPy)"""
+        if self._reader is not None:
+            raise RuntimeError("Já existe um iterador de scans ativo")
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        credits = threading.Semaphore(self.queue_size)
+        self._stop.clear()
+        self._reader = loop.run_in_executor(self._executor, self._read_loop, loop, queue, credits)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                credits.release()
+                yield item
+        finally:
+            await self._stop_reader()
+
+    async def _stop_reader(self):
+        reader, self._reader = self._reader, None
+        if reader is None:
+            return
+        self._stop.set()
+        try:
+            await reader
+        except Exception as e:
+            logger.error(f"Erro ao encerrar leitura: {e}")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+import numpy as np
+
+VERSION = "1.0"
+
+# Faixa de distâncias aceitas (m) - ajustar para o tamanho do ambiente
+RANGE_MIN = 0.0
+RANGE_MAX = 50.0
+
+
+def scan_to_arrays(scan):
+    """Retorna (angulo, distancia, intensidade) de uma revolução como arrays float32
+
+    Usa o export NumPy do SDK (LaserScan.points_array) quando disponível;
+    scans simulados com listas de pontos caem no caminho ponto a ponto.
+    """
+    if hasattr(scan, 'points_array'):
+        points = scan.points_array()
+        return points['angle'], points['range'], points['intensity']
+
+    n = len(scan.points)
+    angle = np.fromiter((p.angle for p in scan.points), dtype=np.float32, count=n)
+    distance = np.fromiter((p.range for p in scan.points), dtype=np.float32, count=n)
+    intensity = np.fromiter((getattr(p, 'intensity', 0.0) for p in scan.points), dtype=np.float32, count=n)
+    return angle, distance, intensity
+
+
+class PolarConverter:
+    """Converte revoluções inteiras de polar para cartesiano em buffers float32 pré-alocados
+
+    Os ângulos do SDK já estão em radianos. As colunas retornadas por
+    convert() são views dos buffers internos e só valem até a próxima
+    chamada; use copy=True para guardá-las.
+    """
+
+    def __init__(self, capacity=4096, range_min=RANGE_MIN, range_max=RANGE_MAX):
+        self.range_min = range_min
+        self.range_max = range_max
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        """(Re)aloca os buffers de trabalho"""
+        self.capacity = capacity
+        self._mask = np.empty(capacity, dtype=bool)
+        self._mask_max = np.empty(capacity, dtype=bool)
+        self._angle = np.empty(capacity, dtype=np.float32)
+        self._range = np.empty(capacity, dtype=np.float32)
+        self._intensity = np.empty(capacity, dtype=np.float32)
+        self._x = np.empty(capacity, dtype=np.float32)
+        self._y = np.empty(capacity, dtype=np.float32)
+        self._z = np.empty(capacity, dtype=np.float32)
+
+    def convert(self, angle, distance, intensity=None, altura=None, copy=False):
+        """Converte uma revolução aplicando o filtro de distância como máscara
+
+        Retorna um dict com as colunas 'angulo', 'distancia', 'intensidade',
+        'x', 'y' e, se altura for informada, 'altura' e 'z'.
+        """
+        n = len(distance)
+        if n > self.capacity:
+            self._allocate(max(n, 2 * self.capacity))
+
+        mask = self._mask[:n]
+        np.greater_equal(distance, self.range_min, out=mask)
+        np.less_equal(distance, self.range_max, out=self._mask_max[:n])
+        np.logical_and(mask, self._mask_max[:n], out=mask)
+        k = int(np.count_nonzero(mask))
+
+        a = np.compress(mask, angle, out=self._angle[:k])
+        r = np.compress(mask, distance, out=self._range[:k])
+        if intensity is not None:
+            i = np.compress(mask, intensity, out=self._intensity[:k])
+        else:
+            i = self._intensity[:k]
+            i.fill(0.0)
+
+        x = np.cos(a, out=self._x[:k])
+        np.multiply(x, r, out=x)
+        y = np.sin(a, out=self._y[:k])
+        np.multiply(y, r, out=y)
+
+        colunas = {'angulo': a, 'distancia': r, 'intensidade': i, 'x': x, 'y': y}
+        if altura is not None:
+            z = self._z[:k]
+            z.fill(altura)
+            colunas['altura'] = z
+            colunas['z'] = z
+
+        if copy:
+            colunas = {nome: valores.copy() for nome, valores in colunas.items()}
+        return colunas
+
+    def convert_scan(self, scan, altura=None, copy=False):
+        """Converte um ydlidar.LaserScan (ou scan simulado) de uma só vez"""
+        angle, distance, intensity = scan_to_arrays(scan)
+        return self.convert(angle, distance, intensity, altura=altura, copy=copy)
+
+
+def concat_revolutions(revolucoes):
+    """Concatena as colunas de várias revoluções; retorna {} se não houver pontos"""
+    revolucoes = [rev for rev in revolucoes if len(rev['x']) > 0]
+    if not revolucoes:
+        return {}
+    return {nome: np.concatenate([rev[nome] for rev in revolucoes]) for nome in revolucoes[0]}
+
+
+def count_points(colunas):
+    """Número de pontos em um dict de colunas"""
+    return len(colunas['x']) if colunas else 0
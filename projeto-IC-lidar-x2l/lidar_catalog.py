@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""Catálogo SQLite das gravações (CSV e .x2lrec) com resumos pré-calculados
+
+Cada arquivo sob a raiz (data/ por padrão) vira uma linha com tamanho,
+mtime, número de pontos e de revoluções, caixa envolvente, distância
+mínima/máxima/média, histogramas de distância e de altura, configurações
+da captura (cabeçalho do .x2lrec), as estatísticas combináveis de
+lidar_stats e a lista de camadas com pontos por camada. update() só relê arquivos novos ou com (tamanho, mtime) diferente
+e remove os que sumiram; listar, buscar e resumir centenas de sessões não
+abre nenhuma gravação.
+
+O banco fica em <raiz>/.x2l-catalog.sqlite e guarda caminhos relativos à
+raiz. numpy e os leitores de gravação só são importados quando algum
+arquivo precisa ser (re)indexado.
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import logging
+from collections import namedtuple
+
+VERSION = "1.0"
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+CATALOG_NAME = ".x2l-catalog.sqlite"
+CATALOG_FORMAT = 2  # PRAGMA user_version; outro valor reconstrói o catálogo
+EXTENSIONS = (".csv", ".x2lrec")
+SKIP_DIRS = (".x2l-cache",)
+
+# Histogramas: distância em faixas de 0.25 m até 10 m (a última inclui o
+# resto) e altura em HEIGHT_BINS faixas entre a menor e a maior altura
+RANGE_BIN_WIDTH = 0.25
+RANGE_HIST_MAX = 10.0
+HEIGHT_BINS = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    path         TEXT PRIMARY KEY,
+    format       TEXT NOT NULL,
+    size         INTEGER NOT NULL,
+    mtime_ns     INTEGER NOT NULL,
+    points       INTEGER NOT NULL,
+    returns      INTEGER NOT NULL,
+    revolutions  INTEGER,
+    x_min REAL, x_max REAL, y_min REAL, y_max REAL, z_min REAL, z_max REAL,
+    dist_min REAL, dist_max REAL, dist_mean REAL,
+    range_hist   TEXT,
+    height_hist  TEXT,
+    created      TEXT,
+    settings     TEXT,
+    laser_config TEXT,
+    stats        TEXT,
+    indexed      REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS layers (
+    path   TEXT NOT NULL REFERENCES recordings(path) ON DELETE CASCADE,
+    altura REAL NOT NULL,
+    points INTEGER NOT NULL,
+    PRIMARY KEY (path, altura)
+);
+CREATE INDEX IF NOT EXISTS layers_altura ON layers (altura);
+"""
+
+SUMMARY_FIELDS = ('format', 'size', 'mtime_ns', 'points', 'returns', 'revolutions',
+                  'x_min', 'x_max', 'y_min', 'y_max', 'z_min', 'z_max',
+                  'dist_min', 'dist_max', 'dist_mean', 'range_hist', 'height_hist',
+                  'created', 'settings', 'laser_config', 'stats')
+
+CatalogEntry = namedtuple('CatalogEntry', ('path',) + SUMMARY_FIELDS + ('indexed', 'layers'))
+
+UpdateResult = namedtuple('UpdateResult', ['added', 'updated', 'removed', 'unchanged', 'failed', 'elapsed'])
+
+
+def _histogram(np, values, edges):
+    counts, _ = np.histogram(values, bins=edges)
+    return json.dumps({'edges': [round(float(e), 6) for e in edges], 'counts': counts.tolist()})
+
+
+def summarize(path):
+    """Resumo de uma gravação (dict com SUMMARY_FIELDS e 'layers': [(altura, pontos)])"""
+    import numpy as np
+    from lidar_recording import RecordingReader, is_recording, read_csv_columns
+    from lidar_pointcloud import LayerIndex
+    from lidar_stats import CaptureStats
+
+    st = os.stat(path)
+    summary = dict.fromkeys(SUMMARY_FIELDS)
+    summary.update(size=st.st_size, mtime_ns=st.st_mtime_ns)
+
+    if is_recording(path):
+        with RecordingReader(path) as reader:
+            colunas = reader.columns(cartesian=True)
+            stats = reader.stats or CaptureStats().update(colunas, revolutions=len(reader))
+            summary.update(format='x2lrec', revolutions=len(reader),
+                           created=reader.header.get('created'),
+                           settings=json.dumps(reader.settings) if reader.settings else None,
+                           laser_config=json.dumps(reader.laser_config) if reader.laser_config else None)
+    else:
+        colunas = read_csv_columns(path)
+        stats = CaptureStats().update(colunas, revolutions=0) if 'distancia' in colunas else None
+        summary['format'] = 'csv'
+    summary['stats'] = stats.to_json() if stats is not None else None
+
+    n = len(next(iter(colunas.values()), ()))
+    distancia = colunas.get('distancia')
+    # Pontos sem retorno (distância 0) ficam na origem: fora da caixa e das estatísticas
+    retorno = distancia > 0 if distancia is not None else np.ones(n, dtype=bool)
+    summary.update(points=n, returns=int(retorno.sum()))
+
+    z = colunas.get('z', colunas.get('altura'))
+    for nome, valores in (('x', colunas.get('x')), ('y', colunas.get('y')), ('z', z)):
+        if valores is not None and summary['returns']:
+            valores = valores[retorno]
+            summary[f'{nome}_min'] = float(valores.min())
+            summary[f'{nome}_max'] = float(valores.max())
+
+    if distancia is not None and summary['returns']:
+        d = distancia[retorno]
+        summary.update(dist_min=float(d.min()), dist_max=float(d.max()), dist_mean=float(d.mean(dtype=np.float64)))
+        edges = np.arange(0.0, RANGE_HIST_MAX + RANGE_BIN_WIDTH / 2, RANGE_BIN_WIDTH)
+        summary['range_hist'] = _histogram(np, np.minimum(d, RANGE_HIST_MAX), edges)
+    if z is not None and summary['z_min'] is not None:
+        z_min, z_max = summary['z_min'], summary['z_max']
+        edges = np.linspace(z_min, z_max if z_max > z_min else z_min + 1e-3, HEIGHT_BINS + 1)
+        summary['height_hist'] = _histogram(np, z[retorno], edges)
+
+    summary['layers'] = []
+    if 'altura' in colunas:
+        camadas = LayerIndex.build(colunas['altura'])
+        summary['layers'] = [(float(h), int(c)) for h, c in zip(camadas.heights, camadas.counts())]
+    return summary
+
+
+class RecordingCatalog:
+    """Catálogo incremental das gravações sob uma raiz"""
+
+    def __init__(self, root=DATA_DIR, path=None):
+        self.root = os.path.abspath(root)
+        self.path = path or os.path.join(self.root, CATALOG_NAME)
+        self._db = sqlite3.connect(self.path)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA foreign_keys = ON")
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != CATALOG_FORMAT:
+            self._db.executescript("DROP TABLE IF EXISTS layers; DROP TABLE IF EXISTS recordings;")
+            self._db.execute(f"PRAGMA user_version = {CATALOG_FORMAT}")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM recordings").fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Indexação
+    # ------------------------------------------------------------------
+    def files(self):
+        """Caminhos relativos de todas as gravações sob a raiz"""
+        found = []
+        for directory, dirs, names in os.walk(self.root):
+            dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+            for name in sorted(names):
+                if name.lower().endswith(EXTENSIONS):
+                    found.append(os.path.relpath(os.path.join(directory, name), self.root))
+        return found
+
+    def index_file(self, rel):
+        """(Re)indexa um arquivo; substitui a linha e as camadas anteriores"""
+        summary = summarize(os.path.join(self.root, rel))
+        layers = summary.pop('layers')
+        with self._db:
+            self._db.execute("DELETE FROM recordings WHERE path = ?", (rel,))
+            self._db.execute(
+                f"INSERT INTO recordings (path, {', '.join(SUMMARY_FIELDS)}, indexed) "
+                f"VALUES (?, {', '.join('?' * len(SUMMARY_FIELDS))}, ?)",
+                (rel, *(summary[k] for k in SUMMARY_FIELDS), time.time()))
+            self._db.executemany("INSERT INTO layers (path, altura, points) VALUES (?, ?, ?)",
+                                 [(rel, h, c) for h, c in layers])
+
+    def update(self):
+        """Sincroniza o catálogo com o disco; só lê arquivos novos ou alterados"""
+        t0 = time.perf_counter()
+        known = {row['path']: (row['size'], row['mtime_ns'])
+                 for row in self._db.execute("SELECT path, size, mtime_ns FROM recordings")}
+        added = updated = unchanged = failed = 0
+        present = set()
+        for rel in self.files():
+            present.add(rel)
+            try:
+                st = os.stat(os.path.join(self.root, rel))
+            except OSError:
+                continue
+            if known.get(rel) == (st.st_size, st.st_mtime_ns):
+                unchanged += 1
+                continue
+            try:
+                self.index_file(rel)
+            except (OSError, ValueError) as e:
+                logger.error(f"Erro ao indexar {rel}: {e}")
+                failed += 1
+                continue
+            if rel in known:
+                updated += 1
+            else:
+                added += 1
+
+        removed = [rel for rel in known if rel not in present]
+        with self._db:
+            self._db.executemany("DELETE FROM recordings WHERE path = ?", [(rel,) for rel in removed])
+        return UpdateResult(added, updated, len(removed), unchanged, failed, time.perf_counter() - t0)
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def _entries(self, rows):
+        rows = list(rows)
+        layers = {}
+        if rows:
+            marks = ', '.join('?' * len(rows))
+            for row in self._db.execute(f"SELECT path, altura, points FROM layers WHERE path IN ({marks}) "
+                                        f"ORDER BY altura", [row['path'] for row in rows]):
+                layers.setdefault(row['path'], []).append((row['altura'], row['points']))
+        return [CatalogEntry(**dict(row), layers=layers.get(row['path'], [])) for row in rows]
+
+    def search(self, text=None, altura_min=None, altura_max=None, min_points=None, format=None):
+        """Gravações (mais recentes primeiro) filtradas por nome, camadas, pontos e formato
+
+        Com altura_min/altura_max, só entram gravações com alguma camada na faixa.
+        """
+        where, params = [], []
+        if text:
+            where.append("path LIKE ?")
+            params.append(f"%{text}%")
+        if min_points is not None:
+            where.append("points >= ?")
+            params.append(min_points)
+        if format:
+            where.append("format = ?")
+            params.append(format)
+        if altura_min is not None or altura_max is not None:
+            where.append("path IN (SELECT path FROM layers WHERE altura BETWEEN ? AND ?)")
+            params += [-float('inf') if altura_min is None else altura_min,
+                       float('inf') if altura_max is None else altura_max]
+        sql = "SELECT * FROM recordings"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self._entries(self._db.execute(sql + " ORDER BY mtime_ns DESC, path", params))
+
+    def get(self, rel):
+        entries = self._entries(self._db.execute("SELECT * FROM recordings WHERE path = ?", (rel,)))
+        return entries[0] if entries else None
+
+    def resolve(self, name):
+        """Caminho absoluto de uma gravação por caminho, caminho relativo ou parte única do nome"""
+        if os.path.exists(name):
+            return os.path.abspath(name)
+        if self.get(name) is not None:
+            return os.path.join(self.root, name)
+        matches = [entry.path for entry in self.search(os.path.basename(name))]
+        exact = [rel for rel in matches if os.path.basename(rel) == os.path.basename(name)]
+        if len(exact) == 1 or len(matches) == 1:
+            return os.path.join(self.root, (exact or matches)[0])
+        if len(matches) > 1:
+            logger.warning(f"'{name}' é ambíguo: {', '.join(matches[:5])}")
+        return None
+
+    def totals(self):
+        """Totais do catálogo (arquivos, pontos, bytes, camadas distintas)"""
+        row = self._db.execute("SELECT COUNT(*), COALESCE(SUM(points), 0), COALESCE(SUM(size), 0) "
+                               "FROM recordings").fetchone()
+        alturas = self._db.execute("SELECT COUNT(DISTINCT altura) FROM layers").fetchone()[0]
+        return {'arquivos': row[0], 'pontos': row[1], 'bytes': row[2], 'alturas': alturas}
+
+    def merged_stats(self, entries=None):
+        """CaptureStats combinadas das entradas (padrão: todas) sem abrir nenhuma gravação"""
+        from lidar_stats import CaptureStats
+
+        if entries is None:
+            entries = self.search()
+        return CaptureStats.merged(CaptureStats.from_json(entry.stats) for entry in entries if entry.stats)
+
+
+def describe(entry):
+    """Linhas de resumo de uma gravação do catálogo (sem abrir o arquivo)"""
+    linhas = [f"📁 {entry.path} ({entry.format}, {entry.size} bytes)"]
+    pontos = f"   Pontos: {entry.points} ({entry.returns} com retorno)"
+    if entry.revolutions is not None:
+        pontos += f" em {entry.revolutions} revoluções"
+    linhas.append(pontos)
+    if entry.x_min is not None:
+        linhas.append(f"   X: {entry.x_min:.3f} a {entry.x_max:.3f}m  Y: {entry.y_min:.3f} a {entry.y_max:.3f}m"
+                      + (f"  Z: {entry.z_min:.3f} a {entry.z_max:.3f}m" if entry.z_min is not None else ""))
+    if entry.dist_min is not None:
+        linhas.append(f"   Distância: {entry.dist_min:.3f} a {entry.dist_max:.3f}m (μ={entry.dist_mean:.3f}m)")
+    if entry.layers:
+        linhas.append(f"   Camadas: {len(entry.layers)} ({entry.layers[0][0]:.3f}m a {entry.layers[-1][0]:.3f}m)")
+    if entry.created:
+        linhas.append(f"   Criado: {entry.created}")
+    return linhas
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    raiz = sys.argv[1] if len(sys.argv) > 1 else DATA_DIR
+    with RecordingCatalog(raiz) as catalogo:
+        r = catalogo.update()
+        print(f"Catálogo {catalogo.path}: +{r.added} ~{r.updated} -{r.removed} ={r.unchanged} "
+              f"({r.failed} falhas) em {r.elapsed * 1000:.1f} ms")
+        for entry in catalogo.search(*sys.argv[2:3]):
+            print("\n".join(describe(entry)))
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""Ponto de entrada único das ferramentas do X2L
+
+Uso:
+    python3 lidar_cli.py capture                     # captura contínua (v1.2)
+    python3 lidar_cli.py layers 0.0 0.1 0.02         # coleta por camadas
+    python3 lidar_cli.py view arquivo.x2lrec         # visualizador 2D/3D
+    python3 lidar_cli.py convert a.csv b.csv         # CSV -> .x2lrec
+    python3 lidar_cli.py convert --parquet data/parquet a.csv b.x2lrec   # -> dataset Parquet
+    python3 lidar_cli.py stats arquivo.csv ...       # resumo de CSV/.x2lrec
+    python3 lidar_cli.py replay arquivo.x2lrec ...   # vazão da reprodução
+    python3 lidar_cli.py catalog camadas --altura-min 0.04   # busca no catálogo de data/
+
+No topo só a biblioteca padrão é importada. numpy, pandas, matplotlib e a
+extensão ydlidar são carregados dentro do subcomando que precisa deles, e
+matplotlib apenas em `view`: `--help` e a captura headless no Raspberry Pi
+não pagam pela visualização. HEADLESS_FORBIDDEN e IMPORT_BUDGET_MS são
+verificados por tests/testes-desempenho/check_import_budget.py.
+"""
+import os
+import sys
+import argparse
+
+VERSION = "1.0"
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+CAPTURE_SCRIPT = "teste_lidar_x2l_v1.2.py"
+LAYERS_SCRIPT = "teste_lidar_x2l_camadas_v1.0.py"
+VIEWER_SCRIPT = "teste_visualizador_2d_3d_pointcloud_v1.2.py"
+
+# Tempo máximo de importação deste módulo (python -X importtime, ms); só a
+# biblioteca padrão (argparse) cabe aqui, numpy sozinho já passa de 300 ms
+IMPORT_BUDGET_MS = 100.0
+
+# Módulos que nunca podem ser carregados por cada subcomando
+HEADLESS_FORBIDDEN = {
+    None: ("numpy", "pandas", "matplotlib", "ydlidar"),  # --help e parsing
+    "capture": ("pandas", "matplotlib"),
+    "layers": ("pandas", "matplotlib"),
+    "convert": ("pandas", "matplotlib", "ydlidar"),
+    "stats": ("pandas", "matplotlib", "ydlidar"),
+    "replay": ("pandas", "matplotlib", "ydlidar"),
+    "catalog": ("pandas", "matplotlib", "ydlidar"),
+}
+
+
+def load_script(filename):
+    """Carrega um script do projeto (nome com '.' ou '-') como módulo"""
+    import importlib.util
+
+    name = os.path.splitext(filename)[0].replace('.', '_').replace('-', '_')
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# ----------------------------------------------------------------------
+# Subcomandos
+# ----------------------------------------------------------------------
+def use_parquet(script, root):
+    """Faz o script gravar uma sessão no dataset Parquet em root"""
+    if root:
+        script.FORMATO_GRAVACAO = "parquet"
+        script.PARQUET_DIR = root
+
+
+def cmd_capture(args):
+    script = load_script(CAPTURE_SCRIPT)
+    if args.metrics_port is not None:
+        script.METRICS_PORT = args.metrics_port
+    if args.metrics_json is not None:
+        script.METRICS_JSON_DIR = args.metrics_json
+    use_parquet(script, args.parquet)
+    return 0 if script.test_lidar_x2l() else 1
+
+
+def cmd_layers(args):
+    script = load_script(LAYERS_SCRIPT)
+    use_parquet(script, args.parquet)
+    return 0 if script.test_lidar_camadas(args.altura_inicial, args.altura_final, args.intervalo) else 1
+
+
+def cmd_view(args):
+    arquivo = args.arquivo
+    if not os.path.exists(arquivo):
+        # Nome parcial: procura no catálogo de data/
+        from lidar_catalog import RecordingCatalog
+        with RecordingCatalog() as catalogo:
+            catalogo.update()
+            arquivo = catalogo.resolve(arquivo) or arquivo
+    script = load_script(VIEWER_SCRIPT)
+    script.load_and_view(arquivo)
+    return 0
+
+
+def cmd_convert(args):
+    from lidar_recording import RecordingReader, convert_csv, recording_size
+
+    if args.output and (len(args.arquivos) > 1 or args.parquet):
+        print("❌ Erro: --output só pode ser usado com um CSV e sem --parquet")
+        return 2
+    status = 0
+    for arquivo in args.arquivos:
+        try:
+            if args.parquet:
+                from lidar_parquet import convert_to_parquet
+                destino = convert_to_parquet(arquivo, args.parquet, angle_units=args.angle_units)
+                print(f"✅ {arquivo} -> {destino} ({os.path.getsize(arquivo)} -> {recording_size(destino)} bytes)")
+                continue
+            destino = convert_csv(arquivo, args.output, angle_units=args.angle_units)
+            with RecordingReader(destino) as reader:
+                print(f"✅ {arquivo} -> {destino} ({len(reader)} revoluções, {reader.num_points} pontos, "
+                      f"{os.path.getsize(arquivo)} -> {os.path.getsize(destino)} bytes)")
+        except (ImportError, OSError, ValueError) as e:
+            print(f"❌ Erro ao converter {arquivo}: {e}")
+            status = 1
+    return status
+
+
+def file_stats(stats):
+    """Resumo de CaptureStats: pontos, revoluções, distâncias e camadas"""
+    resumo = {'pontos': stats.points, 'revolucoes': stats.revolutions or None, 'validos': stats.returns}
+    distancia = stats.fields['distancia']
+    if stats.returns:
+        resumo['distancia'] = (float(distancia.min[0]), stats.sketch.quantile(0.5), float(distancia.max[0]))
+    if stats.layers:
+        resumo['camadas'] = {altura: int(m.count[0]) for altura, m in sorted(stats.layers.items())}
+    return resumo
+
+
+def print_stats(titulo, resumo, camadas_detalhadas=False):
+    print(titulo)
+    revolucoes = resumo['revolucoes']
+    print(f"   Pontos: {resumo['pontos']}" + (f" em {revolucoes} revoluções" if revolucoes is not None else ""))
+    if 'validos' in resumo:
+        print(f"   Com retorno: {resumo['validos']}")
+    if 'distancia' in resumo:
+        lo, med, hi = resumo['distancia']
+        print(f"   Distância: min={lo:.3f}m mediana≈{med:.3f}m max={hi:.3f}m")
+    if 'camadas' in resumo:
+        camadas = resumo['camadas']
+        print(f"   Camadas: {len(camadas)} ({min(camadas):.3f}m a {max(camadas):.3f}m)")
+        if camadas_detalhadas:
+            for altura, pontos in camadas.items():
+                print(f"     {altura:.3f}m: {pontos} pontos")
+
+
+def cmd_stats(args):
+    # Estatísticas gravadas no .x2lrec ou uma passada sobre o arquivo; o total
+    # de vários arquivos é a combinação delas, sem reler nada
+    from lidar_stats import CaptureStats, recording_stats
+
+    status = 0
+    todas = []
+    for arquivo in args.arquivos:
+        try:
+            stats = recording_stats(arquivo)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ Erro ao ler {arquivo}: {e}")
+            status = 1
+            continue
+        todas.append(stats)
+        print_stats(f"📁 {arquivo}", file_stats(stats), args.camadas)
+    if len(todas) > 1:
+        print_stats(f"Σ Total ({len(todas)} arquivos)", file_stats(CaptureStats.merged(todas)), args.camadas)
+    return status
+
+
+def cmd_replay(args):
+    import logging
+    from lidar_replay import replay_throughput
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    status = 0
+    for arquivo in args.arquivos:
+        result = replay_throughput(arquivo)
+        if result is None:
+            status = 1
+            continue
+        revolutions, points, elapsed = result
+        print(f"{arquivo}: {revolutions} revoluções, {points} pontos em {elapsed:.3f}s "
+              f"({revolutions / elapsed:.0f} rev/s)")
+    return status
+
+
+def cmd_catalog(args):
+    from lidar_catalog import RecordingCatalog, describe, DATA_DIR
+
+    with RecordingCatalog(args.root or DATA_DIR) as catalogo:
+        r = catalogo.update()
+        print(f"📚 {catalogo.path}: +{r.added} ~{r.updated} -{r.removed} ({r.elapsed * 1000:.1f} ms)")
+        entradas = catalogo.search(args.busca, args.altura_min, args.altura_max, args.min_pontos)
+        for entry in entradas:
+            print("\n".join(describe(entry)))
+        if args.estatisticas:
+            stats = catalogo.merged_stats(entradas)
+            if stats is not None:
+                print(f"Σ Estatísticas combinadas ({len(entradas)} gravações)")
+                print("\n".join(f"   {linha}" for linha in stats.describe()))
+        totais = catalogo.totals()
+        print(f"Total: {totais['arquivos']} gravações, {totais['pontos']} pontos, {totais['bytes']} bytes")
+    return 1 if r.failed else 0
+
+
+# ----------------------------------------------------------------------
+# Linha de comando
+# ----------------------------------------------------------------------
+def build_parser():
+    parser = argparse.ArgumentParser(prog="lidar_cli.py", description="Ferramentas do LiDAR X2L")
+    parser.add_argument("--version", action="version", version=f"%(prog)s {VERSION}")
+    sub = parser.add_subparsers(dest="comando", metavar="comando")
+    sub.required = True
+
+    p = sub.add_parser("capture", help="captura contínua gravando .x2lrec (sem interface gráfica)")
+    p.add_argument("--metrics-port", type=int, help="serve métricas Prometheus nesta porta (padrão: desligado)")
+    p.add_argument("--metrics-json", metavar="DIR", help="grava snapshots JSON das métricas em DIR (padrão: desligado)")
+    p.add_argument("--parquet", metavar="DIR", help="grava uma sessão no dataset Parquet em DIR")
+    p.set_defaults(func=cmd_capture)
+
+    p = sub.add_parser("layers", help="coleta por camadas (parâmetros ausentes são perguntados)")
+    p.add_argument("altura_inicial", type=float, nargs="?", help="altura inicial (m)")
+    p.add_argument("altura_final", type=float, nargs="?", help="altura final (m)")
+    p.add_argument("intervalo", type=float, nargs="?", help="intervalo entre camadas (m)")
+    p.add_argument("--parquet", metavar="DIR", help="grava uma sessão no dataset Parquet em DIR")
+    p.set_defaults(func=cmd_layers)
+
+    p = sub.add_parser("view", help="visualizador 2D/3D de CSV ou .x2lrec")
+    p.add_argument("arquivo")
+    p.set_defaults(func=cmd_view)
+
+    p = sub.add_parser("convert", help="converte CSVs de captura para .x2lrec ou gravações para Parquet")
+    p.add_argument("arquivos", nargs="+")
+    p.add_argument("-o", "--output", help="arquivo de saída (apenas com um CSV)")
+    p.add_argument("--parquet", metavar="DIR", help="converte CSVs/.x2lrec em sessões do dataset Parquet em DIR")
+    p.add_argument("--angle-units", choices=("rad", "deg"),
+                   help="unidade da coluna angulo dos CSVs (padrão: detecta; simulados usam graus)")
+    p.set_defaults(func=cmd_convert)
+
+    p = sub.add_parser("stats", help="resumo de CSVs e gravações")
+    p.add_argument("arquivos", nargs="+")
+    p.add_argument("--camadas", action="store_true", help="lista os pontos por camada")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("replay", help="reproduz gravações e mede a vazão de leitura")
+    p.add_argument("arquivos", nargs="+")
+    p.set_defaults(func=cmd_replay)
+
+    p = sub.add_parser("catalog", help="atualiza e consulta o catálogo de gravações")
+    p.add_argument("busca", nargs="?", help="parte do caminho/nome")
+    p.add_argument("--root", help="diretório das gravações (padrão: data/)")
+    p.add_argument("--altura-min", type=float, help="só gravações com camada >= altura (m)")
+    p.add_argument("--altura-max", type=float, help="só gravações com camada <= altura (m)")
+    p.add_argument("--min-pontos", type=int)
+    p.add_argument("--estatisticas", action="store_true", help="combina as estatísticas das gravações encontradas")
+    p.set_defaults(func=cmd_catalog)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Os scripts usam caminhos relativos (data/...) e importam módulos irmãos
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
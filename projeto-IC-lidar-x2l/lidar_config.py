@@ -2,14 +2,32 @@
 import platform
 import glob
 import os
+import sys
 
 VERSION = "1.0"
 
-try:
-    import ydlidar # type: ignore
-except ImportError:
-    print("Aviso: ydlidar não instalado. Usando valores padrão.")
-    ydlidar = None
+_ydlidar = False  # não carregado ainda
+
+
+def load_ydlidar():
+    """Importa a extensão ydlidar na primeira chamada; None se não instalada
+    
+    A importação é adiada para que ferramentas que não falam com o sensor
+    (conversão, estatísticas, visualização) não paguem o custo de carregá-la.
+    """
+    global _ydlidar
+    if _ydlidar is False:
+        try:
+            import ydlidar # type: ignore
+            _ydlidar = ydlidar
+        except ImportError:
+            print("Aviso: ydlidar não instalado. Usando valores padrão.")
+            _ydlidar = None
+    return _ydlidar
+
+def loaded_ydlidar():
+    """Módulo ydlidar se alguém já o importou; nunca importa a extensão"""
+    return _ydlidar or sys.modules.get('ydlidar')
 
 class LidarConfig:
     """Configuração centralizada para LiDAR X2L"""
@@ -43,8 +61,14 @@ class LidarConfig:
     }
     
     @classmethod
-    def get_lidar_constants(cls):
-        """Retorna constantes do ydlidar ou valores padrão"""
+    def get_lidar_constants(cls, load=True):
+        """Retorna constantes do ydlidar ou valores padrão
+        
+        Com load=False a extensão não é importada: as constantes reais só são
+        usadas se ydlidar já estiver carregado (quem passou as chaves a
+        setlidaropt usou as mesmas constantes).
+        """
+        ydlidar = load_ydlidar() if load else loaded_ydlidar()
         if ydlidar:
             return {
                 "lidar_type": ydlidar.TYPE_TRIANGLE,
@@ -72,18 +96,33 @@ class LidarConfig:
             }
     
     @classmethod
-    def detect_port(cls):
-        """Detecta automaticamente a porta do LiDAR"""
+    def detect_port(cls, probe=True):
+        """Detecta automaticamente a porta do LiDAR
+        
+        Com probe=True as portas candidatas são sondadas em paralelo no nível
+        do protocolo (lidar_probe), usando o cache de dispositivos em disco;
+        sem resposta (ou sem pyserial) usa a primeira porta existente.
+        """
         system = platform.system()
         config = cls.SYSTEM_CONFIGS.get(system, cls.SYSTEM_CONFIGS["Linux"])
         
         # Tentar detectar portas disponíveis
-        for pattern in config["port_patterns"]:
-            ports = glob.glob(pattern)
-            for port in ports:
-                if os.path.exists(port):
-                    print(f"Porta detectada: {port}")
-                    return port
+        candidates = [port for pattern in config["port_patterns"]
+                      for port in glob.glob(pattern) if os.path.exists(port)]
+        
+        if probe and candidates:
+            from lidar_probe import find_lidar, serial
+            if serial is not None:
+                result = find_lidar(candidates, baudrates=(config["baudrate"],))
+                if result:
+                    info = f" ({result.model}, série {result.serial}, firmware {result.firmware})" if result.model else ""
+                    print(f"LiDAR detectado: {result.port}{info}")
+                    return result.port
+                print("Aviso: nenhum LiDAR respondeu nas portas candidatas")
+        
+        for port in candidates:
+            print(f"Porta detectada: {port}")
+            return port
         
         # Fallback para porta padrão
         default_port = config["default_port"]
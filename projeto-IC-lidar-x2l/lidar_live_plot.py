@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Desenho incremental em tempo real com matplotlib
+
+PointHistory guarda um histórico limitado de pontos: ao encher, descarta
+um de cada dois pontos antigos e passa a aceitar só um a cada 2^k pontos
+novos, cobrindo a sessão inteira de forma uniforme em memória fixa.
+
+BlitManager mantém artistas persistentes (scatter, linhas, títulos) sobre
+um fundo capturado uma vez: a cada quadro restaura o fundo, redesenha só
+os artistas animados e faz blit. Eixos, ticks e grades só são redesenhados
+quando os limites mudam (redraw). O custo por quadro depende apenas da
+capacidade do histórico, não da duração da varredura.
+"""
+import logging
+
+import numpy as np
+
+VERSION = "1.0"
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 50000
+
+
+class PointHistory:
+    """Histórico limitado e dizimado de linhas (pontos) float32"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, fields=3):
+        self.capacity = capacity
+        self._data = np.empty((capacity, fields), dtype=np.float32)
+        self._size = 0
+        self.stride = 1  # mantém os pontos de índice global múltiplo de stride
+        self.received = 0
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, rows):
+        rows = np.asarray(rows, dtype=np.float32).reshape(-1, self._data.shape[1])
+        kept = rows[(-self.received) % self.stride::self.stride]
+        while self._size + len(kept) > self.capacity:
+            # Cheio: fica com os múltiplos de 2 * stride (um de cada dois)
+            half = self._data[:self._size:2].copy()
+            self._size = len(half)
+            self._data[:self._size] = half
+            self.stride *= 2
+            kept = rows[(-self.received) % self.stride::self.stride]
+        self._data[self._size:self._size + len(kept)] = kept
+        self._size += len(kept)
+        self.received += len(rows)
+
+    def view(self):
+        """Pontos mantidos (view, válida até o próximo extend)"""
+        return self._data[:self._size]
+
+    def clear(self):
+        self._size = 0
+        self.stride = 1
+        self.received = 0
+
+
+class BlitManager:
+    """Redesenha apenas artistas animados sobre um fundo capturado da figura"""
+
+    def __init__(self, canvas, artists=()):
+        self.canvas = canvas
+        self._background = None
+        self._artists = []
+        for artist in artists:
+            self.add_artist(artist)
+        self._cid = canvas.mpl_connect("draw_event", self._on_draw)
+
+    def add_artist(self, artist):
+        artist.set_animated(True)
+        self._artists.append(artist)
+        return artist
+
+    def _on_draw(self, event):
+        self._background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        figure = self.canvas.figure
+        for artist in self._artists:
+            figure.draw_artist(artist)
+
+    def redraw(self):
+        """Redesenho completo (limites mudaram); recaptura o fundo"""
+        self.canvas.draw_idle()
+
+    def update(self):
+        """Desenha um quadro: fundo + artistas animados"""
+        if self._background is None or not getattr(self.canvas, 'supports_blit', False):
+            self.canvas.draw_idle()
+        else:
+            self.canvas.restore_region(self._background)
+            self._draw_animated()
+            self.canvas.blit(self.canvas.figure.bbox)
+        self.canvas.flush_events()
+
+
+def grow_limits(ax, x, y, margin=0.1):
+    """Amplia os limites do eixo para conter os dados; True se mudaram
+
+    A ampliação inclui uma margem proporcional para que o redesenho
+    completo (caro) seja raro enquanto a nuvem cresce.
+    """
+    changed = False
+    for values, get, set_ in ((x, ax.get_xlim, ax.set_xlim), (y, ax.get_ylim, ax.set_ylim)):
+        if values is None or not len(values):
+            continue
+        lo, hi = float(np.nanmin(values)), float(np.nanmax(values))
+        cur_lo, cur_hi = get()
+        if lo < cur_lo or hi > cur_hi:
+            new_lo, new_hi = min(lo, cur_lo), max(hi, cur_hi)
+            pad = (new_hi - new_lo) * margin
+            set_(new_lo - pad if lo < cur_lo else cur_lo, new_hi + pad if hi > cur_hi else cur_hi)
+            changed = True
+    return changed
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""Instrumentação do pipeline de aquisição
+
+Cada estágio (aquisicao, copia, conversao, escrita, ...) registra a sua
+latência em um histograma log-linear no estilo HDR (erro relativo < 7%,
+1 ns a ~100 s, registro O(1)). Contadores (revoluções, pontos, descartes)
+e medidores (profundidade das filas) completam o quadro.
+
+Exportação:
+    MetricsServer   - texto Prometheus em http://127.0.0.1:<porta>/metrics
+                      e o mesmo conteúdo em JSON em /metrics.json
+    JsonSnapshotter - uma linha JSON por intervalo em um arquivo .jsonl
+
+O custo é de dois perf_counter_ns e um incremento sob lock por estágio e
+revolução (alguns microssegundos contra ~170 ms de revolução a 6 Hz).
+"""
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+VERSION = "1.0"
+
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "x2l"
+
+# Sub-buckets por potência de 2 (2^SUB_BITS / 2 por oitava)
+SUB_BITS = 5
+SUB_COUNT = 1 << SUB_BITS
+SUB_HALF = SUB_COUNT >> 1
+MAX_EXPONENT = 33  # ~ 2^(33+5) ns = 275 s
+NUM_BUCKETS = SUB_COUNT + MAX_EXPONENT * SUB_HALF
+
+# Limites (s) dos buckets exportados ao Prometheus
+EXPORT_BOUNDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+EXPORT_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def _bucket_index(value):
+    if value < SUB_COUNT:
+        return max(value, 0)
+    e = value.bit_length() - SUB_BITS
+    if e > MAX_EXPONENT:
+        return NUM_BUCKETS - 1
+    return SUB_COUNT + (e - 1) * SUB_HALF + (value >> e) - SUB_HALF
+
+
+def _bucket_upper(index):
+    """Maior valor (ns) contido no bucket"""
+    if index < SUB_COUNT:
+        return index
+    e, m = divmod(index - SUB_COUNT, SUB_HALF)
+    e += 1
+    return ((m + SUB_HALF + 1) << e) - 1
+
+
+class LatencyHistogram:
+    """Histograma log-linear de latências em nanossegundos"""
+
+    def __init__(self):
+        self._counts = [0] * NUM_BUCKETS
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, ns):
+        i = _bucket_index(int(ns))
+        with self._lock:
+            self._counts[i] += 1
+            self.count += 1
+            self.total += ns
+            if ns > self.max:
+                self.max = ns
+
+    def _copy(self):
+        with self._lock:
+            return list(self._counts), self.count, self.total, self.max
+
+    def percentile(self, q, _state=None):
+        """Valor (ns) abaixo do qual está a fração q das amostras"""
+        counts, count, _, maximum = _state or self._copy()
+        if not count:
+            return 0
+        target = q * count
+        seen = 0
+        for i, c in enumerate(counts):
+            seen += c
+            if c and seen >= target:
+                return min(_bucket_upper(i), maximum)
+        return maximum
+
+    def cumulative(self, bounds_ns, _state=None):
+        """Contagens acumuladas (<= cada limite), como nos buckets do Prometheus"""
+        counts, _, _, _ = _state or self._copy()
+        result = []
+        seen = 0
+        i = 0
+        for bound in bounds_ns:
+            while i < NUM_BUCKETS and _bucket_upper(i) <= bound:
+                seen += counts[i]
+                i += 1
+            result.append(seen)
+        return result
+
+    def summary(self):
+        state = self._copy()
+        _, count, total, maximum = state
+        return {
+            'count': count,
+            'mean_ms': total / count / 1e6 if count else 0.0,
+            'max_ms': maximum / 1e6,
+            **{f'p{q * 100:g}_ms': self.percentile(q, state) / 1e6 for q in EXPORT_QUANTILES},
+        }
+
+
+class PipelineMetrics:
+    """Registro de latências por estágio, contadores e medidores do pipeline"""
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+
+    def histogram(self, stage):
+        hist = self.stages.get(stage)
+        if hist is None:
+            with self._lock:
+                hist = self.stages.setdefault(stage, LatencyHistogram())
+        return hist
+
+    def observe(self, stage, ns):
+        self.histogram(stage).record(ns)
+
+    @contextmanager
+    def stage(self, name):
+        """Cronometra o bloco como uma amostra do estágio"""
+        t0 = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.histogram(name).record(time.perf_counter_ns() - t0)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, fn):
+        """Registra um medidor lido sob demanda (ex.: profundidade de fila)"""
+        self.gauges[name] = fn
+
+    def _read_gauges(self):
+        values = {}
+        for name, fn in list(self.gauges.items()):
+            try:
+                values[name] = float(fn())
+            except Exception as e:
+                logger.error(f"Erro ao ler medidor {name}: {e}")
+        return values
+
+    def snapshot(self, previous=None):
+        """Estado atual com taxas desde o início e desde `previous`
+
+        previous é o snapshot anterior do mesmo consumidor (None = desde o
+        início). Nada é guardado aqui: o servidor HTTP e o JsonSnapshotter
+        medem seus intervalos de forma independente.
+        """
+        now = time.monotonic()
+        with self._lock:
+            counters = dict(self.counters)
+        elapsed = now - self.started
+        last_counters = previous['counters'] if previous else {}
+        interval = elapsed - previous['uptime_s'] if previous else elapsed
+        return {
+            'time': time.time(),
+            'uptime_s': elapsed,
+            'counters': counters,
+            'rates': {name: value / elapsed for name, value in counters.items()} if elapsed else {},
+            'interval_rates': {name: (value - last_counters.get(name, 0)) / interval
+                               for name, value in counters.items()} if interval else {},
+            'gauges': self._read_gauges(),
+            'stages': {name: hist.summary() for name, hist in list(self.stages.items())},
+        }
+
+    def prometheus(self):
+        """Texto no formato de exposição do Prometheus (0.0.4)"""
+        p = METRIC_PREFIX
+        lines = []
+        bounds_ns = [int(b * 1e9) for b in EXPORT_BOUNDS]
+
+        lines.append(f"# HELP {p}_stage_latency_seconds Latência por estágio do pipeline")
+        lines.append(f"# TYPE {p}_stage_latency_seconds histogram")
+        for name, hist in sorted(self.stages.items()):
+            state = hist._copy()
+            for bound, cum in zip(EXPORT_BOUNDS, hist.cumulative(bounds_ns, state)):
+                lines.append(f'{p}_stage_latency_seconds_bucket{{stage="{name}",le="{bound:g}"}} {cum}')
+            lines.append(f'{p}_stage_latency_seconds_bucket{{stage="{name}",le="+Inf"}} {state[1]}')
+            lines.append(f'{p}_stage_latency_seconds_sum{{stage="{name}"}} {state[2] / 1e9:.9f}')
+            lines.append(f'{p}_stage_latency_seconds_count{{stage="{name}"}} {state[1]}')
+
+        lines.append(f"# HELP {p}_stage_latency_quantile_seconds Quantis do histograma HDR por estágio")
+        lines.append(f"# TYPE {p}_stage_latency_quantile_seconds gauge")
+        for name, hist in sorted(self.stages.items()):
+            state = hist._copy()
+            for q in EXPORT_QUANTILES:
+                value = hist.percentile(q, state) / 1e9
+                lines.append(f'{p}_stage_latency_quantile_seconds{{stage="{name}",quantile="{q:g}"}} {value:.9f}')
+
+        with self._lock:
+            counters = dict(self.counters)
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {p}_{name}_total counter")
+            lines.append(f"{p}_{name}_total {value}")
+
+        for name, value in sorted(self._read_gauges().items()):
+            lines.append(f"# TYPE {p}_{name} gauge")
+            lines.append(f"{p}_{name} {value:g}")
+
+        lines.append(f"# TYPE {p}_uptime_seconds gauge")
+        lines.append(f"{p}_uptime_seconds {time.monotonic() - self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Servidor HTTP local com /metrics (Prometheus) e /metrics.json"""
+
+    def __init__(self, metrics, port=9108, host="127.0.0.1"):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = metrics.prometheus().encode('utf-8')
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif self.path == "/metrics.json":
+                    body = json.dumps(metrics.snapshot()).encode('utf-8')
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+        logger.info(f"Métricas em http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class JsonSnapshotter:
+    """Acrescenta um snapshot JSON por linha ao arquivo a cada `interval` segundos"""
+
+    def __init__(self, metrics, path, interval=10.0):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._previous = None
+
+    def start(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="JsonSnapshotter", daemon=True)
+        self._thread.start()
+        return self
+
+    def write(self):
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                snapshot = self.metrics.snapshot(self._previous)
+                f.write(json.dumps(snapshot) + "\n")
+            self._previous = snapshot
+        except OSError as e:
+            logger.error(f"Erro ao gravar métricas em {self.path}: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def stop(self):
+        """Para a thread e grava um último snapshot"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.write()
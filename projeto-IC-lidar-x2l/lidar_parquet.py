@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""Datasets Parquet particionados por sessão e altura de camada
+
+Layout (particionamento hive):
+
+    <raiz>/sessao=20260302_160749/altura=0.04/part-0.parquet
+    <raiz>/sessao=20260302_160749/altura=0.06/part-0.parquet
+    <raiz>/sessao=20251201_164901/altura=__HIVE_DEFAULT_PARTITION__/part-0.parquet  (sem camadas)
+
+Cada arquivo guarda as colunas tipadas de schema() (stamp uint64 em ns, o
+resto float32) em row groups de até row_group_size linhas, com estatísticas
+(min/max) por row group. sessao e altura ficam só no caminho: uma consulta
+por faixa de alturas e de sessões (read_dataset) descarta diretórios inteiros
+sem abri-los, e filtros em stamp/distancia pulam row groups pelas estatísticas.
+O cabeçalho da sessão (LaserConfig, X2L_SETTINGS, ...) vai nos metadados do
+schema de cada arquivo; as estatísticas da captura (lidar_stats), em
+sessao=.../_stats.json (o prefixo '_' fica fora da descoberta do dataset).
+
+Uma gravação Parquet só fica legível quando o arquivo é fechado (rodapé);
+por isso o arquivo de cada camada é fechado assim que a altura muda. Para
+sessões que podem ser interrompidas, .x2lrec continua sendo o formato
+seguro, e convert_to_parquet converte depois.
+"""
+import os
+import re
+import sys
+import json
+import shutil
+import logging
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from lidar_recording import (StreamingRecorder, RecordingReader, decode_blocks, is_recording,
+                             laser_config_to_dict, read_csv_columns, check_cartesian, recording_size,
+                             revolution_breaks)
+
+VERSION = "1.0"
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROW_GROUP_SIZE = 65536  # ~22 s de captura a 3000 pontos/s
+DEFAULT_COMPRESSION = "zstd"
+SESSION_FORMAT = "%Y%m%d_%H%M%S"
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+METADATA_KEY = b"x2l"
+STATS_NAME = "_stats.json"
+
+COLUMNS = ('stamp', 'angulo', 'distancia', 'intensidade', 'x', 'y', 'z')
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow não instalado (pip install pyarrow) - necessário para datasets Parquet")
+
+
+def schema():
+    """Colunas gravadas em cada arquivo"""
+    require_pyarrow()
+    return pa.schema([('stamp', pa.uint64())] + [(name, pa.float32()) for name in COLUMNS[1:]])
+
+
+def partitioning_schema():
+    """Campos do caminho; altura em float64 para comparar exatamente com alturas decimais"""
+    require_pyarrow()
+    return pa.schema([('sessao', pa.string()), ('altura', pa.float64())])
+
+
+def session_id(when=None):
+    """Identificador de sessão ordenável como texto (AAAAMMDD_HHMMSS)"""
+    return (when or datetime.now()).strftime(SESSION_FORMAT)
+
+
+def session_from_name(path):
+    """Sessão a partir do timestamp no nome do arquivo (ou da data de modificação)"""
+    match = re.search(r"(\d{8})[-_](\d{6})", os.path.basename(path))
+    if match:
+        return f"{match.group(1)}_{match.group(2)}"
+    return session_id(datetime.fromtimestamp(os.path.getmtime(path)))
+
+
+def format_altura(altura):
+    """Valor da partição: representação mais curta do float32 gravado (0.04, não 0.0399999)"""
+    if altura is None or np.isnan(altura):
+        return NULL_PARTITION
+    return np.format_float_positional(np.float32(altura), trim='-')
+
+
+class ParquetDatasetWriter:
+    """Grava revoluções de uma sessão em arquivos Parquet por camada
+
+    As linhas da camada atual ficam em memória até completar um row group;
+    quando a altura muda o arquivo da camada é fechado. Tem a interface de
+    RecordingWriter (write, write_columns, write_block, flush, fsync, close).
+    """
+
+    def __init__(self, root, sessao=None, laser_config=None, settings=None, extra=None,
+                 row_group_size=DEFAULT_ROW_GROUP_SIZE, compression=DEFAULT_COMPRESSION):
+        require_pyarrow()
+        self.root = root
+        self.sessao = sessao or session_id()
+        self.path = os.path.join(root, f"sessao={self.sessao}")
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.revolutions = 0
+        self.points = 0
+        self.files = []
+
+        header = {
+            'format': 'x2l-parquet',
+            'version': VERSION,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'laser_config': laser_config_to_dict(laser_config),
+            'settings': dict(settings) if settings else None,
+        }
+        if extra:
+            header.update(extra)
+        self.schema = schema().with_metadata({METADATA_KEY: json.dumps(header, ensure_ascii=False)})
+
+        self._altura = None
+        self._writer = None
+        self._pending = []
+        self._pending_rows = 0
+
+    def _open_layer(self, altura):
+        directory = os.path.join(self.path, f"altura={format_altura(altura)}")
+        os.makedirs(directory, exist_ok=True)
+        # Camada revisitada na mesma sessão: novo arquivo ao lado do anterior
+        part = 0
+        while os.path.exists(os.path.join(directory, f"part-{part}.parquet")):
+            part += 1
+        path = os.path.join(directory, f"part-{part}.parquet")
+        self._writer = pq.ParquetWriter(path, self.schema, compression=self.compression, write_statistics=True)
+        self._altura = altura
+        self.files.append(path)
+
+    def _write_pending(self):
+        if not self._pending:
+            return
+        columns = [np.concatenate([chunk[i] for chunk in self._pending]) for i in range(len(COLUMNS))]
+        table = pa.Table.from_arrays([pa.array(c) for c in columns], schema=self.schema)
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+        self._pending = []
+        self._pending_rows = 0
+
+    def _close_layer(self):
+        if self._writer is not None:
+            self._write_pending()
+            self._writer.close()
+            self._writer = None
+
+    def write(self, stamp, angle, distance, intensity=None, altura=None):
+        """Anexa uma revolução"""
+        if altura is not None and np.isnan(altura):
+            altura = None
+        if self._writer is None or altura != self._altura:
+            self._close_layer()
+            self._open_layer(altura)
+
+        angle = np.asarray(angle, dtype=np.float32)
+        distance = np.asarray(distance, dtype=np.float32)
+        n = len(distance)
+        intensity = np.zeros(n, dtype=np.float32) if intensity is None else np.asarray(intensity, dtype=np.float32)
+        z = np.full(n, 0.0 if altura is None else altura, dtype=np.float32)
+        self._pending.append((np.full(n, stamp, dtype=np.uint64), angle, distance, intensity,
+                              distance * np.cos(angle), distance * np.sin(angle), z))
+        self._pending_rows += n
+        self.revolutions += 1
+        self.points += n
+        if self._pending_rows >= self.row_group_size:
+            self._write_pending()
+
+    def write_columns(self, stamp, colunas):
+        """Anexa uma revolução no formato de colunas de lidar_capture"""
+        altura = colunas['altura'][0] if 'altura' in colunas and len(colunas['altura']) else None
+        self.write(stamp, colunas['angulo'], colunas['distancia'], colunas.get('intensidade'), altura)
+
+    def write_block(self, block, revolutions=1, points=0):
+        """Anexa blocos serializados de lidar_recording (usado por ParquetRecorder)"""
+        for rev in decode_blocks(block):
+            self.write(rev.stamp, rev.angle, rev.range, rev.intensity, rev.altura)
+
+    def write_stats(self, stats):
+        """Grava as estatísticas da captura (CaptureStats) no diretório da sessão"""
+        os.makedirs(self.path, exist_ok=True)
+        path = os.path.join(self.path, STATS_NAME)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            f.write(stats.to_json())
+        os.replace(path + ".tmp", path)
+
+    def flush(self):
+        # Row groups só são gravados completos; o rodapé só existe no fechamento
+        pass
+
+    def fsync(self):
+        pass
+
+    def close(self):
+        self._close_layer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ParquetRecorder(StreamingRecorder):
+    """StreamingRecorder que grava um dataset Parquet em vez de um .x2lrec
+
+    path é a raiz do dataset; cada instância grava uma sessão nova e
+    close() retorna o diretório da sessão.
+    """
+
+    def __init__(self, root, sessao=None, row_group_size=DEFAULT_ROW_GROUP_SIZE, **kwargs):
+        require_pyarrow()
+        self.sessao = sessao or session_id()
+        self.row_group_size = row_group_size
+        super().__init__(os.path.join(root, f"sessao={self.sessao}"), **kwargs)
+        self.root = root
+
+    def _create_writer(self, laser_config):
+        return ParquetDatasetWriter(self.root, self.sessao, laser_config=laser_config, settings=self.settings,
+                                    extra=self.extra, row_group_size=self.row_group_size)
+
+
+def convert_to_parquet(source, root, sessao=None, row_group_size=DEFAULT_ROW_GROUP_SIZE, angle_units=None):
+    """Converte um CSV de captura ou .x2lrec em uma sessão do dataset; retorna o diretório
+
+    A sessão vem do timestamp no nome do arquivo. Uma sessão já convertida
+    é substituída. CSVs não têm stamps (stamp = 0).
+    """
+    sessao = sessao or session_from_name(source)
+    destino = os.path.join(root, f"sessao={sessao}")
+    if os.path.exists(destino):
+        shutil.rmtree(destino)
+
+    extra = {'source': os.path.basename(source)}
+    if is_recording(source):
+        with RecordingReader(source) as reader:
+            header = {k: v for k, v in reader.header.items() if k not in ('format', 'version', 'laser_config', 'settings')}
+            extra.update(header)
+            with ParquetDatasetWriter(root, sessao, laser_config=reader.laser_config, settings=reader.settings,
+                                      extra=extra, row_group_size=row_group_size) as writer:
+                for rev in reader:
+                    writer.write(rev.stamp, rev.angle, rev.range, rev.intensity, rev.altura)
+                if reader.stats is not None:
+                    writer.write_stats(reader.stats)
+        return destino
+
+    colunas = read_csv_columns(source, angle_units)
+    if 'angulo' not in colunas or 'distancia' not in colunas:
+        raise ValueError(f"Colunas 'angulo' e 'distancia' não encontradas em {source}")
+    check_cartesian(colunas, source)
+    angle, distance = colunas['angulo'], colunas['distancia']
+    intensity = colunas.get('intensidade', colunas.get('intensity'))
+    altura = colunas.get('altura')
+    bounds = np.concatenate(([0], revolution_breaks(angle, altura), [len(angle)]))
+    with ParquetDatasetWriter(root, sessao, extra=extra, row_group_size=row_group_size) as writer:
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if end > start:
+                writer.write(0, angle[start:end], distance[start:end],
+                             None if intensity is None else intensity[start:end],
+                             None if altura is None else float(altura[start]))
+    return destino
+
+
+def dataset_filter(altura_min=None, altura_max=None, inicio=None, fim=None):
+    """Expressão de filtro: alturas em [altura_min, altura_max], sessões em [inicio, fim)"""
+    import pyarrow.dataset as ds
+
+    conditions = []
+    if altura_min is not None:
+        conditions.append(ds.field('altura') >= altura_min)
+    if altura_max is not None:
+        conditions.append(ds.field('altura') <= altura_max)
+    if inicio is not None:
+        conditions.append(ds.field('sessao') >= (session_id(inicio) if isinstance(inicio, datetime) else inicio))
+    if fim is not None:
+        conditions.append(ds.field('sessao') < (session_id(fim) if isinstance(fim, datetime) else fim))
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def open_dataset(root):
+    """pyarrow.dataset.Dataset com sessao e altura vindas do caminho"""
+    require_pyarrow()
+    import pyarrow.dataset as ds
+
+    return ds.dataset(root, format="parquet",
+                      partitioning=ds.partitioning(partitioning_schema(), flavor="hive"))
+
+
+def read_dataset(root, altura_min=None, altura_max=None, inicio=None, fim=None, columns=None, filter=None):
+    """Lê só as partições e row groups relevantes; retorna uma pyarrow.Table
+
+    Exemplo (camadas entre 4 e 8 cm das sessões de ontem):
+
+        hoje = datetime.now().replace(hour=0, minute=0, second=0)
+        tabela = read_dataset('data/parquet', 0.04, 0.08, hoje - timedelta(days=1), hoje)
+        df = tabela.to_pandas()
+    """
+    expression = dataset_filter(altura_min, altura_max, inicio, fim)
+    if filter is not None:
+        expression = filter if expression is None else expression & filter
+    return open_dataset(root).to_table(columns=columns, filter=expression)
+
+
+def session_metadata(path):
+    """Cabeçalho da sessão gravado nos metadados de um arquivo Parquet"""
+    require_pyarrow()
+    metadata = pq.read_schema(path).metadata or {}
+    return json.loads(metadata[METADATA_KEY]) if METADATA_KEY in metadata else None
+
+
+def session_stats(path):
+    """CaptureStats gravadas no diretório de uma sessão, ou None"""
+    from lidar_stats import CaptureStats
+
+    try:
+        with open(os.path.join(path, STATS_NAME), encoding='utf-8') as f:
+            return CaptureStats.from_json(f.read())
+    except FileNotFoundError:
+        return None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if len(sys.argv) < 3:
+        print(f"Uso: {sys.argv[0]} <raiz do dataset> arquivo.csv|arquivo.x2lrec ...")
+        sys.exit(2)
+    raiz = sys.argv[1]
+    for arquivo in sys.argv[2:]:
+        destino = convert_to_parquet(arquivo, raiz)
+        print(f"✅ {arquivo} -> {destino} ({os.path.getsize(arquivo)} -> {recording_size(destino)} bytes)")
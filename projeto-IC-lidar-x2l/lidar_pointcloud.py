@@ -0,0 +1,647 @@
+#!/usr/bin/env python3
+import os
+import json
+import shutil
+
+import numpy as np
+
+from lidar_recording import RecordingReader, is_recording, detect_angle_units
+
+VERSION = "1.0"
+
+CACHE_DIR = ".x2l-cache"
+CACHE_FORMAT = 1
+CSV_CHUNK_ROWS = 1_000_000
+
+# Regras de validade (filter_valid_points)
+FILTER_MIN_RANGE = 0.01
+FILTER_QUANTILE = 0.99
+FILTER_QUANTILE_FACTOR = 1.5
+
+# Representante de cada célula no downsampling em grade
+CENTROID = "centroid"
+FIRST = "first"
+# Divisões da estimativa inicial na grade fina de voxel_grid_to
+FINE_GRID_DIVISIONS = 4
+
+
+def map_columns(names):
+    """Mapeia nomes de colunas dos CSVs/gravações para X, Y, Z, Distance e Angle"""
+    col_map = {}
+    for col in names:
+        col_lower = col.lower().strip()
+        if col_lower in ['x', 'pos_x', 'position_x']:
+            target = 'X'
+        elif col_lower in ['y', 'pos_y', 'position_y']:
+            target = 'Y'
+        elif col_lower in ['z', 'pos_z', 'position_z', 'height']:
+            target = 'Z'
+        elif col_lower in ['distance', 'dist', 'distancia', 'range']:
+            target = 'Distance'
+        elif col_lower in ['angle', 'angulo', 'theta']:
+            target = 'Angle'
+        else:
+            continue
+        # Não gerar colunas duplicadas (ex.: Z em metros e Height em cm)
+        if target not in col_map.values() and (target == col or target not in names):
+            col_map[col] = target
+    return col_map
+
+
+def cache_path(source):
+    """Diretório de cache colunar de um arquivo de origem"""
+    directory, name = os.path.split(os.path.abspath(source))
+    return os.path.join(directory, CACHE_DIR, name + ".cols")
+
+
+def _source_signature(source):
+    st = os.stat(source)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def _count_rows(csv_file):
+    """Conta linhas de dados sem fazer parsing (bloco a bloco)"""
+    lines = 0
+    last = b'\n'
+    with open(csv_file, 'rb') as f:
+        while True:
+            block = f.read(1 << 24)
+            if not block:
+                break
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    return max(lines - 1, 0)
+
+
+class PointCloud:
+    """Nuvem de pontos com colunas float32 mapeadas em memória a partir do cache"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        n = self.meta['rows']
+        self.columns = {
+            name: np.load(os.path.join(directory, name + ".npy"), mmap_mode='r')[:n]
+            for name in self.meta['columns']
+        }
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    @property
+    def source(self):
+        return self.meta['source']
+
+    def take(self, indices=None, columns=None):
+        """Materializa apenas as linhas (e colunas) pedidas como dict de arrays"""
+        names = columns or list(self.columns)
+        if indices is None:
+            return {name: np.array(self.columns[name]) for name in names}
+        return {name: self.columns[name][indices] for name in names}
+
+    def to_dataframe(self, indices=None, columns=None):
+        import pandas as pd
+        return pd.DataFrame(self.take(indices, columns))
+
+    def layers(self, column='altura', quantum=None):
+        """Camadas por `column` com views sem cópia; índice e colunas ordenadas ficam no cache
+
+        Na primeira chamada as colunas são reordenadas por camada (ordenação
+        estável) e gravadas em <cache>/by-<column>/; as seguintes só mapeiam.
+        """
+        if column not in self.columns:
+            raise KeyError(f"Coluna de camada ausente: {column}")
+        tag = column if quantum is None else f"{column}-{quantum:g}"
+        directory = os.path.join(self.directory, f"by-{tag}")
+        index_file = os.path.join(directory, "layers.npz")
+        if os.path.exists(index_file):
+            index = LayerIndex.load(index_file)
+        else:
+            index = LayerIndex.build(self.columns[column], quantum)
+            os.makedirs(directory, exist_ok=True)
+            for name, values in self.columns.items():
+                np.save(os.path.join(directory, name + ".npy"), index.sort(values))
+            index.save(index_file)  # por último: marca o diretório como completo
+        columns = {name: np.load(os.path.join(directory, name + ".npy"), mmap_mode='r')
+                   for name in self.columns}
+        return LayeredColumns(index, columns)
+
+
+class LayerIndex:
+    """Índice de camadas: permutação estável que agrupa os pontos por camada e tabela de offsets
+
+    Com as colunas reordenadas por sort(), a camada i é a fatia
+    offsets[i]:offsets[i+1] (view, sem cópia). quantum agrupa alturas em
+    faixas (ex.: 0.5 cm) antes de indexar.
+    """
+
+    def __init__(self, heights, offsets, order, quantum=None):
+        self.heights = heights
+        self.offsets = offsets
+        self.order = order
+        self.quantum = quantum
+        self._lookup = {float(h): i for i, h in enumerate(heights)}
+
+    @classmethod
+    def build(cls, keys, quantum=None):
+        keys = np.asarray(keys)
+        if quantum is not None:
+            keys = np.floor(keys / quantum) * quantum
+        order = np.argsort(keys, kind='stable')
+        ordered = keys[order]
+        starts = np.flatnonzero(ordered[1:] != ordered[:-1]) + 1
+        offsets = np.concatenate(([0], starts, [len(ordered)])).astype(np.int64)
+        heights = ordered[offsets[:-1]] if len(ordered) else ordered[:0]
+        return cls(heights, offsets, order, quantum)
+
+    def __len__(self):
+        return len(self.heights)
+
+    def sort(self, values):
+        """Reordena uma coluna por camada (uma cópia, feita uma vez)"""
+        return np.asarray(values)[self.order]
+
+    def bounds(self, i):
+        return int(self.offsets[i]), int(self.offsets[i + 1])
+
+    def counts(self):
+        return np.diff(self.offsets)
+
+    def find(self, height):
+        """Índice da camada com essa altura (exata) ou da mais próxima"""
+        i = self._lookup.get(float(height))
+        if i is not None:
+            return i
+        if self.quantum is not None:
+            i = self._lookup.get(float(np.floor(height / self.quantum) * self.quantum))
+            if i is not None:
+                return i
+        j = int(np.searchsorted(self.heights, height))
+        if j == len(self.heights) or (j > 0 and height - self.heights[j - 1] <= self.heights[j] - height):
+            j -= 1
+        return j
+
+    def save(self, path):
+        np.savez(path, heights=self.heights, offsets=self.offsets, order=self.order,
+                 quantum=np.nan if self.quantum is None else self.quantum)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            quantum = float(f['quantum'])
+            return cls(f['heights'], f['offsets'], f['order'], None if np.isnan(quantum) else quantum)
+
+
+class LayeredColumns:
+    """Colunas ordenadas por camada com acesso O(1) a cada camada"""
+
+    def __init__(self, index, columns):
+        self.index = index
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def heights(self):
+        return self.index.heights
+
+    def layer(self, i):
+        """Colunas da camada i como views"""
+        start, end = self.index.bounds(i)
+        return {name: values[start:end] for name, values in self.columns.items()}
+
+    def at(self, height):
+        """Colunas da camada mais próxima da altura"""
+        return self.layer(self.index.find(height))
+
+    def between(self, low, high):
+        """Camadas contíguas com altura em [low, high], como uma única view"""
+        i = int(np.searchsorted(self.index.heights, low, side='left'))
+        j = int(np.searchsorted(self.index.heights, high, side='right'))
+        start, end = int(self.index.offsets[i]), int(self.index.offsets[j])
+        return {name: values[start:end] for name, values in self.columns.items()}
+
+    def reduce(self, column, ufunc=np.add):
+        """ufunc.reduceat por camada (ex.: somas para médias por camada)"""
+        values = np.asarray(self.columns[column])
+        counts = self.index.counts()
+        result = np.zeros(len(counts), dtype=np.result_type(values.dtype, np.float64))
+        nonempty = counts > 0
+        result[nonempty] = ufunc.reduceat(values, self.index.offsets[:-1][nonempty])
+        return result
+
+    def mean(self, column):
+        return self.reduce(column) / np.maximum(self.index.counts(), 1)
+
+    @classmethod
+    def from_columns(cls, colunas, column='altura', quantum=None):
+        """Índice em memória (sem cache) sobre um dict de colunas"""
+        index = LayerIndex.build(colunas[column], quantum)
+        return cls(index, {name: index.sort(values) for name, values in colunas.items()})
+
+
+def _build_from_csv(source, directory):
+    import pandas as pd
+
+    rows = _count_rows(source)
+    names = None
+    arrays = {}
+    pos = 0
+    for chunk in pd.read_csv(source, chunksize=CSV_CHUNK_ROWS):
+        if names is None:
+            col_map = map_columns(chunk.columns)
+            names = [col_map.get(col, col.strip()) for col in chunk.columns]
+            for name in names:
+                arrays[name] = np.lib.format.open_memmap(os.path.join(directory, name + ".npy"),
+                                                         mode='w+', dtype=np.float32, shape=(rows,))
+        n = len(chunk)
+        for col, name in zip(chunk.columns, names):
+            arrays[name][pos:pos + n] = pd.to_numeric(chunk[col], errors='coerce').to_numpy(np.float32)
+        pos += n
+
+    for array in arrays.values():
+        array.flush()
+    return names or [], pos
+
+
+def _build_from_recording(source, directory):
+    with RecordingReader(source) as reader:
+        colunas = reader.columns()
+    col_map = map_columns(colunas)
+    names = []
+    for col, values in colunas.items():
+        name = col_map.get(col, col)
+        np.save(os.path.join(directory, name + ".npy"), np.asarray(values, dtype=np.float32))
+        names.append(name)
+    return names, len(colunas['angulo'])
+
+
+def build_cache(source):
+    """Converte o arquivo de origem (CSV ou .x2lrec) para o cache colunar"""
+    directory = cache_path(source)
+    os.makedirs(directory, exist_ok=True)
+    meta_file = os.path.join(directory, "meta.json")
+    if os.path.exists(meta_file):
+        os.remove(meta_file)  # invalida o cache enquanto reconstrói
+    for entry in os.listdir(directory):
+        if entry.startswith("by-"):
+            shutil.rmtree(os.path.join(directory, entry))  # índices de camadas da versão anterior
+
+    signature = _source_signature(source)
+    if is_recording(source):
+        names, rows = _build_from_recording(source, directory)
+    else:
+        names, rows = _build_from_csv(source, directory)
+
+    meta = {'format': CACHE_FORMAT, 'source': os.path.abspath(source),
+            'rows': rows, 'columns': names, **signature}
+    with open(meta_file, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    return directory
+
+
+def cache_is_valid(source):
+    """Cache existe e a origem não mudou (mtime/tamanho)"""
+    meta_file = os.path.join(cache_path(source), "meta.json")
+    if not os.path.exists(meta_file):
+        return False
+    try:
+        with open(meta_file, encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    signature = _source_signature(source)
+    return (meta.get('format') == CACHE_FORMAT and meta.get('size') == signature['size']
+            and meta.get('mtime_ns') == signature['mtime_ns'])
+
+
+def load_point_cloud(source, rebuild=False):
+    """Abre a nuvem de pontos pelo cache, construindo-o apenas se necessário"""
+    if rebuild or not cache_is_valid(source):
+        build_cache(source)
+    return PointCloud(cache_path(source))
+
+
+# ----------------------------------------------------------------------
+# Downsampling em grade (voxel)
+# ----------------------------------------------------------------------
+def _combine(cells):
+    """Combina índices inteiros de célula por eixo em uma chave int64"""
+    key = None
+    for cell in cells:
+        key = cell if key is None else key * (int(cell.max()) + 1) + cell
+    return key
+
+
+def _cell_indices(values, cell_size):
+    values = np.asarray(values, dtype=np.float64)
+    return np.floor((values - values.min()) / cell_size).astype(np.int64)
+
+
+def _cell_keys(coords, cell_size):
+    return _combine([_cell_indices(values, cell_size) for values in coords])
+
+
+def count_cells(coords, cell_size):
+    """Número de células ocupadas (pontos que voxel_downsample manteria)"""
+    import pandas as pd
+
+    return len(pd.unique(_cell_keys(coords, cell_size)))
+
+
+def _first_points(labels, cells):
+    """Índice do primeiro ponto de cada uma das `cells` células"""
+    first = np.full(cells, len(labels), dtype=np.int64)
+    np.minimum.at(first, labels, np.arange(len(labels)))
+    return first
+
+
+def voxel_cells(coords, cell_size):
+    """Rótulo de célula (0..k-1) de cada ponto e o índice do primeiro ponto de cada célula
+
+    coords é uma sequência de arrays (X, Y[, Z]). Os índices inteiros das
+    células são combinados em uma chave int64 e agrupados por hashing
+    (pandas.factorize), em uma única passada linear.
+    """
+    import pandas as pd
+
+    labels, uniques = pd.factorize(_cell_keys(coords, cell_size), sort=False)
+    return labels, _first_points(labels, len(uniques))
+
+
+def sync_polar(colunas):
+    """Recalcula Distance e Angle a partir de X/Y (no lugar) e retorna colunas
+
+    Angle mantém a unidade e a faixa da coluna (radianos ou graus; centrada
+    em zero ou de 0 a uma volta).
+    """
+    if 'X' not in colunas or 'Y' not in colunas or not len(colunas['X']):
+        return colunas
+    x = np.asarray(colunas['X'], dtype=np.float64)
+    y = np.asarray(colunas['Y'], dtype=np.float64)
+    if 'Distance' in colunas:
+        colunas['Distance'] = np.hypot(x, y).astype(np.asarray(colunas['Distance']).dtype)
+    if 'Angle' in colunas:
+        original = np.asarray(colunas['Angle'])
+        angle = np.arctan2(y, x)
+        if np.nanmin(original) >= 0:
+            angle = np.mod(angle, 2 * np.pi)
+        if detect_angle_units(original.astype(np.float64)) == 'deg':
+            angle = np.degrees(angle)
+        colunas['Angle'] = angle.astype(original.dtype)
+    return colunas
+
+
+def reduce_cells(colunas, labels, first, points, representative=CENTROID, rows=None):
+    """Um ponto por célula a partir de rótulos de voxel_cells/voxel_grid_to
+
+    points são as coordenadas usadas para rotular (alinhadas com labels).
+    Das colunas só são lidas as linhas representativas; rows mapeia cada
+    ponto rotulado para sua linha em colunas (None: mesma ordem), o que
+    permite rotular só os pontos válidos sem compactar as demais colunas.
+    Com CENTROID as coordenadas viram a média da célula e Distance/Angle
+    são recalculados delas (sync_polar); com FIRST o primeiro ponto é
+    mantido inteiro.
+    """
+    pick = first if rows is None else np.asarray(rows)[first]
+    reduzido = {name: np.asarray(values[pick]) for name, values in colunas.items()}
+    if representative == CENTROID:
+        counts = np.bincount(labels, minlength=len(first))
+        for name, values in points.items():
+            sums = np.bincount(labels, weights=values, minlength=len(first))
+            reduzido[name] = (sums / counts).astype(np.asarray(values).dtype)
+        sync_polar(reduzido)
+    return reduzido
+
+
+def voxel_downsample(colunas, cell_size, coords=('X', 'Y', 'Z'), representative=CENTROID):
+    """Reduz a nuvem a um ponto por célula de lado cell_size (m)
+
+    Representantes como em reduce_cells. Colunas de coords ausentes são
+    ignoradas (nuvens 2D).
+    """
+    if representative not in (CENTROID, FIRST):
+        raise ValueError(f"Representante inválido: {representative}")
+    coords = [name for name in coords if name in colunas]
+    colunas = finite_rows(colunas, coords)
+    if not coords or len(colunas[coords[0]]) == 0:
+        return dict(colunas)
+
+    points = {name: colunas[name] for name in coords}
+    labels, first = voxel_cells(list(points.values()), cell_size)
+    return reduce_cells(colunas, labels, first, points, representative)
+
+
+def finite_rows(colunas, coords):
+    """Descarta linhas com coordenadas NaN/inf (não têm célula definida)"""
+    mask = None
+    for name in coords:
+        if name in colunas:
+            finite = np.isfinite(colunas[name])
+            mask = finite if mask is None else mask & finite
+    if mask is None or mask.all():
+        return colunas
+    return {name: np.asarray(values)[mask] for name, values in colunas.items()}
+
+
+def _extent_cell_size(coords, max_points):
+    extents = []
+    for values in coords:
+        if len(values):
+            extent = float(np.ptp(values))
+            if extent > 1e-6:
+                extents.append(extent)
+    if not extents:
+        return 1.0
+    return (np.prod(extents) / max_points) ** (1.0 / len(extents))
+
+
+def grid_cell_size(colunas, max_points, coords=('X', 'Y', 'Z')):
+    """Estimativa inicial do lado da célula (caixa envolvente / max_points)
+
+    Supõe o volume preenchido por igual; nuvens de LiDAR são superfícies,
+    então a estimativa costuma ser grossa demais (voxel_grid_to corrige).
+    """
+    return _extent_cell_size([colunas[name] for name in coords if name in colunas], max_points)
+
+
+def _split(keys, sizes):
+    """Inverso de _combine: índices inteiros por eixo de cada chave"""
+    cells = []
+    for size in reversed(sizes):
+        keys, cell = np.divmod(keys, size)
+        cells.append(cell)
+    return cells[::-1]
+
+
+def _factorize_cells(indices):
+    """Rótulo de cada entrada e os índices por eixo de cada célula distinta"""
+    import pandas as pd
+
+    sizes = [int(cell.max()) + 1 for cell in indices]
+    labels, uniques = pd.factorize(_combine(indices), sort=False)
+    return labels, _split(uniques, sizes)
+
+
+def voxel_grid_to(coords, max_points, cell_size=None, tolerance=0.05, max_iter=20):
+    """Grade cujas células ocupadas cabem em max_points: (labels, first, cell_size)
+
+    Uma passada agrupa os pontos na grade base (cell_size, ou
+    grid_cell_size / FINE_GRID_DIVISIONS). As grades de lado base * 2^k
+    saem das células ocupadas da anterior por divisão inteira, sem voltar
+    aos pontos, até caber. Entre as duas últimas a ocupação é interpolada
+    em log-log (nuvens são superfícies: ~lado^-2) para estimar o lado que
+    enche (1 - tolerance / 2) * max_points, e a passada final agrupa os
+    pontos nesse lado; só se ela sair do intervalo a estimativa é
+    corrigida com o novo ponto. Sem cell_size, se a grade base couber com
+    folga ela é refinada; com cell_size a célula só cresce a partir dele.
+    """
+    fixed = cell_size is not None
+    base = cell_size if fixed else _extent_cell_size(coords, max_points) / FINE_GRID_DIVISIONS
+    for _ in range(max_iter):
+        labels, cells = _factorize_cells([_cell_indices(values, base) for values in coords])
+        if fixed or len(cells[0]) >= (1 - tolerance) * max_points:
+            break
+        base /= FINE_GRID_DIVISIONS
+    if len(cells[0]) <= max_points:
+        return labels, _first_points(labels, len(cells[0])), base
+
+    # lo: lado conhecido acima do orçamento; hi: lado que cabe
+    lo, lo_count = base, len(cells[0])
+    hi = base * 2
+    _, cells = _factorize_cells([cell // 2 for cell in cells])
+    while len(cells[0]) > max_points:
+        lo, lo_count, hi = hi, len(cells[0]), hi * 2
+        _, cells = _factorize_cells([cell // 2 for cell in cells])
+    hi_count = len(cells[0])
+
+    target = (1 - tolerance / 2) * max_points
+    result = None
+    for _ in range(max_iter):
+        dim = np.log(lo_count / max(hi_count, 1)) / np.log(hi / lo)
+        size = lo * (lo_count / target) ** (1 / dim) if dim > 0 else np.sqrt(lo * hi)
+        if not lo < size < hi:
+            size = np.sqrt(lo * hi)
+        labels, first = voxel_cells(coords, size)
+        if len(first) > max_points:
+            lo, lo_count = size, len(first)
+            if result is not None and hi / lo < 1 + tolerance / 10:
+                break
+            continue
+        hi, hi_count, result = size, len(first), (labels, first, size)
+        if hi_count >= (1 - tolerance) * max_points:
+            break
+        if hi / lo < 1 + tolerance / 10:
+            break  # ocupação descontínua (ex.: camadas em alturas fixas)
+    if result is None:
+        labels, first = voxel_cells(coords, hi)
+        result = labels, first, hi
+    return result
+
+
+def voxel_downsample_to(colunas, max_points, coords=('X', 'Y', 'Z'), representative=CENTROID,
+                        cell_size=None, tolerance=0.05, max_iter=20, rows=None):
+    """Downsampling em grade que respeita um orçamento de pontos
+
+    A grade vem de voxel_grid_to (uma passada sobre os pontos) e os
+    representantes de reduce_cells. Um cell_size informado é usado se
+    couber; senão a célula só cresce a partir dele.
+
+    rows restringe a redução a essas linhas (ex.: np.flatnonzero de
+    valid_points_mask, que já exclui coordenadas não finitas): só as
+    coordenadas delas são copiadas e, das demais colunas (ex.: o cache
+    mapeado em memória), só as linhas representativas são lidas.
+    Retorna (colunas, cell_size usado).
+    """
+    if representative not in (CENTROID, FIRST):
+        raise ValueError(f"Representante inválido: {representative}")
+    if rows is not None:
+        points = {name: np.asarray(colunas[name][rows]) for name in coords if name in colunas}
+        if not points or len(rows) <= max_points:
+            return {name: np.asarray(values[rows]) for name, values in colunas.items()}, 0.0
+    else:
+        n = len(next(iter(colunas.values()))) if colunas else 0
+        if n <= max_points:
+            return dict(colunas), 0.0
+        colunas = finite_rows(colunas, coords)
+        points = {name: colunas[name] for name in coords if name in colunas}
+        if not points or len(next(iter(points.values()))) <= max_points:
+            return dict(colunas), 0.0
+
+    labels, first, cell_size = voxel_grid_to(list(points.values()), max_points, cell_size, tolerance, max_iter)
+    return reduce_cells(colunas, labels, first, points, representative, rows), cell_size
+
+
+# ----------------------------------------------------------------------
+# Filtro de pontos inválidos
+# ----------------------------------------------------------------------
+def _quantile(values, q):
+    """Quantil com interpolação linear (como pandas) por seleção, sem ordenar
+
+    Reordena `values` no lugar.
+    """
+    pos = q * (len(values) - 1)
+    lo = int(np.floor(pos))
+    hi = min(lo + 1, len(values) - 1)
+    values.partition([lo, hi])
+    return float(values[lo]) + (float(values[hi]) - float(values[lo])) * (pos - lo)
+
+
+def valid_points_mask(colunas, min_range=FILTER_MIN_RANGE, quantile=FILTER_QUANTILE,
+                      factor=FILTER_QUANTILE_FACTOR, coords=('X', 'Y'), distance='Distance'):
+    """Máscara única de pontos válidos e o número de rejeições por regra
+
+    Regras, na ordem: distância > min_range ('min_range'), coordenadas
+    finitas ('non_finite') e distância <= quantil * factor, com o quantil
+    calculado sobre os sobreviventes por seleção ('percentile').
+    Sem a coluna de distância só a regra de coordenadas é aplicada.
+    """
+    n = len(colunas[coords[0]])
+    mask = np.ones(n, dtype=bool)
+    tmp = np.empty(n, dtype=bool)
+    counts = {'total': n, 'min_range': 0, 'non_finite': 0, 'percentile': 0}
+    has_distance = distance in colunas
+    remaining = n
+
+    if has_distance:
+        np.greater(colunas[distance], min_range, out=mask)
+        kept = int(np.count_nonzero(mask))
+        counts['min_range'] = remaining - kept
+        remaining = kept
+
+    for name in coords:
+        np.isfinite(colunas[name], out=tmp)
+        np.logical_and(mask, tmp, out=mask)
+    kept = int(np.count_nonzero(mask))
+    counts['non_finite'] = remaining - kept
+    remaining = kept
+
+    if has_distance and quantile is not None and remaining:
+        cap = _quantile(np.compress(mask, colunas[distance]), quantile) * factor
+        np.less_equal(colunas[distance], cap, out=tmp)
+        np.logical_and(mask, tmp, out=mask)
+        kept = int(np.count_nonzero(mask))
+        counts['percentile'] = remaining - kept
+        counts['percentile_cap'] = cap
+        remaining = kept
+
+    counts['valid'] = remaining
+    return mask, counts
+
+
+def filter_valid_points(colunas, **kwargs):
+    """Aplica valid_points_mask e compacta todas as colunas de uma vez; retorna (colunas, contagens)"""
+    mask, counts = valid_points_mask(colunas, **kwargs)
+    if counts['valid'] == counts['total']:
+        return dict(colunas), counts
+    return {name: np.compress(mask, values) for name, values in colunas.items()}, counts
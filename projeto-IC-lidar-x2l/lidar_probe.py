@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Sondagem paralela de portas seriais com cache persistente de dispositivos
+
+Cada porta candidata é aberta em paralelo e testada no nível do protocolo:
+
+    fluxo     - LiDARs de canal único (X2, X2L) transmitem assim que ligados;
+                um pacote de nuvem (cabeçalho 0x55AA) com checksum válido
+                confirma o dispositivo e dá a frequência de scan.
+    comando   - os demais respondem a GET_DEVICE_INFO (0xA5 0x90) e
+                GET_DEVICE_HEALTH (0xA5 0x92): modelo, firmware, hardware,
+                número de série e estado.
+
+Os resultados (porta -> modelo, série, firmware, baudrate) ficam em um
+cache JSON junto com a identidade do nó do dispositivo (st_rdev, ctime do
+nó criado pelo udev, caminho USB no sysfs). Na partida seguinte, se a
+identidade não mudou, a porta é usada sem abrir a serial; senão todas as
+candidatas são sondadas de novo, em paralelo.
+"""
+import os
+import sys
+import json
+import time
+import struct
+import logging
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import serial  # pyserial
+except ImportError:
+    serial = None
+
+VERSION = "1.0"
+
+logger = logging.getLogger(__name__)
+
+PROBE_TIMEOUT = 0.5  # s por baudrate (inclui a partida do motor do X2L)
+PROBE_BAUDRATES = (115200,)
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "x2l", "devices.json")
+CACHE_FORMAT = 1
+
+# Protocolo (core/common/ydlidar_protocol.h)
+CMD_SYNC_BYTE = 0xA5
+CMD_GET_DEVICE_INFO = 0x90
+CMD_GET_DEVICE_HEALTH = 0x92
+ANS_SYNC = b"\xa5\x5a"
+ANS_TYPE_DEVINFO = 0x04
+ANS_TYPE_DEVHEALTH = 0x06
+ANS_HEADER = struct.Struct("<2sIB")
+DEVICE_INFO = struct.Struct("<BHB16s")
+DEVICE_HEALTH = struct.Struct("<BH")
+PACKAGE_HEADER = b"\xaa\x55"
+PACKAGE_HEAD_SIZE = 10
+PACKAGE_MAX_NODES = 80
+
+# DriverInterface::YDLIDAR_* -> nome (ydlidar_help.h: lidarModelToString)
+MODEL_NAMES = {
+    1: "F4", 2: "T1", 3: "F2", 4: "S4", 5: "G4", 6: "X4", 7: "G4PRO", 8: "F4PRO", 9: "R2",
+    10: "G10", 11: "S4B", 12: "S2", 13: "G6", 14: "G2A", 15: "G2B", 16: "G2C", 17: "G4B",
+    18: "G4C", 19: "G1", 20: "G5", 21: "G7", 22: "SCL", 23: "R3", 51: "GS2", 52: "GS1",
+    53: "GS5", 54: "GS6", 100: "TG15", 101: "TG30", 102: "TG50", 110: "TEA", 130: "TSA",
+    131: "TSAPro", 140: "Tmini", 150: "TminiPro", 151: "TminiPlus", 152: "TminiPlusSH",
+    160: "SDM15", 200: "T15", 210: "TIA",
+}
+
+HEALTH_STATUS = {0: "ok", 1: "warning", 2: "error"}
+
+ProbeResult = namedtuple('ProbeResult', [
+    'port', 'ok', 'baudrate', 'protocol', 'model', 'firmware', 'hardware', 'serial',
+    'health', 'scan_frequency', 'elapsed', 'error'])
+ProbeResult.__new__.__defaults__ = (None,) * 10
+
+
+# ----------------------------------------------------------------------
+# Protocolo
+# ----------------------------------------------------------------------
+def find_package(data):
+    """Procura um pacote de nuvem válido; retorna (ct, amostras) ou None"""
+    pos = data.find(PACKAGE_HEADER)
+    while pos >= 0:
+        head = data[pos:pos + PACKAGE_HEAD_SIZE]
+        if len(head) < PACKAGE_HEAD_SIZE:
+            return None
+        ct, count = head[2], head[3]
+        end = pos + PACKAGE_HEAD_SIZE + 2 * count
+        if 0 < count <= PACKAGE_MAX_NODES and (head[4] & 1) and (head[6] & 1) and end <= len(data):
+            words = struct.unpack_from(f"<{5 + count}H", data, pos)
+            checksum = 0
+            for i, word in enumerate(words):
+                if i != 4:  # palavra do checksum
+                    checksum ^= word
+            if checksum == words[4]:
+                return ct, count
+        pos = data.find(PACKAGE_HEADER, pos + 1)
+    return None
+
+
+def _read_response(conn, answer_type, payload, deadline):
+    """Lê cabeçalho de resposta 0xA5 0x5A do tipo esperado e o payload"""
+    buffer = b""
+    while time.monotonic() < deadline:
+        buffer += conn.read(max(1, ANS_HEADER.size + payload.size - len(buffer)))
+        start = buffer.find(ANS_SYNC)
+        if start < 0:
+            buffer = buffer[-1:]
+            continue
+        buffer = buffer[start:]
+        if len(buffer) < ANS_HEADER.size + payload.size:
+            continue
+        _, size, kind = ANS_HEADER.unpack_from(buffer)
+        if kind == answer_type and (size & 0x3FFFFFFF) >= payload.size:
+            return payload.unpack_from(buffer, ANS_HEADER.size)
+        buffer = buffer[2:]
+    return None
+
+
+def probe_connection(conn, timeout=PROBE_TIMEOUT):
+    """Testa uma conexão já aberta (read/write/reset_input_buffer); retorna dict de campos"""
+    deadline = time.monotonic() + timeout
+    conn.reset_input_buffer()
+
+    # Canal único: escuta o fluxo de pacotes
+    data = b""
+    while time.monotonic() < deadline:
+        data += conn.read(256)
+        found = find_package(data)
+        if found is not None:
+            ct = found[0]
+            return {'ok': True, 'protocol': 'stream', 'health': 'ok',
+                    'scan_frequency': ((ct & 0xFE) >> 1) / 10.0 if ct & 1 else None}
+        if len(data) > 4096:
+            data = data[-PACKAGE_HEAD_SIZE - 2 * PACKAGE_MAX_NODES:]
+        if not data and time.monotonic() > deadline - timeout / 2:
+            break  # metade do tempo em silêncio: tenta por comando
+
+    # Duplo canal: pergunta informações e estado
+    conn.write(bytes((CMD_SYNC_BYTE, CMD_GET_DEVICE_INFO)))
+    info = _read_response(conn, ANS_TYPE_DEVINFO, DEVICE_INFO, deadline + timeout)
+    if info is None:
+        return {'ok': False, 'error': 'sem resposta'}
+    model, firmware, hardware, serial_number = info
+    fields = {
+        'ok': True, 'protocol': 'command',
+        'model': MODEL_NAMES.get(model, str(model)),
+        'firmware': f"{firmware >> 8}.{firmware & 0xFF}",
+        'hardware': str(hardware),
+        'serial': ''.join(str(b) for b in serial_number),
+    }
+    conn.write(bytes((CMD_SYNC_BYTE, CMD_GET_DEVICE_HEALTH)))
+    health = _read_response(conn, ANS_TYPE_DEVHEALTH, DEVICE_HEALTH, time.monotonic() + timeout)
+    if health is not None:
+        fields['health'] = HEALTH_STATUS.get(health[0], str(health[0]))
+    return fields
+
+
+def probe_port(port, baudrates=PROBE_BAUDRATES, timeout=PROBE_TIMEOUT):
+    """Sonda uma porta em cada baudrate até obter resposta"""
+    t0 = time.monotonic()
+    if serial is None:
+        return ProbeResult(port, False, error="pyserial não instalado", elapsed=0.0)
+    error = None
+    for baudrate in baudrates:
+        try:
+            with serial.Serial(port, baudrate, timeout=0.02, write_timeout=timeout) as conn:
+                fields = probe_connection(conn, timeout)
+        except (OSError, serial.SerialException) as e:
+            error = str(e)
+            break
+        if fields.get('ok'):
+            return ProbeResult(port, baudrate=baudrate, elapsed=time.monotonic() - t0, **fields)
+        error = fields.get('error')
+    return ProbeResult(port, False, error=error, elapsed=time.monotonic() - t0)
+
+
+def probe_ports(ports, baudrates=PROBE_BAUDRATES, timeout=PROBE_TIMEOUT, max_workers=None):
+    """Sonda todas as portas em paralelo; resultados na ordem de `ports`"""
+    ports = list(ports)
+    if not ports:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers or len(ports), thread_name_prefix="probe") as pool:
+        return list(pool.map(lambda port: probe_port(port, baudrates, timeout), ports))
+
+
+# ----------------------------------------------------------------------
+# Cache
+# ----------------------------------------------------------------------
+def port_identity(port):
+    """Identidade barata do nó do dispositivo (muda ao reconectar); None se não existir"""
+    try:
+        st = os.stat(port)
+    except OSError:
+        return None
+    identity = {'rdev': st.st_rdev, 'ctime_ns': st.st_ctime_ns}
+    sysfs = os.path.join("/sys/class/tty", os.path.basename(os.path.realpath(port)), "device")
+    if os.path.exists(sysfs):
+        device = os.path.realpath(sysfs)
+        identity['sysfs'] = device
+        # Número de série USB no dispositivo pai da interface
+        serial_file = os.path.join(os.path.dirname(device), "serial")
+        try:
+            with open(serial_file, encoding='utf-8') as f:
+                identity['usb_serial'] = f.read().strip()
+        except OSError:
+            pass
+    return identity
+
+
+class DeviceCache:
+    """Cache JSON porta -> (identidade do nó, último resultado da sondagem)"""
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') == CACHE_FORMAT:
+                self.entries = data.get('devices', {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'format': CACHE_FORMAT, 'devices': self.entries}, f, indent=2)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.error(f"Erro ao gravar cache de dispositivos {self.path}: {e}")
+
+    def lookup(self, port):
+        """Resultado em cache se a porta ainda é o mesmo nó de dispositivo"""
+        entry = self.entries.get(port)
+        if not entry or entry.get('identity') != port_identity(port):
+            return None
+        return ProbeResult(**entry['result'])
+
+    def store(self, result):
+        identity = port_identity(result.port)
+        if identity is None:
+            self.entries.pop(result.port, None)
+            return
+        self.entries[result.port] = {'identity': identity, 'result': result._asdict(), 'checked': time.time()}
+
+
+def find_lidar(ports, baudrates=PROBE_BAUDRATES, timeout=PROBE_TIMEOUT, cache_path=CACHE_PATH, use_cache=True):
+    """Primeira porta (na ordem dada) com LiDAR respondendo; ProbeResult ou None
+
+    Se alguma porta tem resultado positivo no cache e o nó de dispositivo
+    não mudou, ela é usada sem abrir a serial; senão todas são sondadas em
+    paralelo e o cache é atualizado.
+    """
+    ports = list(ports)
+    cache = DeviceCache(cache_path) if use_cache else None
+    if cache:
+        # Partida rápida: porta confirmada antes e com o mesmo nó de dispositivo
+        for port in ports:
+            cached = cache.lookup(port)
+            if cached is not None and cached.ok and cached.baudrate in baudrates:
+                logger.info(f"LiDAR em cache: {port}")
+                return cached
+
+    results = probe_ports(ports, baudrates, timeout)
+    if cache:
+        for result in results:
+            cache.store(result)
+        cache.save()
+    return next((result for result in results if result.ok), None)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    import glob
+    candidates = sys.argv[1:] or sorted(glob.glob("/dev/ttyUSB*") + glob.glob("/dev/ttyACM*"))
+    t0 = time.perf_counter()
+    for result in probe_ports(candidates):
+        print(result)
+    print(f"{len(candidates)} portas sondadas em {time.perf_counter() - t0:.3f}s")
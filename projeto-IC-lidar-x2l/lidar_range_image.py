@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Conversão de revoluções em imagens de distância de resolução fixa
+
+Equivalente vetorizado do laço do docstring de LaserScan em
+core/common/ydlidar_datatype.h (ranges/intensities no estilo ROS):
+
+    size  = (max_angle - min_angle) / angle_increment + 1
+    index = ceil((angle - min_angle) / angle_increment)
+
+Um lote de revoluções (ao vivo, de uma lista ou de uma gravação .x2lrec)
+vira um array denso revoluções x faixas. Quando mais de um ponto cai na
+mesma faixa, a política decide o valor: MIN (obstáculo mais próximo),
+LAST (último ponto da revolução, como o laço original) ou MEAN.
+Pontos com distância <= 0 (sem retorno) não ocupam faixas; faixas vazias
+recebem `fill`.
+"""
+import logging
+
+import numpy as np
+
+from lidar_capture import scan_to_arrays
+from lidar_recording import RecordingReader
+
+VERSION = "1.0"
+
+logger = logging.getLogger(__name__)
+
+# Políticas de colisão
+MIN = "min"
+LAST = "last"
+MEAN = "mean"
+
+# Resolução angular do X2L a 6 Hz (3000 amostras/s)
+DEFAULT_ANGLE_INCREMENT = 2 * np.pi / 500
+
+
+class RangeImage:
+    """Lote denso de revoluções: ranges, intensities e hits (revoluções x faixas)"""
+
+    def __init__(self, ranges, intensities, hits, min_angle, angle_increment, stamps=None, alturas=None):
+        self.ranges = ranges
+        self.intensities = intensities
+        self.hits = hits
+        self.min_angle = min_angle
+        self.angle_increment = angle_increment
+        self.stamps = stamps
+        self.alturas = alturas
+
+    def __len__(self):
+        return len(self.ranges)
+
+    @property
+    def angles(self):
+        """Ângulo (rad) de cada faixa"""
+        return (self.min_angle + np.arange(self.ranges.shape[1]) * self.angle_increment).astype(np.float32)
+
+    def valid(self):
+        """Máscara das faixas com pelo menos um ponto"""
+        return self.hits > 0
+
+    def points(self, row):
+        """(angulo, distancia, intensidade) das faixas ocupadas de uma revolução"""
+        mask = self.hits[row] > 0
+        return self.angles[mask], self.ranges[row][mask], self.intensities[row][mask]
+
+
+class RangeImageConverter:
+    """Converte revoluções em linhas de largura fixa com política de colisão"""
+
+    def __init__(self, angle_increment=DEFAULT_ANGLE_INCREMENT, min_angle=-np.pi, max_angle=np.pi,
+                 policy=MIN, fill=0.0):
+        if policy not in (MIN, LAST, MEAN):
+            raise ValueError(f"Política inválida: {policy}")
+        if angle_increment <= 0 or max_angle <= min_angle:
+            raise ValueError("Faixa angular inválida")
+        self.angle_increment = float(angle_increment)
+        self.min_angle = float(min_angle)
+        self.max_angle = float(max_angle)
+        self.policy = policy
+        self.fill = fill
+        self.size = int((self.max_angle - self.min_angle) / self.angle_increment) + 1
+
+    @classmethod
+    def from_config(cls, config, policy=MIN, fill=0.0):
+        """Usa min_angle/max_angle/angle_increment de um LaserConfig (ou dict)"""
+        get = config.get if isinstance(config, dict) else lambda k: getattr(config, k)
+        return cls(get('angle_increment'), get('min_angle'), get('max_angle'), policy=policy, fill=fill)
+
+    def index(self, angle):
+        """Faixa de cada ângulo; -1 fora de [min_angle, max_angle]"""
+        angle = np.asarray(angle, dtype=np.float64)
+        index = np.ceil((angle - self.min_angle) / self.angle_increment)
+        return np.where((index >= 0) & (index < self.size), index, -1).astype(np.intp)
+
+    def convert(self, angle, distance, intensity=None):
+        """Uma revolução como RangeImage de uma linha"""
+        return self._convert(np.asarray(angle), np.asarray(distance), intensity,
+                             np.zeros(len(distance), dtype=np.intp), 1)
+
+    def convert_scan(self, scan):
+        """Um ydlidar.LaserScan (ou ReplayScan) ao vivo"""
+        angle, distance, intensity = scan_to_arrays(scan)
+        image = self.convert(angle, distance, intensity)
+        image.stamps = np.array([scan.stamp], dtype=np.uint64)
+        return image
+
+    def convert_batch(self, revolucoes):
+        """Lista de revoluções (angulo, distancia, intensidade) de tamanhos quaisquer
+
+        A intensidade de uma revolução pode ser None (X2L não mede intensidade).
+        """
+        revolucoes = list(revolucoes)
+        counts = np.array([len(rev[1]) for rev in revolucoes], dtype=np.intp)
+        if not len(counts) or not counts.sum():
+            return self._convert(np.empty(0), np.empty(0), None, np.empty(0, dtype=np.intp), len(counts))
+        angle = np.concatenate([rev[0] for rev in revolucoes])
+        distance = np.concatenate([rev[1] for rev in revolucoes])
+        intensity = np.concatenate([np.zeros(len(rev[1]), dtype=np.float32) if rev[2] is None else rev[2]
+                                    for rev in revolucoes])
+        rows = np.repeat(np.arange(len(counts)), counts)
+        return self._convert(angle, distance, intensity, rows, len(counts))
+
+    def convert_recording(self, source):
+        """Todas as revoluções de uma gravação .x2lrec (caminho ou RecordingReader)"""
+        reader = RecordingReader(source) if isinstance(source, str) else source
+        colunas = reader.columns(cartesian=False)
+        rows = np.repeat(np.arange(len(reader)), reader.counts)
+        image = self._convert(colunas['angulo'], colunas['distancia'], colunas['intensidade'], rows, len(reader))
+        image.stamps = np.asarray(reader.stamps).copy()
+        if reader.has_layers:
+            image.alturas = np.asarray(reader.alturas).copy()
+        return image
+
+    def _convert(self, angle, distance, intensity, rows, num_rows):
+        size = self.size
+        col = self.index(angle)
+        keep = (col >= 0) & (np.asarray(distance) > 0)
+        cell = rows[keep] * size + col[keep]
+        r = np.asarray(distance, dtype=np.float32)[keep]
+        i = (np.asarray(intensity, dtype=np.float32)[keep] if intensity is not None
+             else np.zeros(len(r), dtype=np.float32))
+
+        cells = num_rows * size
+        hits = np.bincount(cell, minlength=cells)
+        ranges = np.full(cells, self.fill, dtype=np.float32)
+        intensities = np.zeros(cells, dtype=np.float32)
+        occupied = hits > 0
+
+        if self.policy == MEAN:
+            ranges[occupied] = (np.bincount(cell, weights=r, minlength=cells)[occupied] / hits[occupied])
+            intensities[occupied] = (np.bincount(cell, weights=i, minlength=cells)[occupied] / hits[occupied])
+        elif self.policy == MIN:
+            # Redução por faixa sem ordenação; a intensidade vem de um ponto com a distância mínima
+            nearest = np.full(cells, np.inf, dtype=np.float32)
+            np.minimum.at(nearest, cell, r)
+            ranges[occupied] = nearest[occupied]
+            winner = r == nearest[cell]
+            intensities[cell[winner]] = i[winner]
+        else:
+            # Posição do último ponto de cada faixa (pontos em ordem de revolução)
+            last = np.full(cells, -1, dtype=np.intp)
+            np.maximum.at(last, cell, np.arange(len(cell)))
+            chosen = last[occupied]
+            ranges[occupied] = r[chosen]
+            intensities[occupied] = i[chosen]
+
+        shape = (num_rows, size)
+        return RangeImage(ranges.reshape(shape), intensities.reshape(shape), hits.reshape(shape).astype(np.uint16),
+                          self.min_angle, self.angle_increment)
@@ -0,0 +1,601 @@
+#!/usr/bin/env python3
+"""Formato binário colunar de gravação (.x2lrec)
+
+Layout do arquivo (little-endian):
+
+    preâmbulo   8s magic | uint32 versão | uint32 tamanho do cabeçalho
+    cabeçalho   JSON utf-8 (LaserConfig, X2L_SETTINGS, ...) alinhado a 8 bytes
+    blocos      um por revolução:
+                4s tag | uint32 n | uint64 stamp | float32 altura | uint32 reservado
+                float32[n] angulo | float32[n] distancia | float32[n] intensidade
+    estatística opcional, depois da última revolução:
+                4s tag "STA" | uint32 n | uint64 0 | float32 nan | uint32 reservado
+                JSON utf-8 de n bytes (lidar_stats.CaptureStats)
+
+O arquivo só recebe blocos no final (append-only). Um bloco incompleto no
+fim (captura interrompida) é ignorado na leitura e descartado quando a
+gravação é continuada (RecordingWriter), assim como estatísticas
+seguidas de mais revoluções (gravação continuada depois de fechada).
+"""
+import os
+import sys
+import json
+import time
+import queue
+import struct
+import logging
+import threading
+from datetime import datetime
+from collections import namedtuple
+
+import numpy as np
+
+VERSION = "1.0"
+
+logger = logging.getLogger(__name__)
+
+RECORDING_EXT = ".x2lrec"
+MAGIC = b"X2LREC\0\0"
+FORMAT_VERSION = 1
+
+PREAMBLE = struct.Struct("<8sII")
+BLOCK = struct.Struct("<4sIQfI")
+BLOCK_TAG = b"REV\0"
+STATS_TAG = b"STA\0"
+
+LASER_CONFIG_FIELDS = ('min_angle', 'max_angle', 'angle_increment', 'time_increment',
+                       'scan_time', 'min_range', 'max_range')
+
+RecordedRevolution = namedtuple('RecordedRevolution', ['stamp', 'altura', 'angle', 'range', 'intensity'])
+
+
+def laser_config_to_dict(config):
+    """Converte um LaserConfig do SDK (ou dict) em dict serializável"""
+    if config is None:
+        return None
+    if isinstance(config, dict):
+        return {k: float(config[k]) for k in LASER_CONFIG_FIELDS if k in config}
+    return {k: float(getattr(config, k)) for k in LASER_CONFIG_FIELDS if hasattr(config, k)}
+
+
+def is_recording(path):
+    """Verifica pela extensão se o arquivo é uma gravação binária"""
+    return str(path).lower().endswith(RECORDING_EXT)
+
+
+def recording_size(path):
+    """Bytes de uma gravação: arquivo .x2lrec ou diretório de sessão (dataset Parquet)"""
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def encode_revolution(stamp, angle, distance, intensity=None, altura=None):
+    """Serializa uma revolução como bloco binário"""
+    n = len(distance)
+    if intensity is None:
+        intensity = np.zeros(n, dtype=np.float32)
+    parts = [BLOCK.pack(BLOCK_TAG, n, int(stamp), float('nan') if altura is None else float(altura), 0)]
+    for column in (angle, distance, intensity):
+        parts.append(np.ascontiguousarray(column, dtype='<f4').tobytes())
+    return b''.join(parts)
+
+
+def encode_columns(stamp, colunas):
+    """Serializa uma revolução no formato de colunas de lidar_capture"""
+    altura = colunas['altura'][0] if 'altura' in colunas and len(colunas['altura']) else None
+    return encode_revolution(stamp, colunas['angulo'], colunas['distancia'], colunas.get('intensidade'), altura)
+
+
+def decode_blocks(buffer):
+    """Revoluções (RecordedRevolution) de blocos serializados concatenados"""
+    buffer = memoryview(buffer)
+    pos = 0
+    while pos + BLOCK.size <= len(buffer):
+        tag, n, stamp, altura, _ = BLOCK.unpack_from(buffer, pos)
+        if tag != BLOCK_TAG:
+            raise ValueError(f"Bloco inválido na posição {pos}")
+        pos += BLOCK.size
+        angle, distance, intensity = np.frombuffer(buffer, dtype='<f4', count=3 * n, offset=pos).reshape(3, n)
+        pos += 12 * n
+        yield RecordedRevolution(stamp, None if np.isnan(altura) else float(altura), angle, distance, intensity)
+
+
+class RecordingWriter:
+    """Escreve revoluções em uma gravação binária (append-only)"""
+
+    def __init__(self, path, laser_config=None, settings=None, extra=None):
+        self.path = path
+        self.revolutions = 0
+        self.points = 0
+        self.resumed = False
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            # Continuar gravação existente; o cabeçalho original é mantido e
+            # um bloco incompleto no fim (captura interrompida) é descartado,
+            # senão os blocos novos ficariam depois dele, ilegíveis
+            self._file = open(path, 'r+b')
+            try:
+                end, self.revolutions, self.points = self._scan_existing()
+            except Exception:
+                self._file.close()
+                raise
+            self._file.truncate(end)
+            self._file.seek(end)
+            self.resumed = True
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(path, 'wb')
+            self._write_header(laser_config, settings, extra)
+
+    def _scan_existing(self):
+        """Fim do último bloco de revolução completo, revoluções e pontos já gravados
+
+        Estatísticas no fim também são descartadas: cobririam só a parte antiga.
+        """
+        f = self._file
+        preamble = f.read(PREAMBLE.size)
+        if len(preamble) < PREAMBLE.size:
+            raise ValueError(f"Arquivo não é uma gravação compatível: {self.path}")
+        magic, version, header_len = PREAMBLE.unpack(preamble)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Arquivo não é uma gravação compatível: {self.path}")
+        size = f.seek(0, os.SEEK_END)
+        pos = end = PREAMBLE.size + header_len
+        revolutions = points = 0
+        while pos + BLOCK.size <= size:
+            f.seek(pos)
+            tag, n, _, _, _ = BLOCK.unpack(f.read(BLOCK.size))
+            if tag == STATS_TAG:
+                pos += BLOCK.size + n
+                continue
+            if tag != BLOCK_TAG or pos + BLOCK.size + 12 * n > size:
+                break
+            pos = end = pos + BLOCK.size + 12 * n
+            revolutions += 1
+            points += n
+        return end, revolutions, points
+
+    def _write_header(self, laser_config, settings, extra):
+        header = {
+            'format': 'x2lrec',
+            'version': FORMAT_VERSION,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'laser_config': laser_config_to_dict(laser_config),
+            'settings': dict(settings) if settings else None,
+        }
+        if extra:
+            header.update(extra)
+        payload = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        payload += b' ' * (-(PREAMBLE.size + len(payload)) % 8)
+        self._file.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(payload)))
+        self._file.write(payload)
+
+    def write(self, stamp, angle, distance, intensity=None, altura=None):
+        """Anexa uma revolução"""
+        self.write_block(encode_revolution(stamp, angle, distance, intensity, altura), points=len(distance))
+
+    def write_columns(self, stamp, colunas):
+        """Anexa uma revolução no formato de colunas de lidar_capture"""
+        self.write_block(encode_columns(stamp, colunas), points=len(colunas['distancia']))
+
+    def write_block(self, block, revolutions=1, points=0):
+        """Anexa um ou mais blocos já serializados"""
+        self._file.write(block)
+        self.revolutions += revolutions
+        self.points += points
+
+    def write_stats(self, stats):
+        """Anexa as estatísticas da captura (CaptureStats) depois da última revolução"""
+        payload = stats.to_json().encode('utf-8')
+        self._file.write(BLOCK.pack(STATS_TAG, len(payload), 0, float('nan'), 0) + payload)
+
+    def flush(self):
+        self._file.flush()
+
+    def fsync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+_STOP = object()
+
+
+class StreamingRecorder:
+    """Grava revoluções no disco durante a captura
+
+    append() serializa a revolução e a coloca em uma fila limitada; uma
+    thread de fundo grava os blocos em lotes (batch_size) e faz flush a
+    cada flush_interval segundos e, se fsync_interval for informado,
+    os.fsync nesse intervalo. A memória fica constante em qualquer duração
+    de sessão e, como o formato é append-only, uma sessão interrompida
+    continua legível até o último bloco completo.
+
+    O arquivo só é criado na primeira revolução, quando o LaserConfig já
+    é conhecido.
+
+    Com stats (lidar_stats.CaptureStats), cada revolução também é acumulada
+    nas estatísticas, que close() grava junto com a gravação (writer.write_stats).
+    """
+
+    def __init__(self, path, laser_config=None, settings=None, extra=None,
+                 batch_size=16, flush_interval=0.5, fsync_interval=None, max_pending=256,
+                 metrics=None, stats=None):
+        self.path = path
+        self.laser_config = laser_config
+        self.settings = settings
+        self.extra = extra
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.stats = stats
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.gauge('recorder_queue_depth', self._queue.qsize)
+        self._writer = None
+        self._thread = None
+        self._closed = False
+        self.error = None
+
+        # Contadores (revoluções aceitas e gravadas)
+        self.revolutions = 0
+        self.points = 0
+
+    def _create_writer(self, laser_config):
+        """Destino dos blocos: qualquer objeto com write_block/flush/fsync/close"""
+        return RecordingWriter(self.path, laser_config=laser_config, settings=self.settings, extra=self.extra)
+
+    def _open(self, laser_config):
+        self._writer = self._create_writer(laser_config or self.laser_config)
+        self._thread = threading.Thread(target=self._run, name="StreamingRecorder", daemon=True)
+        self._thread.start()
+
+    def append(self, stamp, colunas, laser_config=None):
+        """Enfileira uma revolução (colunas de lidar_capture) para gravação"""
+        if self._closed:
+            raise ValueError("Gravação já encerrada")
+        if self.error is not None:
+            raise IOError(f"Falha na gravação de {self.path}: {self.error}")
+        if self._writer is None:
+            self._open(laser_config)
+
+        # Bloqueia se o disco estiver mais lento que a captura (fila cheia)
+        self._queue.put((encode_columns(stamp, colunas), len(colunas['distancia'])))
+        self.revolutions += 1
+        self.points += len(colunas['distancia'])
+        if self.stats is not None:
+            self.stats.update(colunas)
+
+    def _run(self):
+        last_fsync = time.monotonic()
+        pending_fsync = False
+        stop = False
+        while not stop:
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            if batch and batch[-1] is _STOP:
+                batch.pop()
+                stop = True
+
+            if batch and self.error is None:
+                try:
+                    t0 = time.perf_counter_ns()
+                    self._writer.write_block(b''.join(block for block, _ in batch),
+                                             revolutions=len(batch),
+                                             points=sum(n for _, n in batch))
+                    self._writer.flush()
+                    pending_fsync = True
+                    if self.metrics is not None:
+                        self.metrics.observe('escrita', time.perf_counter_ns() - t0)
+                        self.metrics.count('written_revolutions', len(batch))
+                except Exception as e:
+                    self.error = e
+                    logger.error(f"Erro ao gravar {self.path}: {e}")
+
+            now = time.monotonic()
+            if (pending_fsync and self.fsync_interval is not None and self.error is None
+                    and (stop or now - last_fsync >= self.fsync_interval)):
+                try:
+                    t0 = time.perf_counter_ns()
+                    self._writer.fsync()
+                    if self.metrics is not None:
+                        self.metrics.observe('fsync', time.perf_counter_ns() - t0)
+                except OSError as e:
+                    self.error = e
+                    logger.error(f"Erro no fsync de {self.path}: {e}")
+                last_fsync = now
+                pending_fsync = False
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def close(self):
+        """Grava o que estiver pendente e fecha o arquivo; retorna o caminho ou None"""
+        if self._closed:
+            return self.path if self._writer is not None else None
+        self._closed = True
+        if self._writer is None:
+            return None
+        self._queue.put(_STOP)
+        self._thread.join()
+        # Estatísticas de uma gravação continuada cobririam só a continuação
+        if self.stats is not None and self.error is None and not getattr(self._writer, 'resumed', False):
+            try:
+                self._writer.write_stats(self.stats)
+            except Exception as e:
+                self.error = e
+                logger.error(f"Erro ao gravar estatísticas de {self.path}: {e}")
+        self._writer.close()
+        if self.error is not None:
+            raise IOError(f"Falha na gravação de {self.path}: {self.error}")
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class RecordingReader:
+    """Lê uma gravação binária via memory-map, sem parsing dos pontos
+
+    O índice de blocos (offsets, contagens, stamps, alturas) é montado
+    percorrendo apenas os cabeçalhos de cada revolução.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._mm = np.memmap(path, dtype=np.uint8, mode='r')
+        if len(self._mm) < PREAMBLE.size:
+            raise ValueError(f"Gravação vazia ou truncada: {path}")
+
+        magic, version, header_len = PREAMBLE.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Arquivo não é uma gravação .x2lrec: {path}")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Versão de gravação não suportada: {version}")
+
+        start = PREAMBLE.size
+        self.header = json.loads(bytes(self._mm[start:start + header_len]).decode('utf-8'))
+        self._data_start = start + header_len
+        self._build_index()
+
+    def _build_index(self):
+        offsets, counts, stamps, alturas = [], [], [], []
+        self._stats_block = None
+        size = len(self._mm)
+        pos = self._data_start
+        while pos + BLOCK.size <= size:
+            tag, n, stamp, altura, _ = BLOCK.unpack_from(self._mm, pos)
+            if tag == STATS_TAG:
+                end = pos + BLOCK.size + n
+                if end > size:
+                    break
+                self._stats_block = (pos + BLOCK.size, n)
+                pos = end
+                continue
+            end = pos + BLOCK.size + 12 * n
+            if tag != BLOCK_TAG or end > size:
+                break  # bloco incompleto ou corrompido no fim do arquivo
+            self._stats_block = None  # só valem estatísticas depois da última revolução
+            offsets.append(pos + BLOCK.size)
+            counts.append(n)
+            stamps.append(stamp)
+            alturas.append(altura)
+            pos = end
+
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.counts = np.array(counts, dtype=np.int64)
+        self.stamps = np.array(stamps, dtype=np.uint64)
+        self.alturas = np.array(alturas, dtype=np.float32)
+        self.complete = pos == size
+
+    @property
+    def laser_config(self):
+        return self.header.get('laser_config')
+
+    @property
+    def settings(self):
+        return self.header.get('settings')
+
+    @property
+    def num_points(self):
+        return int(self.counts.sum())
+
+    @property
+    def stats(self):
+        """CaptureStats gravadas com a captura, ou None"""
+        if self._stats_block is None:
+            return None
+        from lidar_stats import CaptureStats
+
+        start, n = self._stats_block
+        try:
+            return CaptureStats.from_json(bytes(self._mm[start:start + n]).decode('utf-8'))
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Estatísticas inválidas em {self.path}: {e}")
+            return None
+
+    @property
+    def has_layers(self):
+        return bool(len(self.alturas)) and not np.isnan(self.alturas).all()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _column(self, i, k):
+        n = int(self.counts[i])
+        return np.frombuffer(self._mm, dtype='<f4', count=n, offset=int(self.offsets[i]) + 4 * n * k)
+
+    def revolution(self, i):
+        """Revolução i como views sobre o arquivo mapeado (sem cópia)"""
+        altura = float(self.alturas[i])
+        return RecordedRevolution(int(self.stamps[i]), None if np.isnan(altura) else altura,
+                                  self._column(i, 0), self._column(i, 1), self._column(i, 2))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.revolution(i)
+
+    def columns(self, cartesian=True):
+        """Concatena todas as revoluções em colunas float32 (angulo, distancia, ...)"""
+        total = self.num_points
+        angle = np.empty(total, dtype=np.float32)
+        distance = np.empty(total, dtype=np.float32)
+        intensity = np.empty(total, dtype=np.float32)
+        pos = 0
+        for i in range(len(self)):
+            n = int(self.counts[i])
+            angle[pos:pos + n] = self._column(i, 0)
+            distance[pos:pos + n] = self._column(i, 1)
+            intensity[pos:pos + n] = self._column(i, 2)
+            pos += n
+
+        colunas = {'angulo': angle, 'distancia': distance, 'intensidade': intensity}
+        if self.has_layers:
+            colunas['altura'] = np.repeat(self.alturas, self.counts)
+        if cartesian:
+            colunas['x'] = distance * np.cos(angle)
+            colunas['y'] = distance * np.sin(angle)
+            if 'altura' in colunas:
+                colunas['z'] = colunas['altura']
+        return colunas
+
+    def close(self):
+        # Views já entregues mantêm o mapeamento vivo até serem liberadas
+        self._mm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def detect_angle_units(angle):
+    """'deg' se algum ângulo passa de uma volta em radianos, senão 'rad'"""
+    finite = np.abs(angle[np.isfinite(angle)])
+    return 'deg' if len(finite) and finite.max() > 2 * np.pi + 1e-6 else 'rad'
+
+
+def read_csv_columns(csv_path, angle_units=None):
+    """Lê um CSV dos scripts de captura como dict de colunas float64
+
+    'angulo' sai sempre em radianos: os CSVs reais guardam radianos e os
+    simulados (tests/testes-simulados) graus. angle_units ('rad' ou 'deg')
+    força a unidade do arquivo; None detecta pelo maior ângulo.
+    """
+    with open(csv_path, encoding='utf-8') as f:
+        header = [name.strip().lower() for name in f.readline().split(',')]
+    data = np.loadtxt(csv_path, delimiter=',', skiprows=1, dtype=np.float64, ndmin=2)
+    colunas = {name: data[:, i] for i, name in enumerate(header)}
+    if 'angulo' in colunas:
+        units = angle_units or detect_angle_units(colunas['angulo'])
+        if units == 'deg':
+            colunas['angulo'] = np.radians(colunas['angulo'])
+            logger.info(f"Ângulos de {os.path.basename(csv_path)} em graus, convertidos para radianos")
+        elif units != 'rad':
+            raise ValueError(f"Unidade de ângulo inválida: {units}")
+    return colunas
+
+
+def check_cartesian(colunas, csv_path, tolerance=0.01):
+    """Confere x/y do CSV contra angulo/distancia (já em radianos); a leitura recalcula x/y
+
+    Os scripts de captura reais anteriores ao PolarConverter aplicavam
+    np.radians a ângulos que o driver já entrega em radianos, então os x/y
+    desses CSVs estão errados e o angulo é que vale; só é avisado o que não
+    bate com nenhuma das duas fórmulas.
+    """
+    if not all(name in colunas for name in ('x', 'y', 'angulo', 'distancia')) or not len(colunas['x']):
+        return
+
+    def erro(angle):
+        return float(np.nanmax(np.hypot(colunas['distancia'] * np.cos(angle) - colunas['x'],
+                                        colunas['distancia'] * np.sin(angle) - colunas['y'])))
+
+    if erro(colunas['angulo']) <= tolerance:
+        return
+    nome = os.path.basename(csv_path)
+    if erro(np.radians(colunas['angulo'])) <= tolerance:
+        logger.info(f"x/y de {nome} calculados com np.radians sobre radianos; recalculados de angulo/distancia")
+    else:
+        logger.warning(f"x/y de {nome} diferem até {erro(colunas['angulo']):.3f}m de angulo/distancia; "
+                       f"verifique a unidade dos ângulos (angle_units)")
+
+
+def revolution_breaks(angle, altura=None):
+    """Índices onde começa uma nova revolução (ângulo volta ou altura muda)"""
+    breaks = np.flatnonzero(np.diff(angle) < -np.pi) + 1
+    if altura is not None:
+        breaks = np.union1d(breaks, np.flatnonzero(np.diff(altura) != 0) + 1)
+    return breaks
+
+
+def convert_csv(csv_path, out_path=None, settings=None, angle_units=None):
+    """Converte CSV (x,y,angulo,distancia ou altura,angulo,distancia,x,y,z) para .x2lrec
+
+    O CSV não guarda stamps nem limites de revolução; as revoluções são
+    separadas quando o ângulo volta ao início ou a altura muda. x/y não são
+    gravados (a leitura recalcula de angulo/distancia); angle_units como em
+    read_csv_columns.
+    """
+    colunas = read_csv_columns(csv_path, angle_units)
+    if 'angulo' not in colunas or 'distancia' not in colunas:
+        raise ValueError(f"Colunas 'angulo' e 'distancia' não encontradas em {csv_path}")
+    check_cartesian(colunas, csv_path)
+
+    angle = colunas['angulo']
+    distance = colunas['distancia']
+    intensity = colunas.get('intensidade', colunas.get('intensity'))
+    altura = colunas.get('altura')
+
+    if out_path is None:
+        out_path = os.path.splitext(csv_path)[0] + RECORDING_EXT
+    if os.path.exists(out_path):
+        os.remove(out_path)
+
+    bounds = np.concatenate(([0], revolution_breaks(angle, altura), [len(angle)]))
+    extra = {'source': os.path.basename(csv_path)}
+    with RecordingWriter(out_path, settings=settings, extra=extra) as writer:
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if end <= start:
+                continue
+            writer.write(0, angle[start:end], distance[start:end],
+                         None if intensity is None else intensity[start:end],
+                         None if altura is None else altura[start])
+    return out_path
+
+
+if __name__ == "__main__":
+    arquivos = sys.argv[1:] or [input("📁 Arquivo CSV para converter: ").strip()]
+    for arquivo in arquivos:
+        destino = convert_csv(arquivo)
+        with RecordingReader(destino) as reader:
+            print(f"✅ {arquivo} -> {destino} ({len(reader)} revoluções, {reader.num_points} pontos, "
+                  f"{os.path.getsize(arquivo)} -> {os.path.getsize(destino)} bytes)")
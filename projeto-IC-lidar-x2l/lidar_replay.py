@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+import sys
+import time
+import logging
+from types import SimpleNamespace
+
+import numpy as np
+
+from lidar_config import LidarConfig, loaded_ydlidar
+from lidar_recording import (RecordingReader, is_recording, read_csv_columns,
+                             revolution_breaks, LASER_CONFIG_FIELDS)
+
+VERSION = "1.0"
+
+logger = logging.getLogger(__name__)
+
+# Frequência usada quando a gravação não tem stamps nem foi configurada (Hz)
+DEFAULT_SCAN_FREQUENCY = 6.0
+
+POINT_DTYPE = np.dtype([('angle', '<f4'), ('range', '<f4'), ('intensity', '<f4')])
+
+
+class ReplayPoint:
+    """Ponto com a mesma interface de ydlidar.LaserPoint"""
+    __slots__ = ('angle', 'range', 'intensity')
+
+    def __init__(self, angle, range_val, intensity=0.0):
+        self.angle = angle
+        self.range = range_val
+        self.intensity = intensity
+
+
+class ReplayScan:
+    """LaserScan para reprodução: expõe points_array() como o binding do SDK
+
+    A lista `points` só é montada se algum código ainda iterar ponto a ponto.
+    """
+
+    def __init__(self):
+        self.stamp = 0
+        self.altura = None
+        self.config = None
+        self._points = np.empty(0, dtype=POINT_DTYPE)
+        self._list = None
+
+    def _load(self, stamp, altura, config, angle, distance, intensity):
+        points = np.empty(len(distance), dtype=POINT_DTYPE)
+        points['angle'] = angle
+        points['range'] = distance
+        points['intensity'] = intensity
+        self.stamp = stamp
+        self.altura = altura
+        self.config = config
+        self._points = points
+        self._list = None
+
+    def points_array(self):
+        return self._points
+
+    @property
+    def points(self):
+        if self._list is None:
+            p = self._points
+            self._list = [ReplayPoint(float(a), float(r), float(i))
+                          for a, r, i in zip(p['angle'], p['range'], p['intensity'])]
+        return self._list
+
+
+def fill_scan(scan, stamp, altura, config, angle, distance, intensity):
+    """Preenche um ReplayScan, um ydlidar.LaserScan ou um scan simulado com uma revolução"""
+    if isinstance(scan, ReplayScan):
+        scan._load(stamp, altura, config, angle, distance, intensity)
+        return
+
+    scan.stamp = stamp
+    # Um ydlidar.LaserScan só existe se a extensão já foi carregada
+    ydlidar = loaded_ydlidar()
+    if ydlidar is not None and isinstance(scan, ydlidar.LaserScan):
+        # LaserConfig da gravação (stamps_array usa time_increment)
+        if config is not None:
+            for field in LASER_CONFIG_FIELDS:
+                setattr(scan.config, field, float(getattr(config, field)))
+        # Pontos em lote: redimensiona o vetor C++ e escreve pela view NumPy
+        scan.points.resize(len(distance))
+        points = scan.points_array()
+        points['angle'] = angle
+        points['range'] = distance
+        points['intensity'] = intensity
+    else:
+        scan.points = [ReplayPoint(float(a), float(r), float(i))
+                       for a, r, i in zip(angle, distance, intensity)]
+
+
+def _load_recording(path):
+    """(stamps, alturas, revoluções, laser_config) de uma gravação .x2lrec"""
+    reader = RecordingReader(path)
+    recorded = list(reader)
+    revolutions = [(rev.angle, rev.range, rev.intensity) for rev in recorded]
+    alturas = [rev.altura for rev in recorded]
+    return reader.stamps.copy(), alturas, revolutions, reader.laser_config
+
+
+def _load_csv(path):
+    """(stamps, alturas, revoluções, laser_config) de um CSV de captura (sem stamps)"""
+    colunas = read_csv_columns(path)
+    angle = colunas['angulo'].astype(np.float32)
+    distance = colunas['distancia'].astype(np.float32)
+    altura = colunas.get('altura')
+    bounds = [0, *revolution_breaks(angle, altura), len(angle)]
+    revolutions, alturas = [], []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        if end > start:
+            revolutions.append((angle[start:end], distance[start:end],
+                                np.zeros(end - start, dtype=np.float32)))
+            alturas.append(None if altura is None else float(altura[start]))
+    return None, alturas, revolutions, None
+
+
+class ReplayLidar:
+    """Dispositivo de reprodução com a interface do ydlidar.CYdLidar
+
+    Reproduz uma gravação .x2lrec ou um CSV de captura revolução a revolução.
+    Em tempo real (realtime=True) respeita os stamps gravados, ou a
+    frequência de scan configurada quando não há stamps; speed acelera ou
+    desacelera a reprodução. Com realtime=False entrega o mais rápido
+    possível. Ao fim da gravação doProcessSimple espera `timeout` e retorna
+    False, como o driver sem dados (ou recomeça, com loop=True).
+
+    Uso:
+        lidar = ReplayLidar("data/pontos-reais/pontos-....x2lrec", realtime=False)
+        stream = ScanStream(lidar, scan_factory=ReplayScan)
+    """
+
+    def __init__(self, source, realtime=True, speed=1.0, loop=False, timeout=0.1):
+        if speed <= 0:
+            raise ValueError("speed deve ser positivo")
+        self.source = source
+        self.realtime = realtime
+        self.speed = speed
+        self.loop = loop
+        self.timeout = timeout
+        self.options = {}
+
+        self._stamps = None
+        self._alturas = []
+        self._revolutions = []
+        self._config = None
+        self._use_stamps = False
+        self._on = False
+        self._index = 0
+        self._t0 = 0.0
+
+        # Contadores
+        self.revolutions = 0
+        self.laps = 0
+
+    # ------------------------------------------------------------------
+    # Interface CYdLidar
+    # ------------------------------------------------------------------
+    def setlidaropt(self, optname, value):
+        self.options[optname] = value
+        return True
+
+    def initialize(self):
+        try:
+            if is_recording(self.source):
+                loaded = _load_recording(self.source)
+            else:
+                loaded = _load_csv(self.source)
+        except Exception as e:
+            logger.error(f"Erro ao abrir gravação {self.source}: {e}")
+            return False
+        self._stamps, self._alturas, self._revolutions, config = loaded
+        self._use_stamps = self._timed_by_stamps()
+        self._config = SimpleNamespace(**{k: config.get(k, 0.0) for k in LASER_CONFIG_FIELDS}) if config else None
+        if not self._revolutions:
+            logger.error(f"Gravação sem revoluções: {self.source}")
+            return False
+        logger.info(f"Reprodução: {len(self._revolutions)} revoluções de {self.source}")
+        return True
+
+    def turnOn(self):
+        if not self._revolutions:
+            return False
+        self._on = True
+        self._index = 0
+        self._t0 = time.monotonic()
+        return True
+
+    def doProcessSimple(self, scan):
+        if not self._on:
+            return False
+        if self._index >= len(self._revolutions):
+            if not self.loop:
+                time.sleep(self.timeout)
+                return False
+            self._index = 0
+            self.laps += 1
+            self._t0 = time.monotonic()
+
+        i = self._index
+        if self.realtime:
+            delay = self._t0 + self._offset(i) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+        angle, distance, intensity = self._revolutions[i]
+        fill_scan(scan, self._stamp(i), self._alturas[i], self._config, angle, distance, intensity)
+        self._index += 1
+        self.revolutions += 1
+        return True
+
+    def turnOff(self):
+        self._on = False
+        return True
+
+    def disconnecting(self):
+        self._on = False
+        self._revolutions = []
+        return True
+
+    # ------------------------------------------------------------------
+    # Temporização
+    # ------------------------------------------------------------------
+    @property
+    def scan_frequency(self):
+        """Frequência configurada via setlidaropt (ou DEFAULT_SCAN_FREQUENCY)"""
+        prop = LidarConfig.get_lidar_constants(load=False)["prop_scan_frequency"]
+        return float(self.options.get(prop, DEFAULT_SCAN_FREQUENCY)) or DEFAULT_SCAN_FREQUENCY
+
+    def _timed_by_stamps(self):
+        """Stamps gravados servem de relógio se existirem e forem crescentes"""
+        stamps = self._stamps
+        return (stamps is not None and len(stamps) > 1 and stamps[0] > 0
+                and bool((np.diff(stamps.astype(np.int64)) >= 0).all()))
+
+    def _offset(self, i):
+        """Segundos desde o início da reprodução em que a revolução i é entregue"""
+        if self._use_stamps:
+            return (int(self._stamps[i]) - int(self._stamps[0])) / 1e9 / self.speed
+        return i / self.scan_frequency / self.speed
+
+    def _stamp(self, i):
+        if self._stamps is not None:
+            return int(self._stamps[i])
+        return int(i * 1e9 / self.scan_frequency)
+
+    @property
+    def finished(self):
+        return not self.loop and self._index >= len(self._revolutions)
+
+
+def replay_throughput(path):
+    """Reproduz uma gravação o mais rápido possível; (revoluções, pontos, segundos) ou None"""
+    from lidar_capture import scan_to_arrays
+
+    lidar = ReplayLidar(path, realtime=False)
+    if not lidar.initialize() or not lidar.turnOn():
+        return None
+    scan = ReplayScan()
+    points = 0
+    t0 = time.perf_counter()
+    while not lidar.finished and lidar.doProcessSimple(scan):
+        points += len(scan_to_arrays(scan)[1])
+    elapsed = time.perf_counter() - t0
+    lidar.turnOff()
+    lidar.disconnecting()
+    return lidar.revolutions, points, elapsed
+
+
+if __name__ == "__main__":
+    # Reproduz gravações o mais rápido possível e mede a vazão do pipeline de leitura
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    for path in sys.argv[1:]:
+        result = replay_throughput(path)
+        if result is None:
+            continue
+        revolutions, points, elapsed = result
+        print(f"{path}: {revolutions} revoluções, {points} pontos em {elapsed:.3f}s "
+              f"({revolutions / elapsed:.0f} rev/s)")
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""Simulador vetorizado de revoluções do X2L por ray-casting em uma cena 2.5D
+
+A cena é uma lista de objetos (paredes, cilindros e sólidos de revolução
+com perfil raio x altura). Cada revolução é um feixe de raios horizontais
+na altura do LiDAR; todas as revoluções/camadas de um lote são lançadas
+de uma vez como arrays (camadas x pontos).
+"""
+import sys
+import time
+import logging
+
+import numpy as np
+
+from lidar_replay import fill_scan
+
+VERSION = "1.0"
+
+logger = logging.getLogger(__name__)
+
+# Características do X2L (datasheet)
+X2L_RANGE_MIN = 0.12
+X2L_RANGE_MAX = 8.0
+X2L_SAMPLE_RATE = 3000
+X2L_SCAN_FREQUENCY = 6.0
+
+# Perfil (altura m, raio m) do jarro das simulações antigas
+JAR_PROFILE = ((0.0, 0.08), (0.08, 0.08), (0.20, 0.05), (0.35, 0.045), (0.50, 0.07))
+
+
+def _in_height(z, z_min, z_max):
+    return (z >= z_min) & (z <= z_max)
+
+
+def _circle_hit(ox, oy, dx, dy, cx, cy, r):
+    """Distância até a circunferência (primeira interseção à frente do raio)"""
+    fx = cx - ox
+    fy = cy - oy
+    b = fx * dx + fy * dy
+    disc = b * b - (fx * fx + fy * fy - r * r)
+    sq = np.sqrt(np.maximum(disc, 0.0))
+    near = b - sq
+    t = np.where(near > 0, near, b + sq)  # origem dentro do círculo: saída
+    return np.where((disc >= 0) & (t > 0), t, np.inf)
+
+
+class Wall:
+    """Segmento de parede vertical entre p1 e p2 (x, y), opcionalmente limitado em altura"""
+
+    def __init__(self, p1, p2, z_min=-np.inf, z_max=np.inf):
+        self.p1 = p1
+        self.p2 = p2
+        self.z_min = z_min
+        self.z_max = z_max
+
+    def intersect(self, ox, oy, dx, dy, z):
+        (x1, y1), (x2, y2) = self.p1, self.p2
+        ex, ey = x2 - x1, y2 - y1
+        wx, wy = x1 - ox, y1 - oy
+        with np.errstate(divide='ignore', invalid='ignore'):
+            denom = dx * ey - dy * ex
+            t = (wx * ey - wy * ex) / denom
+            s = (wx * dy - wy * dx) / denom
+        hit = (t > 0) & (s >= 0) & (s <= 1) & _in_height(z, self.z_min, self.z_max)
+        return np.where(hit, t, np.inf)
+
+
+class Cylinder:
+    """Cilindro vertical (coluna, tubo, ou sala circular com o LiDAR dentro)"""
+
+    def __init__(self, center, radius, z_min=-np.inf, z_max=np.inf):
+        self.center = center
+        self.radius = radius
+        self.z_min = z_min
+        self.z_max = z_max
+
+    def intersect(self, ox, oy, dx, dy, z):
+        t = _circle_hit(ox, oy, dx, dy, self.center[0], self.center[1], self.radius)
+        return np.where(_in_height(z, self.z_min, self.z_max), t, np.inf)
+
+
+class SolidOfRevolution:
+    """Sólido de revolução de eixo vertical com perfil raio(altura) interpolado linearmente"""
+
+    def __init__(self, center, profile):
+        self.center = center
+        profile = np.asarray(profile, dtype=np.float64)
+        self.heights = profile[:, 0]
+        self.radii = profile[:, 1]
+
+    def intersect(self, ox, oy, dx, dy, z):
+        r = np.interp(z, self.heights, self.radii, left=np.nan, right=np.nan)
+        with np.errstate(invalid='ignore'):
+            t = _circle_hit(ox, oy, dx, dy, self.center[0], self.center[1], r)
+        return np.where(np.isnan(r), np.inf, t)
+
+
+class Scene:
+    """Conjunto de objetos; cast() devolve a distância ao objeto mais próximo (inf sem retorno)"""
+
+    def __init__(self, objects=()):
+        self.objects = list(objects)
+
+    def add(self, obj):
+        self.objects.append(obj)
+        return self
+
+    def cast(self, angles, alturas=0.0, origin=(0.0, 0.0), yaw=0.0):
+        """Lança raios nos ângulos dados (rad); alturas por linha para lotes 2-D"""
+        angles = np.asarray(angles, dtype=np.float64)
+        z = np.asarray(alturas, dtype=np.float64)
+        if angles.ndim == 2 and z.ndim == 1:
+            z = z[:, None]
+        dx = np.cos(angles + yaw)
+        dy = np.sin(angles + yaw)
+        t = np.full(angles.shape, np.inf)
+        for obj in self.objects:
+            np.minimum(t, obj.intersect(origin[0], origin[1], dx, dy, z), out=t)
+        return t
+
+
+def room(width, depth, center=(0.0, 0.0)):
+    """Quatro paredes de uma sala retangular centrada em center"""
+    cx, cy = center
+    x0, x1 = cx - width / 2, cx + width / 2
+    y0, y1 = cy - depth / 2, cy + depth / 2
+    return [Wall((x0, y0), (x1, y0)), Wall((x1, y0), (x1, y1)),
+            Wall((x1, y1), (x0, y1)), Wall((x0, y1), (x0, y0))]
+
+
+def default_scene():
+    """Sala 4 x 3 m com o jarro a 0.5 m à frente do LiDAR e uma coluna"""
+    return Scene(room(4.0, 3.0) + [
+        SolidOfRevolution((0.5, 0.0), JAR_PROFILE),
+        Cylinder((-1.0, 0.8), 0.15),
+    ])
+
+
+class ScanSimulator:
+    """Gera revoluções do X2L sobre uma cena com ruído, perdas e jitter angular
+
+    Cada revolução tem sample_rate / scan_frequency pontos igualmente
+    espaçados em [-pi, pi) com fase inicial aleatória, como o driver
+    entrega. O ruído de distância tem desvio noise_sigma + noise_rel * r;
+    pontos fora de [range_min, range_max], sem retorno ou perdidos (dropout)
+    saem com distância 0. O X2L não mede intensidade, que sai zerada.
+    """
+
+    def __init__(self, scene=None, scan_frequency=X2L_SCAN_FREQUENCY, sample_rate=X2L_SAMPLE_RATE,
+                 range_min=X2L_RANGE_MIN, range_max=X2L_RANGE_MAX, noise_sigma=0.005, noise_rel=0.01,
+                 dropout=0.01, angle_jitter=np.radians(0.1), origin=(0.0, 0.0), yaw=0.0, seed=None):
+        self.scene = scene if scene is not None else default_scene()
+        self.scan_frequency = scan_frequency
+        self.points_per_revolution = int(round(sample_rate / scan_frequency))
+        self.range_min = range_min
+        self.range_max = range_max
+        self.noise_sigma = noise_sigma
+        self.noise_rel = noise_rel
+        self.dropout = dropout
+        self.angle_jitter = angle_jitter
+        self.origin = origin
+        self.yaw = yaw
+        self.rng = np.random.default_rng(seed)
+
+    def revolutions(self, alturas):
+        """Lote de revoluções, uma por altura; retorna (angulo, distancia, intensidade) 2-D float32"""
+        alturas = np.atleast_1d(np.asarray(alturas, dtype=np.float64))
+        k, n = len(alturas), self.points_per_revolution
+        step = 2 * np.pi / n
+        rng = self.rng
+
+        angle = np.arange(n) * step - np.pi + rng.uniform(0, step, (k, 1))
+        ray = angle + rng.normal(0.0, self.angle_jitter, (k, n)) if self.angle_jitter else angle
+        t = self.scene.cast(ray, alturas, self.origin, self.yaw)
+
+        hit = np.isfinite(t)
+        t[~hit] = 0.0
+        distance = t + rng.standard_normal((k, n)) * (self.noise_sigma + self.noise_rel * t)
+        valid = hit & (distance >= self.range_min) & (distance <= self.range_max)
+        if self.dropout:
+            valid &= rng.random((k, n)) >= self.dropout
+        distance[~valid] = 0.0
+
+        return (angle.astype(np.float32), distance.astype(np.float32),
+                np.zeros((k, n), dtype=np.float32))
+
+    def revolution(self, altura=0.0):
+        """Uma revolução como arrays 1-D (angulo, distancia, intensidade)"""
+        angle, distance, intensity = self.revolutions([altura])
+        return angle[0], distance[0], intensity[0]
+
+
+class SimulatedLidar:
+    """Dispositivo simulado com a interface do ydlidar.CYdLidar
+
+    Substitui os MockCYdLidar dos testes: doProcessSimple preenche o scan
+    com uma revolução do ScanSimulator na altura atual (atributo altura).
+    Com realtime=True respeita a frequência de scan do simulador.
+    """
+
+    def __init__(self, simulator=None, realtime=True):
+        self.simulator = simulator if simulator is not None else ScanSimulator()
+        self.realtime = realtime
+        self.altura = 0.0
+        self.options = {}
+        self._on = False
+        self._next = 0.0
+
+    def setlidaropt(self, optname, value):
+        self.options[optname] = value
+        return True
+
+    def initialize(self):
+        return True
+
+    def turnOn(self):
+        self._on = True
+        self._next = time.monotonic()
+        return True
+
+    def doProcessSimple(self, scan):
+        if not self._on:
+            return False
+        if self.realtime:
+            self._next += 1.0 / self.simulator.scan_frequency
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        angle, distance, intensity = self.simulator.revolution(self.altura)
+        fill_scan(scan, time.time_ns(), self.altura, None, angle, distance, intensity)
+        return True
+
+    def turnOff(self):
+        self._on = False
+        return True
+
+    def disconnecting(self):
+        self._on = False
+        return True
+
+
+if __name__ == "__main__":
+    # Vazão do simulador: revoluções em lote sobre a cena padrão
+    batch = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    simulator = ScanSimulator(seed=0)
+    alturas = np.linspace(0.0, 0.5, batch)
+    t0 = time.perf_counter()
+    angle, distance, _ = simulator.revolutions(alturas)
+    elapsed = time.perf_counter() - t0
+    total = distance.size
+    print(f"{batch} revoluções, {total} pontos em {elapsed:.3f}s "
+          f"({total / elapsed / 1e6:.1f} M pontos/s, {np.count_nonzero(distance) / total:.1%} válidos)")
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""Índices espaciais para consultas em nuvens de pontos (só NumPy)
+
+GridIndex - grade uniforme (2-D ou 3-D): os pontos são ordenados uma vez
+            pela chave linear da célula; cada consulta busca só as células
+            que tocam a região (searchsorted, O(log n) por célula) e confere
+            a distância exata. Aceita inserção incremental de revoluções.
+KDTree    - kd-tree implícita (permutação + nós em arrays) para k vizinhos
+            e raio em nuvens 3-D de densidade irregular.
+
+Consultas: radius(centro, r), knn(centro, k), box(lo, hi),
+cylinder(centro_xy, r, z_min, z_max) e, no GridIndex, o número de vizinhos
+de todos os pontos (radius_counts) para remoção de outliers.
+"""
+import sys
+import time
+import heapq
+import logging
+
+import numpy as np
+
+VERSION = "1.0"
+
+logger = logging.getLogger(__name__)
+
+# Pendentes acima desta fração do índice principal disparam a fusão
+MERGE_FRACTION = 0.1
+MERGE_MIN = 4096
+
+
+def _ranges_to_indices(starts, stops):
+    """Concatena arange(start, stop) de vários intervalos sem laço"""
+    lengths = stops - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.intp)
+    keep = lengths > 0
+    starts, lengths = starts[keep], lengths[keep]
+    offsets = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+    return np.arange(total, dtype=np.intp) + offsets
+
+
+class GridIndex:
+    """Grade uniforme sobre pontos (n, 2) ou (n, 3)
+
+    A chave de uma célula é o seu índice linear dentro da extensão ocupada
+    no momento da ordenação (sem colisões); células fora dela não têm
+    pontos indexados.
+    """
+
+    def __init__(self, points, cell_size):
+        points = np.asarray(points, dtype=np.float64)
+        if points.ndim != 2 or points.shape[1] not in (2, 3):
+            raise ValueError("points deve ter forma (n, 2) ou (n, 3)")
+        if cell_size <= 0:
+            raise ValueError("cell_size deve ser positivo")
+        self.cell_size = float(cell_size)
+        self.dims = points.shape[1]
+        self.points = points
+        self._build(len(points))
+
+    def _build(self, n):
+        """Ordena os n primeiros pontos pela chave da célula"""
+        cells = self._cells(self.points[:n])
+        self._origin = cells.min(axis=0) if n else np.zeros(self.dims, dtype=np.int64)
+        self._shape = cells.max(axis=0) - self._origin + 1 if n else np.ones(self.dims, dtype=np.int64)
+        keys = self._keys(cells)
+        self._order = np.argsort(keys, kind='stable')
+        self._keys_sorted = keys[self._order]
+        self._indexed = n
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cells(self, points):
+        return np.floor(points / self.cell_size).astype(np.int64)
+
+    def _keys(self, cells):
+        """Índice linear das células; -1 fora da extensão indexada"""
+        rel = cells - self._origin
+        inside = ((rel >= 0) & (rel < self._shape)).all(axis=-1)
+        keys = np.zeros(rel.shape[:-1], dtype=np.int64)
+        for axis in range(self.dims):
+            keys = keys * self._shape[axis] + rel[..., axis]
+        return np.where(inside, keys, -1)
+
+    # ------------------------------------------------------------------
+    # Inserção
+    # ------------------------------------------------------------------
+    def insert(self, points):
+        """Acrescenta pontos (ex.: uma revolução); retorna os índices atribuídos
+
+        Os novos pontos ficam pendentes (busca exaustiva) até passarem de
+        MERGE_FRACTION do índice, quando a ordenação é refeita.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, self.dims)
+        start = len(self.points)
+        self.points = np.concatenate((self.points, points))
+        pending = len(self.points) - self._indexed
+        if pending > max(MERGE_MIN, MERGE_FRACTION * self._indexed):
+            self._build(len(self.points))
+        return np.arange(start, len(self.points))
+
+    def _pending(self):
+        return np.arange(self._indexed, len(self.points))
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def _candidates(self, lo, hi):
+        """Índices dos pontos nas células que tocam a caixa [lo, hi]"""
+        with np.errstate(invalid='ignore', over='ignore'):
+            c_lo = np.floor(np.maximum(np.asarray(lo, dtype=np.float64) / self.cell_size, self._origin))
+            c_hi = np.floor(np.minimum(np.asarray(hi, dtype=np.float64) / self.cell_size,
+                                       self._origin + self._shape - 1))
+        spans = c_hi - c_lo + 1
+        if (spans <= 0).any() or not self._indexed:
+            return self._pending()
+        if np.prod(spans) > self._indexed:
+            # Região maior que o número de pontos: teste direto é mais barato
+            return np.arange(len(self.points))
+        axes = np.meshgrid(*[np.arange(a, b + 1, dtype=np.int64) for a, b in zip(c_lo, c_hi)], indexing='ij')
+        keys = self._keys(np.stack([a.ravel() for a in axes], axis=-1))
+        starts = np.searchsorted(self._keys_sorted, keys, side='left')
+        stops = np.searchsorted(self._keys_sorted, keys, side='right')
+        found = self._order[_ranges_to_indices(starts, stops)]
+        return np.concatenate((found, self._pending()))
+
+    def radius(self, center, r, return_distances=False):
+        """Pontos a distância <= r do centro"""
+        center = np.asarray(center, dtype=np.float64)
+        idx = self._candidates(center - r, center + r)
+        d2 = ((self.points[idx] - center) ** 2).sum(axis=1)
+        keep = d2 <= r * r
+        if return_distances:
+            return idx[keep], np.sqrt(d2[keep])
+        return idx[keep]
+
+    def knn(self, center, k):
+        """k vizinhos mais próximos (índices, distâncias) em ordem crescente"""
+        k = min(k, len(self.points))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        r = self.cell_size
+        while True:
+            idx, dist = self.radius(center, r, return_distances=True)
+            if len(idx) >= k or len(idx) == len(self.points):
+                order = np.argsort(dist, kind='stable')[:k]
+                return idx[order], dist[order]
+            r *= 2
+
+    def box(self, lo, hi):
+        """Pontos dentro da caixa alinhada aos eixos [lo, hi]"""
+        lo = np.asarray(lo, dtype=np.float64)
+        hi = np.asarray(hi, dtype=np.float64)
+        idx = self._candidates(lo, hi)
+        p = self.points[idx]
+        return idx[((p >= lo) & (p <= hi)).all(axis=1)]
+
+    def cylinder(self, center, r, z_min=-np.inf, z_max=np.inf):
+        """Pontos no cilindro vertical de raio r em torno de center (x, y)"""
+        cx, cy = center
+        if self.dims == 2:
+            return self.radius((cx, cy), r)
+        idx = self.box((cx - r, cy - r, z_min), (cx + r, cy + r, z_max))
+        p = self.points[idx]
+        return idx[(p[:, 0] - cx) ** 2 + (p[:, 1] - cy) ** 2 <= r * r]
+
+    def radius_counts(self, r, chunk=200000):
+        """Número de vizinhos (excluindo o próprio ponto) a distância <= r, para todos os pontos
+
+        Requer r <= cell_size: cada ponto só é comparado às 3^D células vizinhas.
+        """
+        if r > self.cell_size:
+            raise ValueError("radius_counts requer r <= cell_size")
+        self._build(len(self.points))
+        points = self.points
+        cells = self._cells(points)
+        counts = np.zeros(len(points), dtype=np.int64)
+        offsets = np.stack(np.meshgrid(*[[-1, 0, 1]] * self.dims, indexing='ij'), axis=-1).reshape(-1, self.dims)
+        r2 = r * r
+        for start in range(0, len(points), chunk):
+            stop = min(start + chunk, len(points))
+            own = np.arange(start, stop)
+            for offset in offsets:
+                keys = self._keys(cells[start:stop] + offset)
+                lo = np.searchsorted(self._keys_sorted, keys, side='left')
+                hi = np.searchsorted(self._keys_sorted, keys, side='right')
+                pairs = _ranges_to_indices(lo, hi)
+                owner = np.repeat(own, hi - lo)
+                other = self._order[pairs]
+                d2 = ((points[owner] - points[other]) ** 2).sum(axis=1)
+                hit = (d2 <= r2) & (owner != other)
+                counts[start:stop] += np.bincount(owner[hit] - start, minlength=stop - start)
+        return counts
+
+    def radius_outliers(self, r, min_neighbors):
+        """Máscara dos pontos com menos de min_neighbors vizinhos a distância <= r"""
+        return self.radius_counts(r) < min_neighbors
+
+
+class KDTree:
+    """kd-tree implícita: nós guardam intervalos de uma permutação dos pontos"""
+
+    def __init__(self, points, leaf_size=32):
+        points = np.asarray(points, dtype=np.float64)
+        if points.ndim != 2:
+            raise ValueError("points deve ter forma (n, d)")
+        self.points = points
+        self.leaf_size = leaf_size
+        n, dims = points.shape
+        perm = np.arange(n)
+        columns = np.ascontiguousarray(points.T)
+        lo_list, hi_list, left_list, right_list = [], [], [], []
+        box_min, box_max = [], []
+
+        # Caixa de cada nó = caixa do pai cortada no plano de divisão (sem reduções por nó)
+        root_min = points.min(axis=0) if n else np.zeros(dims)
+        root_max = points.max(axis=0) if n else np.zeros(dims)
+        stack = [(0, n, -1, False, root_min, root_max)]
+        while stack:
+            lo, hi, parent, is_right, node_min, node_max = stack.pop()
+            node = len(lo_list)
+            if parent >= 0:
+                (right_list if is_right else left_list)[parent] = node
+            box_min.append(node_min)
+            box_max.append(node_max)
+            lo_list.append(lo)
+            hi_list.append(hi)
+            left_list.append(-1)
+            right_list.append(-1)
+            if hi - lo <= leaf_size:
+                continue
+            axis = int(np.argmax(node_max - node_min))
+            mid = (lo + hi) // 2
+            values = columns[axis][perm[lo:hi]]
+            part = np.argpartition(values, mid - lo)
+            perm[lo:hi] = perm[lo:hi][part]
+            split = values[part[mid - lo]]
+            left_max = node_max.copy()
+            left_max[axis] = split
+            right_min = node_min.copy()
+            right_min[axis] = split
+            stack.append((mid, hi, node, True, right_min, node_max))
+            stack.append((lo, mid, node, False, node_min, left_max))
+
+        self._perm = perm
+        self._lo = np.array(lo_list)
+        self._hi = np.array(hi_list)
+        self._left = np.array(left_list)
+        self._right = np.array(right_list)
+        self._min = np.array(box_min)
+        self._max = np.array(box_max)
+
+    def __len__(self):
+        return len(self.points)
+
+    def _box_distance2(self, node, center):
+        gap = np.maximum(self._min[node] - center, 0) + np.maximum(center - self._max[node], 0)
+        return float((gap * gap).sum())
+
+    def radius(self, center, r, return_distances=False):
+        """Pontos a distância <= r do centro"""
+        center = np.asarray(center, dtype=np.float64)
+        r2 = r * r
+        found = []
+        stack = [0] if len(self.points) else []
+        while stack:
+            node = stack.pop()
+            if self._box_distance2(node, center) > r2:
+                continue
+            if self._left[node] < 0:
+                idx = self._perm[self._lo[node]:self._hi[node]]
+                d2 = ((self.points[idx] - center) ** 2).sum(axis=1)
+                keep = d2 <= r2
+                found.append((idx[keep], d2[keep]))
+            else:
+                stack.append(self._left[node])
+                stack.append(self._right[node])
+        if not found:
+            idx, d2 = np.empty(0, dtype=np.intp), np.empty(0)
+        else:
+            idx, d2 = np.concatenate([f[0] for f in found]), np.concatenate([f[1] for f in found])
+        if return_distances:
+            return idx, np.sqrt(d2)
+        return idx
+
+    def knn(self, center, k):
+        """k vizinhos mais próximos (índices, distâncias) em ordem crescente"""
+        center = np.asarray(center, dtype=np.float64)
+        k = min(k, len(self.points))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        best_idx = np.empty(0, dtype=np.intp)
+        best_d2 = np.empty(0)
+        worst = np.inf
+        heap = [(0.0, 0)]
+        while heap:
+            dist2, node = heapq.heappop(heap)
+            if dist2 > worst:
+                break
+            if self._left[node] < 0:
+                idx = self._perm[self._lo[node]:self._hi[node]]
+                d2 = ((self.points[idx] - center) ** 2).sum(axis=1)
+                best_idx = np.concatenate((best_idx, idx))
+                best_d2 = np.concatenate((best_d2, d2))
+                if len(best_d2) > k:
+                    keep = np.argpartition(best_d2, k - 1)[:k]
+                    best_idx, best_d2 = best_idx[keep], best_d2[keep]
+                if len(best_d2) == k:
+                    worst = best_d2.max()
+            else:
+                for child in (self._left[node], self._right[node]):
+                    heapq.heappush(heap, (self._box_distance2(child, center), int(child)))
+        order = np.argsort(best_d2, kind='stable')
+        return best_idx[order], np.sqrt(best_d2[order])
+
+    def box(self, lo, hi):
+        """Pontos dentro da caixa alinhada aos eixos [lo, hi]"""
+        lo = np.asarray(lo, dtype=np.float64)
+        hi = np.asarray(hi, dtype=np.float64)
+        found = []
+        stack = [0] if len(self.points) else []
+        while stack:
+            node = stack.pop()
+            if (self._max[node] < lo).any() or (self._min[node] > hi).any():
+                continue
+            if self._left[node] < 0 or ((self._min[node] >= lo).all() and (self._max[node] <= hi).all()):
+                idx = self._perm[self._lo[node]:self._hi[node]]
+                p = self.points[idx]
+                found.append(idx[((p >= lo) & (p <= hi)).all(axis=1)])
+            else:
+                stack.append(self._left[node])
+                stack.append(self._right[node])
+        return np.concatenate(found) if found else np.empty(0, dtype=np.intp)
+
+    def cylinder(self, center, r, z_min=-np.inf, z_max=np.inf):
+        """Pontos no cilindro vertical de raio r em torno de center (x, y)"""
+        cx, cy = center
+        lo = np.array([cx - r, cy - r, z_min][:self.points.shape[1]])
+        hi = np.array([cx + r, cy + r, z_max][:self.points.shape[1]])
+        idx = self.box(lo, hi)
+        p = self.points[idx]
+        return idx[(p[:, 0] - cx) ** 2 + (p[:, 1] - cy) ** 2 <= r * r]
+
+
+if __name__ == "__main__":
+    # Consultas de raio e k vizinhos contra a busca exaustiva em uma nuvem aleatória
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    queries = 1000
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-2, 2, (n, 3))
+    centers = rng.uniform(-2, 2, (queries, 3))
+
+    t0 = time.perf_counter()
+    grid = GridIndex(points, 0.05)
+    t1 = time.perf_counter()
+    tree = KDTree(points)
+    t2 = time.perf_counter()
+    print(f"{n} pontos: GridIndex em {t1 - t0:.3f}s, KDTree em {t2 - t1:.3f}s")
+
+    for name, index in (("GridIndex", grid), ("KDTree", tree)):
+        t0 = time.perf_counter()
+        for c in centers:
+            index.radius(c, 0.05)
+        t1 = time.perf_counter()
+        for c in centers[:100]:
+            index.knn(c, 16)
+        t2 = time.perf_counter()
+        print(f"{name}: raio {(t1 - t0) / queries * 1e6:.0f} us/consulta, knn {(t2 - t1) / 100 * 1e6:.0f} us/consulta")
+
+    t0 = time.perf_counter()
+    for c in centers[:20]:
+        np.flatnonzero(((points - c) ** 2).sum(axis=1) <= 0.05 ** 2)
+    print(f"Busca exaustiva: {(time.perf_counter() - t0) / 20 * 1e6:.0f} us/consulta")
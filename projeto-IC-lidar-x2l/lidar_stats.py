@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""Estatísticas de captura em uma passada, acumuladas revolução a revolução
+
+CaptureStats mantém, para os pontos com retorno (distância > 0):
+
+    x, y, z, distancia   contagem, mínimo, máximo, média e variância (Welford)
+    quantis              QuantileSketch da distância (erro relativo <= 1%)
+    setores              momentos da distância por setor angular
+    camadas              momentos da distância por altura
+
+Tudo é combinável: merge() de duas capturas (arquivos, threads, processos)
+dá exatamente o mesmo resultado que acumular os pontos de ambas, então
+resumos de sessões enormes não exigem reler os dados. to_dict()/from_dict()
+serializam em JSON (o StreamingRecorder grava no fim do .x2lrec).
+"""
+import json
+import logging
+
+import numpy as np
+
+VERSION = "1.0"
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('x', 'y', 'z', 'distancia')
+DEFAULT_SECTORS = 36  # 10° por setor
+DEFAULT_ACCURACY = 0.01
+SKETCH_MIN_VALUE = 1e-4  # |valor| abaixo disto conta como zero
+SKETCH_MAX_VALUE = 1e4
+
+
+class Moments:
+    """Contagem, mínimo, máximo, média e M2 de `size` grupos
+
+    update() processa um lote de uma vez (média e M2 do lote) e combina
+    com o acumulado pela fórmula de Chan, numericamente estável como o
+    Welford ponto a ponto.
+    """
+
+    def __init__(self, size=1):
+        self.count = np.zeros(size, dtype=np.int64)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+
+    def __len__(self):
+        return len(self.count)
+
+    def update(self, values, groups=None):
+        """Acumula valores (groups: grupo de cada valor; None = grupo 0)"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not len(values):
+            return self
+        size = len(self.count)
+        if groups is None:
+            mean = values.mean()
+            self._combine(np.array([len(values)]), np.array([mean]), np.array([((values - mean) ** 2).sum()]),
+                          np.array([values.min()]), np.array([values.max()]))
+            return self
+        groups = np.asarray(groups, dtype=np.intp).ravel()
+        n = np.bincount(groups, minlength=size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(n > 0, np.bincount(groups, weights=values, minlength=size) / n, 0.0)
+        m2 = np.bincount(groups, weights=(values - mean[groups]) ** 2, minlength=size)
+        lo = np.full(size, np.inf)
+        hi = np.full(size, -np.inf)
+        np.minimum.at(lo, groups, values)
+        np.maximum.at(hi, groups, values)
+        self._combine(n, mean, m2, lo, hi)
+        return self
+
+    def _combine(self, n, mean, m2, lo, hi):
+        total = self.count + n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frac = np.where(total > 0, n / total, 0.0)
+        delta = mean - self.mean
+        self.mean = self.mean + delta * frac
+        self.m2 = self.m2 + m2 + delta * delta * self.count * frac
+        self.count = total
+        self.min = np.minimum(self.min, lo)
+        self.max = np.maximum(self.max, hi)
+
+    def merge(self, other):
+        if len(other) != len(self):
+            raise ValueError(f"Número de grupos diferente: {len(self)} != {len(other)}")
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        return self
+
+    def variance(self, ddof=0):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > ddof, self.m2 / (self.count - ddof), np.nan)
+
+    def std(self, ddof=0):
+        return np.sqrt(self.variance(ddof))
+
+    def summary(self, i=0):
+        """dict do grupo i (None nos campos de grupos vazios)"""
+        if not self.count[i]:
+            return {'count': 0, 'min': None, 'max': None, 'mean': None, 'std': None}
+        return {'count': int(self.count[i]), 'min': float(self.min[i]), 'max': float(self.max[i]),
+                'mean': float(self.mean[i]), 'std': float(self.std()[i])}
+
+    def to_dict(self):
+        return {'count': self.count.tolist(), 'mean': self.mean.tolist(), 'm2': self.m2.tolist(),
+                'min': [None if np.isinf(v) else v for v in self.min.tolist()],
+                'max': [None if np.isinf(v) else v for v in self.max.tolist()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        moments = cls(len(data['count']))
+        moments.count = np.array(data['count'], dtype=np.int64)
+        moments.mean = np.array(data['mean'], dtype=np.float64)
+        moments.m2 = np.array(data['m2'], dtype=np.float64)
+        moments.min = np.array([np.inf if v is None else v for v in data['min']], dtype=np.float64)
+        moments.max = np.array([-np.inf if v is None else v for v in data['max']], dtype=np.float64)
+        return moments
+
+
+class QuantileSketch:
+    """Sketch de quantis com erro relativo limitado (faixas logarítmicas, como o DDSketch)
+
+    Cada |valor| cai na faixa ceil(log_gamma(|valor|)), gamma = (1 + a) / (1 - a);
+    o quantil devolvido está a no máximo `a` (relative_accuracy) do valor
+    exato e nunca sai de [min, max] observados (q=0 e q=1 são exatos). As
+    faixas são fixas, então merge() é a soma das contagens.
+    """
+
+    def __init__(self, relative_accuracy=DEFAULT_ACCURACY, min_value=SKETCH_MIN_VALUE, max_value=SKETCH_MAX_VALUE):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy deve estar em (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = np.log(self.gamma)
+        self._offset = int(np.floor(np.log(min_value) / self._log_gamma))
+        size = int(np.ceil(np.log(max_value) / self._log_gamma)) - self._offset + 1
+        self.positive = np.zeros(size, dtype=np.int64)
+        self.negative = np.zeros(size, dtype=np.int64)
+        self.zero = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self):
+        return int(self.positive.sum() + self.negative.sum() + self.zero)
+
+    def _bins(self, magnitudes):
+        index = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.intp) - self._offset
+        return np.clip(index, 0, len(self.positive) - 1)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[np.isfinite(values)]
+        if len(values):
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+        size = len(self.positive)
+        pos = values[values > self.min_value]
+        neg = -values[values < -self.min_value]
+        self.positive += np.bincount(self._bins(pos), minlength=size)
+        self.negative += np.bincount(self._bins(neg), minlength=size)
+        self.zero += len(values) - len(pos) - len(neg)
+        return self
+
+    def _check_compatible(self, other):
+        if (other.relative_accuracy, other.min_value, other.max_value) != \
+                (self.relative_accuracy, self.min_value, self.max_value):
+            raise ValueError("Sketches com parâmetros diferentes não podem ser combinados")
+
+    def merge(self, other):
+        self._check_compatible(other)
+        self.positive += other.positive
+        self.negative += other.negative
+        self.zero += other.zero
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _value(self, index):
+        # Ponto da faixa com erro relativo simétrico: 2 gamma^i / (gamma + 1)
+        return 2.0 * self.gamma ** (np.asarray(index) + self._offset) / (self.gamma + 1)
+
+    def quantiles(self, qs):
+        """Quantis (q em [0, 1]); nan se vazio"""
+        qs = np.asarray(qs, dtype=np.float64)
+        total = self.count
+        if not total:
+            return np.full(qs.shape, np.nan)
+        size = len(self.positive)
+        # Ordem crescente: negativos (maior magnitude primeiro), zero, positivos
+        counts = np.concatenate((self.negative[::-1], [self.zero], self.positive))
+        k = np.searchsorted(np.cumsum(counts), np.clip(qs, 0, 1) * (total - 1), side='right')
+        out = np.zeros(qs.shape)
+        neg = k < size
+        pos = k > size
+        out[neg] = -self._value(size - 1 - k[neg])
+        out[pos] = self._value(k[pos] - size - 1)
+        # O ponto da faixa pode passar dos extremos observados
+        out = np.clip(out, self.min, self.max)
+        out[qs <= 0] = self.min
+        out[qs >= 1] = self.max
+        return out
+
+    def quantile(self, q):
+        return float(self.quantiles([q])[0])
+
+    def to_dict(self):
+        return {'relative_accuracy': self.relative_accuracy, 'min_value': self.min_value,
+                'max_value': self.max_value, 'zero': int(self.zero),
+                'min': None if np.isinf(self.min) else self.min,
+                'max': None if np.isinf(self.max) else self.max,
+                'positive': [[int(i), int(self.positive[i])] for i in np.flatnonzero(self.positive)],
+                'negative': [[int(i), int(self.negative[i])] for i in np.flatnonzero(self.negative)]}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['relative_accuracy'], data['min_value'], data['max_value'])
+        sketch.zero = data['zero']
+        if data.get('min') is not None:
+            sketch.min, sketch.max = data['min'], data['max']
+        for i, c in data['positive']:
+            sketch.positive[i] = c
+        for i, c in data['negative']:
+            sketch.negative[i] = c
+        return sketch
+
+
+class CaptureStats:
+    """Estatísticas combináveis de uma captura (pontos com retorno)"""
+
+    def __init__(self, sectors=DEFAULT_SECTORS, relative_accuracy=DEFAULT_ACCURACY):
+        self.points = 0       # todos os pontos, com ou sem retorno
+        self.revolutions = 0
+        self.fields = {name: Moments() for name in FIELDS}
+        self.sketch = QuantileSketch(relative_accuracy)
+        self.sectors = Moments(sectors)
+        self.layers = {}      # altura -> Moments da distância
+
+    @property
+    def returns(self):
+        return int(self.fields['distancia'].count[0])
+
+    def sector_of(self, angle):
+        """Setor de cada ângulo (rad, qualquer volta); o setor 0 começa em -pi"""
+        n = len(self.sectors)
+        s = np.floor((np.asarray(angle, dtype=np.float64) + np.pi) * (n / (2 * np.pi)))
+        return np.mod(s, n).astype(np.intp)
+
+    def _layer(self, altura):
+        key = float(np.float32(altura))
+        if key not in self.layers:
+            self.layers[key] = Moments()
+        return self.layers[key]
+
+    def update(self, colunas, revolutions=1):
+        """Acumula uma revolução (ou um lote) no formato de colunas de lidar_capture"""
+        distancia = np.asarray(colunas['distancia'])
+        self.points += len(distancia)
+        self.revolutions += revolutions
+        retorno = distancia > 0
+        if retorno.all():
+            retorno = slice(None)  # evita cópias na revolução típica
+        d = distancia[retorno]
+        if not len(d):
+            return self
+
+        z = colunas.get('z', colunas.get('altura'))
+        for name, values in (('x', colunas.get('x')), ('y', colunas.get('y')), ('z', z), ('distancia', distancia)):
+            if values is not None:
+                self.fields[name].update(np.asarray(values)[retorno])
+        self.sketch.update(d)
+        if 'angulo' in colunas:
+            self.sectors.update(d, self.sector_of(np.asarray(colunas['angulo'])[retorno]))
+
+        if 'altura' in colunas:
+            alturas = np.asarray(colunas['altura'])[retorno]
+            if alturas[0] == alturas[-1] and (alturas == alturas[0]).all():
+                self._layer(alturas[0]).update(d)  # revolução de uma camada só
+            else:
+                unicas, grupos = np.unique(alturas, return_inverse=True)
+                por_camada = Moments(len(unicas)).update(d, grupos)
+                for i, altura in enumerate(unicas):
+                    self._layer(altura)._combine(por_camada.count[i:i + 1], por_camada.mean[i:i + 1],
+                                                 por_camada.m2[i:i + 1], por_camada.min[i:i + 1],
+                                                 por_camada.max[i:i + 1])
+        return self
+
+    def merge(self, other):
+        """Combina outra captura nesta (mesmo número de setores e mesma precisão)"""
+        self.points += other.points
+        self.revolutions += other.revolutions
+        for name in FIELDS:
+            self.fields[name].merge(other.fields[name])
+        self.sketch.merge(other.sketch)
+        self.sectors.merge(other.sectors)
+        for altura, moments in other.layers.items():
+            self._layer(altura).merge(moments)
+        return self
+
+    @classmethod
+    def merged(cls, stats):
+        """Combinação de várias capturas (None se a lista for vazia)"""
+        result = None
+        for item in stats:
+            if result is None:
+                result = cls(len(item.sectors), item.sketch.relative_accuracy)
+            result.merge(item)
+        return result
+
+    def summary(self):
+        """dict com os momentos por campo e os quantis da distância"""
+        out = {'points': self.points, 'returns': self.returns, 'revolutions': self.revolutions}
+        for name in FIELDS:
+            out[name] = self.fields[name].summary()
+        p50, p90, p99 = self.sketch.quantiles([0.5, 0.9, 0.99])
+        out['distancia'].update(p50=float(p50), p90=float(p90), p99=float(p99))
+        return out
+
+    def describe(self):
+        """Linhas de resumo no formato das estatísticas do visualizador"""
+        linhas = [f"Pontos com retorno: {self.returns} de {self.points}"
+                  + (f" ({self.revolutions} revoluções)" if self.revolutions else "")]
+        for name, label in (('x', 'X'), ('y', 'Y'), ('z', 'Z')):
+            s = self.fields[name].summary()
+            if s['count']:
+                linhas.append(f"{label}: {s['min']:.3f} a {s['max']:.3f}m (Δ={s['max'] - s['min']:.3f}m, "
+                              f"μ={s['mean']:.3f}m, σ={s['std']:.3f}m)")
+        s = self.fields['distancia'].summary()
+        if s['count']:
+            p50, p99 = self.sketch.quantiles([0.5, 0.99])
+            linhas.append(f"Distância: {s['min']:.3f} a {s['max']:.3f}m (μ={s['mean']:.3f}m, σ={s['std']:.3f}m, "
+                          f"mediana≈{p50:.3f}m, p99≈{p99:.3f}m)")
+        if self.layers:
+            alturas = sorted(self.layers)
+            linhas.append(f"Camadas: {len(alturas)} ({alturas[0]:.3f}m a {alturas[-1]:.3f}m)")
+        return linhas
+
+    def to_dict(self):
+        return {
+            'version': VERSION,
+            'points': self.points,
+            'revolutions': self.revolutions,
+            'fields': {name: m.to_dict() for name, m in self.fields.items()},
+            'sketch': self.sketch.to_dict(),
+            'sectors': self.sectors.to_dict(),
+            'layers': [[altura, m.to_dict()] for altura, m in sorted(self.layers.items())],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls(len(data['sectors']['count']), data['sketch']['relative_accuracy'])
+        stats.points = data['points']
+        stats.revolutions = data['revolutions']
+        stats.fields = {name: Moments.from_dict(data['fields'][name]) for name in FIELDS}
+        stats.sketch = QuantileSketch.from_dict(data['sketch'])
+        stats.sectors = Moments.from_dict(data['sectors'])
+        stats.layers = {float(altura): Moments.from_dict(m) for altura, m in data['layers']}
+        return stats
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+
+def recording_stats(path, sectors=DEFAULT_SECTORS):
+    """CaptureStats de um CSV ou .x2lrec
+
+    Usa as estatísticas gravadas no .x2lrec quando existem; senão percorre
+    o arquivo uma vez (revolução a revolução, memória constante).
+    """
+    from lidar_recording import RecordingReader, is_recording, read_csv_columns
+
+    if is_recording(path):
+        with RecordingReader(path) as reader:
+            if reader.stats is not None:
+                return reader.stats
+            stats = CaptureStats(sectors)
+            for rev in reader:
+                colunas = {'angulo': rev.angle, 'distancia': rev.range,
+                           'x': rev.range * np.cos(rev.angle), 'y': rev.range * np.sin(rev.angle)}
+                if rev.altura is not None:
+                    colunas['altura'] = np.full(len(rev.range), rev.altura, dtype=np.float32)
+                stats.update(colunas)
+            return stats
+
+    colunas = read_csv_columns(path)
+    stats = CaptureStats(sectors)
+    stats.update(colunas, revolutions=0)
+    return stats
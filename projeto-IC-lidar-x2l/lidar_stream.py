@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+import time
+import threading
+import logging
+from collections import namedtuple
+
+import numpy as np
+
+from lidar_capture import scan_to_arrays
+from lidar_recording import laser_config_to_dict
+
+VERSION = "1.0"
+
+logger = logging.getLogger(__name__)
+
+# Políticas quando o anel está cheio
+DROP_OLDEST = "drop-oldest"
+DROP_NEWEST = "drop-newest"
+
+Revolution = namedtuple('Revolution', ['stamp', 'angle', 'range', 'intensity'])
+
+# Espera entre leituras que falham (s): dobra a cada falha seguida até o máximo
+BACKOFF_INITIAL = 0.01
+BACKOFF_MAX = 1.0
+# Intervalo mínimo entre avisos de falha no log (s)
+FAILURE_LOG_INTERVAL = 5.0
+
+
+class FailureBackoff:
+    """Espera exponencial após falhas de leitura e log limitado por intervalo
+
+    failure() retorna quanto esperar antes da próxima tentativa e registra
+    no máximo um aviso a cada log_interval segundos (com o número de falhas
+    omitidas); success() volta a ler sem espera. Evita que um dispositivo
+    desconectado vire um laço a 100% de CPU inundando o log.
+    """
+
+    def __init__(self, initial=BACKOFF_INITIAL, max_delay=BACKOFF_MAX, log_interval=FAILURE_LOG_INTERVAL):
+        self.initial = initial
+        self.max_delay = max_delay
+        self.log_interval = log_interval
+        self.delay = 0.0
+        self._last_log = None
+        self._suppressed = 0
+
+    def failure(self, message):
+        self.delay = min(self.max_delay, self.delay * 2 if self.delay else self.initial)
+        now = time.monotonic()
+        if self._last_log is None or now - self._last_log >= self.log_interval:
+            omitidas = f" (+{self._suppressed} falhas omitidas)" if self._suppressed else ""
+            logger.error(f"{message}{omitidas}; nova tentativa em {self.delay:.2f}s")
+            self._last_log = now
+            self._suppressed = 0
+        else:
+            self._suppressed += 1
+        return self.delay
+
+    def success(self):
+        self.delay = 0.0
+
+
+class ScanStream:
+    """Leitura contínua do CYdLidar em thread dedicada com anel limitado de revoluções
+
+    A thread de leitura chama doProcessSimple sem pausas (o binding libera
+    o GIL durante a chamada; só há espera após falhas, ver FailureBackoff)
+    e copia cada revolução para um slot de buffers NumPy pré-alocados. Os
+    consumidores leem com get() no próprio ritmo.
+
+    Quando o anel enche, DROP_OLDEST sobrescreve a revolução mais antiga e
+    DROP_NEWEST descarta a que acabou de chegar; ambos contam em `dropped`.
+    A seção crítica cobre apenas os índices e a cópia de um slot.
+    """
+
+    def __init__(self, lidar, slots=16, max_points=4096, policy=DROP_OLDEST, scan_factory=None, metrics=None):
+        if policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Política inválida: {policy}")
+        if slots < 1:
+            raise ValueError("O anel precisa de pelo menos 1 slot")
+
+        self.lidar = lidar
+        self.policy = policy
+        self.slots = slots
+        self.max_points = max_points
+        self._scan_factory = scan_factory
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.gauge('stream_queue_depth', lambda: self._size)
+
+        self._stamp = np.zeros(slots, dtype=np.uint64)
+        self._count = np.zeros(slots, dtype=np.int64)
+        self._angle = np.empty((slots, max_points), dtype=np.float32)
+        self._range = np.empty((slots, max_points), dtype=np.float32)
+        self._intensity = np.empty((slots, max_points), dtype=np.float32)
+
+        self._head = 0    # próximo slot a escrever
+        self._tail = 0    # próximo slot a ler
+        self._size = 0    # revoluções publicadas e ainda não lidas
+        self._cond = threading.Condition(threading.Lock())
+        self._stop = threading.Event()
+        self._thread = None
+        self.laser_config = None
+
+        # Contadores
+        self.revolutions = 0
+        self.failures = 0
+        self.dropped = 0
+        self.truncated = 0
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+    def start(self):
+        """Inicia a thread de leitura (o LiDAR já deve estar com turnOn)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._reader, name="ScanStream", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Para a thread de leitura e acorda consumidores bloqueados"""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    # ------------------------------------------------------------------
+    # Produtor
+    # ------------------------------------------------------------------
+    def _new_scan(self):
+        if self._scan_factory is not None:
+            return self._scan_factory()
+        import ydlidar  # type: ignore
+        return ydlidar.LaserScan()
+
+    def _reader(self):
+        scan = self._new_scan()
+        metrics = self.metrics
+        backoff = FailureBackoff()
+        while not self._stop.is_set():
+            t0 = time.perf_counter_ns()
+            erro = "Falha na leitura do LiDAR"
+            try:
+                ok = self.lidar.doProcessSimple(scan)
+            except Exception as e:
+                erro = f"Erro na leitura do LiDAR: {e}"
+                ok = False
+            if not ok:
+                self.failures += 1
+                if metrics is not None:
+                    metrics.count('read_failures')
+                self._stop.wait(backoff.failure(erro))
+                continue
+            backoff.success()
+            if self.laser_config is None and hasattr(scan, 'config'):
+                self.laser_config = laser_config_to_dict(scan.config)
+            t1 = time.perf_counter_ns()
+            angle, distance, intensity = scan_to_arrays(scan)
+            self.push(getattr(scan, 'stamp', 0), angle, distance, intensity)
+            if metrics is not None:
+                # aquisicao: espera do driver (grabScanData) + doProcessSimple
+                # copia: export NumPy do SWIG + cópia para o anel
+                metrics.observe('aquisicao', t1 - t0)
+                metrics.observe('copia', time.perf_counter_ns() - t1)
+                metrics.count('revolutions')
+                metrics.count('points', len(distance))
+
+    def push(self, stamp, angle, distance, intensity):
+        """Insere uma revolução no anel aplicando a política de descarte"""
+        with self._cond:
+            if self._size == self.slots:
+                self.dropped += 1
+                if self.metrics is not None:
+                    self.metrics.count('dropped_revolutions')
+                if self.policy == DROP_NEWEST:
+                    return False
+                self._tail = (self._tail + 1) % self.slots
+                self._size -= 1
+            slot = self._head
+
+        # O slot reservado não é visível ao consumidor até ser publicado
+        n = len(distance)
+        if n > self.max_points:
+            self.truncated += 1
+            n = self.max_points
+        self._angle[slot, :n] = angle[:n]
+        self._range[slot, :n] = distance[:n]
+        self._intensity[slot, :n] = intensity[:n]
+        self._count[slot] = n
+        self._stamp[slot] = stamp
+
+        with self._cond:
+            self._head = (slot + 1) % self.slots
+            self._size += 1
+            self.revolutions += 1
+            self._cond.notify()
+        return True
+
+    # ------------------------------------------------------------------
+    # Consumidor
+    # ------------------------------------------------------------------
+    def get(self, timeout=None):
+        """Retira a revolução mais antiga; retorna None se o tempo esgotar ou o stream parar"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._size > 0 or self._stop.is_set(), timeout):
+                return None
+            if self._size == 0:
+                return None
+            slot = self._tail
+            n = int(self._count[slot])
+            revolution = Revolution(int(self._stamp[slot]),
+                                    self._angle[slot, :n].copy(),
+                                    self._range[slot, :n].copy(),
+                                    self._intensity[slot, :n].copy())
+            self._tail = (slot + 1) % self.slots
+            self._size -= 1
+        return revolution
+
+    def clear(self):
+        """Descarta revoluções pendentes (ex.: ao reposicionar o LiDAR entre camadas)"""
+        with self._cond:
+            self._tail = self._head
+            self._size = 0
+
+    @property
+    def depth(self):
+        """Revoluções aguardando leitura"""
+        return self._size
+
+    def stats(self):
+        """Contadores de leitura, falhas e descartes"""
+        return {
+            'revolutions': self.revolutions,
+            'failures': self.failures,
+            'dropped': self.dropped,
+            'truncated': self.truncated,
+            'depth': self._size,
+            'policy': self.policy,
+        }
@@ -1,57 +1,80 @@
 #!/usr/bin/env python3
 import ydlidar
-import time
-import pandas as pd
-import numpy as np
 from datetime import datetime
 import os
 import logging
 from lidar_config import *
+from lidar_capture import PolarConverter, count_points
+from lidar_fusion import AngleBinFusion, fusion_summary
+from lidar_stream import ScanStream
+from lidar_recording import StreamingRecorder, RECORDING_EXT, recording_size
+from lidar_stats import CaptureStats
 
 VERSION = "1.0"
 
+# Formato da gravação: "x2lrec" (legível mesmo se a captura for interrompida)
+# ou "parquet" (dataset particionado por sessão/altura em PARQUET_DIR, requer pyarrow)
+FORMATO_GRAVACAO = "x2lrec"
+PARQUET_DIR = 'data/parquet'
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def coletar_camada(lidar, altura, num_scans=5):
-    """Coleta dados de uma única camada"""
-    pontos_camada = []
+def coletar_camada(stream, gravador, altura, num_scans=5, conversor=None, timeout=5.0, fusao=None):
+    """Coleta dados de uma única camada; retorna o número de pontos gravados
+    
+    Com fusao (AngleBinFusion) as revoluções da camada são fundidas em um
+    ponto por faixa angular e gravadas como um único bloco; sem fusao cada
+    revolução é convertida e gravada como chegou.
+    """
+    conversor = conversor or PolarConverter()
+    pontos_camada = 0
     scans_validos = 0
+    revolucoes = []
+    stamp = 0
     
     logger.info(f"Coletando camada na altura {altura}m...")
     input(f"Posicione o LiDAR na altura {altura}m e pressione ENTER para iniciar a varredura...")
     
+    # Descartar revoluções lidas enquanto o LiDAR era reposicionado
+    stream.clear()
+    
     for i in range(num_scans):
-        scan = ydlidar.LaserScan()
-        ret = lidar.doProcessSimple(scan)
+        rev = stream.get(timeout=timeout)
         
-        if ret and scan.points:
+        if rev is not None and len(rev.range):
             scans_validos += 1
-            for point in scan.points:
-                if 0 <= point.range <= 50:
-                    pontos_camada.append({
-                        'altura': altura,
-                        'angulo': point.angle,
-                        'distancia': point.range,
-                        'x': point.range * np.cos(np.radians(point.angle)),
-                        'y': point.range * np.sin(np.radians(point.angle)),
-                        'z': altura
-                    })
-        
-        time.sleep(0.2)
+            if fusao is not None:
+                revolucoes.append((rev.angle, rev.range, rev.intensity))
+                stamp = rev.stamp
+                continue
+            colunas = conversor.convert(rev.angle, rev.range, rev.intensity, altura=altura)
+            gravador.append(rev.stamp, colunas, laser_config=stream.laser_config)
+            pontos_camada += count_points(colunas)
     
-    logger.info(f"Camada {altura}m: {scans_validos}/{num_scans} scans válidos, {len(pontos_camada)} pontos")
+    if revolucoes:
+        colunas = fusao.fuse_revolutions(revolucoes, altura=altura)
+        gravador.append(stamp, colunas, laser_config=stream.laser_config)
+        pontos_camada = count_points(colunas)
+        logger.info(f"Camada {altura}m: fusão de {len(revolucoes)} revoluções: {fusion_summary(colunas)}")
+    
+    logger.info(f"Camada {altura}m: {scans_validos}/{num_scans} scans válidos, {pontos_camada} pontos")
     return pontos_camada
 
-def test_lidar_camadas():
-    """Coleta dados do LiDAR em múltiplas camadas"""
+def test_lidar_camadas(altura_inicial=None, altura_final=None, intervalo=None):
+    """Coleta dados do LiDAR em múltiplas camadas (parâmetros ausentes são perguntados)"""
     lidar = None
+    stream = None
+    gravador = None
     
     try:
-        # Solicitar parâmetros ao usuário
-        altura_inicial = float(input("Altura inicial (m): "))
-        altura_final = float(input("Altura final (m): "))
-        intervalo = float(input("Intervalo entre camadas (m): "))
+        # Solicitar ao usuário os parâmetros não informados
+        if altura_inicial is None:
+            altura_inicial = float(input("Altura inicial (m): "))
+        if altura_final is None:
+            altura_final = float(input("Altura final (m): "))
+        if intervalo is None:
+            intervalo = float(input("Intervalo entre camadas (m): "))
         
         if intervalo <= 0:
             raise ValueError("Intervalo deve ser maior que zero")
@@ -86,17 +109,24 @@ def test_lidar_camadas():
         if not lidar.turnOn():
             raise RuntimeError("Falha ao iniciar scan")
         
-        # Coletar todas as camadas
-        todos_pontos = []
+        # Leitura contínua em thread dedicada durante toda a sessão
+        stream = ScanStream(lidar)
+        stream.start()
+        
+        # Coletar todas as camadas, gravando cada revolução assim que chega
+        conversor = PolarConverter()
+        fusao = AngleBinFusion()
+        gravador = criar_gravador_camadas(altura_inicial, altura_final, intervalo)
+        total_pontos = 0
         for altura in alturas:
-            pontos = coletar_camada(lidar, altura)
-            todos_pontos.extend(pontos)
+            total_pontos += coletar_camada(stream, gravador, altura, conversor=conversor,
+                                          timeout=settings["timeout"], fusao=fusao)
         
-        logger.info(f"Coleta finalizada: {len(todos_pontos)} pontos totais")
+        logger.info(f"Coleta finalizada: {total_pontos} pontos totais")
         
-        # Salvar dados
-        if todos_pontos:
-            arquivo = salvar_pontos_camadas(todos_pontos, altura_inicial, altura_final, intervalo)
+        # Fechar e validar gravação
+        arquivo = finalizar_gravacao(gravador)
+        if total_pontos:
             if arquivo:
                 logger.info(f"Dados salvos: {arquivo}")
             else:
@@ -120,6 +150,12 @@ def test_lidar_camadas():
         return False
     
     finally:
+        if stream:
+            stream.stop()
+            logger.info(f"Stream: {stream.stats()}")
+        if gravador and not gravador.closed:
+            # Sessão interrompida: o que já foi gravado continua legível
+            finalizar_gravacao(gravador)
         if lidar:
             try:
                 logger.info("Desligando LiDAR...")
@@ -129,27 +165,36 @@ def test_lidar_camadas():
             except Exception as e:
                 logger.error(f"Erro ao desconectar: {e}")
 
-def salvar_pontos_camadas(pontos_data, altura_inicial, altura_final, intervalo):
-    """Salva pontos das camadas em arquivo CSV"""
+def criar_gravador_camadas(altura_inicial, altura_final, intervalo, fsync_interval=5.0):
+    """Cria gravação (.x2lrec ou sessão Parquet) das camadas, com a altura em cada bloco"""
+    extra = {'camadas': {'altura_inicial': altura_inicial, 'altura_final': altura_final, 'intervalo': intervalo}}
+    if FORMATO_GRAVACAO == "parquet":
+        from lidar_parquet import ParquetRecorder
+        return ParquetRecorder(PARQUET_DIR, settings=X2L_SETTINGS, extra=extra, fsync_interval=fsync_interval,
+                               stats=CaptureStats())
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"pontos-camadas-{altura_inicial}m-a-{altura_final}m-intervalo-{intervalo}m-{timestamp}{RECORDING_EXT}"
+    
+    data_dir = 'data/pontos-reais-por-camadas'
+    filepath = os.path.join(data_dir, filename)
+    
+    return StreamingRecorder(filepath, settings=X2L_SETTINGS, extra=extra, fsync_interval=fsync_interval,
+                             stats=CaptureStats())
+
+def finalizar_gravacao(gravador):
+    """Fecha a gravação (gravando o que estiver pendente) e valida o arquivo"""
     try:
-        if not pontos_data:
-            logger.warning("Nenhum ponto para salvar")
+        filepath = gravador.close()
+        if filepath is None:
             return None
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"pontos-camadas-{altura_inicial}m-a-{altura_final}m-intervalo-{intervalo}m-{timestamp}.csv"
-        
-        data_dir = 'data/pontos-reais-por-camadas'
-        os.makedirs(data_dir, exist_ok=True)
-        filepath = os.path.join(data_dir, filename)
-        
-        df = pd.DataFrame(pontos_data, columns=['altura', 'angulo', 'distancia', 'x', 'y', 'z'])
-        df.to_csv(filepath, index=False)
-        
-        if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
+        if not os.path.exists(filepath) or recording_size(filepath) == 0:
             raise IOError("Erro ao criar arquivo")
         
-        logger.info(f"Arquivo salvo: {len(pontos_data)} pontos, {os.path.getsize(filepath)} bytes")
+        logger.info(f"Arquivo salvo: {gravador.points} pontos, {recording_size(filepath)} bytes")
+        for linha in gravador.stats.describe():
+            logger.info(f"Captura - {linha}")
         return filepath
         
     except Exception as e:
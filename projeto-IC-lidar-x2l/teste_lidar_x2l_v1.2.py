@@ -1,15 +1,30 @@
 #!/usr/bin/env python3
 import ydlidar # type: ignore
-import time
-import pandas as pd
-import numpy as np
 from datetime import datetime
 import os
 import logging
 from lidar_config import *
+from lidar_capture import PolarConverter, count_points
+from lidar_stream import ScanStream
+from lidar_recording import StreamingRecorder, RECORDING_EXT, recording_size
+from lidar_stats import CaptureStats
+from lidar_metrics import PipelineMetrics, MetricsServer, JsonSnapshotter
 
 VERSION = "1.2"
 
+# Formato da gravação: "x2lrec" (legível mesmo se a captura for interrompida)
+# ou "parquet" (dataset particionado por sessão/altura em PARQUET_DIR, requer pyarrow)
+FORMATO_GRAVACAO = "x2lrec"
+PARQUET_DIR = 'data/parquet'
+
+# Métricas do pipeline: os histogramas por estágio são sempre coletados em
+# processo e resumidos no log ao final. Exportadores são opcionais:
+# METRICS_PORT = 9108 serve Prometheus em http://127.0.0.1:9108/metrics e
+# METRICS_JSON_DIR = 'data/metricas' grava snapshots JSON a cada METRICS_INTERVAL s
+METRICS_PORT = None
+METRICS_JSON_DIR = None
+METRICS_INTERVAL = 10.0
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -53,42 +68,46 @@ def test_lidar_x2l():
         
         logger.info(f"LiDAR X2L iniciado em {config['port']} a {settings['scan_frequency']}Hz. Coletando dados...")
         
-        # Lista para armazenar todos os pontos
-        todos_pontos = []
+        # Cada revolução convertida vai direto para o disco (memória constante)
+        metricas, exportadores = iniciar_metricas()
+        conversor = PolarConverter()
+        gravador = criar_gravador(metricas=metricas)
+        total_pontos = 0
         scans_validos = 0
         
+        # Leitura contínua em thread dedicada; este loop consome no próprio ritmo
+        stream = ScanStream(lidar, metrics=metricas)
         try:
+            stream.start()
             for i in range(10):  # 10 scans de teste
-                scan = ydlidar.LaserScan()
-                ret = lidar.doProcessSimple(scan)
+                rev = stream.get(timeout=settings["timeout"])
                 
-                if ret and scan.points:
+                if rev is not None and len(rev.range):
                     scans_validos += 1
-                    logger.info(f"Scan {i+1}: {len(scan.points)} pontos detectados")
-                    logger.info(f"  Primeiro ponto: ângulo={scan.points[0].angle:.2f}°, distância={scan.points[0].range:.2f}m")
+                    logger.info(f"Scan {i+1}: {len(rev.range)} pontos detectados")
+                    logger.info(f"  Primeiro ponto: ângulo={rev.angle[0]:.2f}rad, distância={rev.range[0]:.2f}m")
                     
-                    # Adicionar pontos à lista com validação
-                    for point in scan.points:
-                        if 0 <= point.range <= 50:  # Validar distância razoável, ajustar para o tamanho do ambiente em metros(no caso aqui vai de 0 a 50m)
-                            todos_pontos.append({
-                                'angulo': point.angle,
-                                'distancia': point.range,
-                                'x': point.range * np.cos(np.radians(point.angle)),
-                                'y': point.range * np.sin(np.radians(point.angle))
-                            })
+                    # Converter a revolução inteira (ângulos já em radianos, distância validada em RANGE_MIN..RANGE_MAX)
+                    with metricas.stage('conversao'):
+                        colunas = conversor.convert(rev.angle, rev.range, rev.intensity)
+                    with metricas.stage('enfileiramento'):
+                        gravador.append(rev.stamp, colunas, laser_config=stream.laser_config)
+                    total_pontos += count_points(colunas)
                 else:
                     logger.warning(f"Scan {i+1}: Falha na leitura ou sem pontos")
-                
-                time.sleep(0.5)  # Pausa entre scans
         
         except KeyboardInterrupt:
             logger.info("Interrompido pelo usuário")
+        finally:
+            stream.stop()
+            logger.info(f"Stream: {stream.stats()}")
+            arquivo_salvo = finalizar_gravacao(gravador)
+            finalizar_metricas(metricas, exportadores)
         
-        logger.info(f"Coleta finalizada: {scans_validos}/10 scans válidos, {len(todos_pontos)} pontos coletados")
+        logger.info(f"Coleta finalizada: {scans_validos}/10 scans válidos, {total_pontos} pontos coletados")
         
-        # Salvar pontos se coletados
-        if todos_pontos:
-            arquivo_salvo = salvar_pontos(todos_pontos)
+        # Verificar gravação se houve pontos
+        if total_pontos:
             if arquivo_salvo:
                 logger.info(f"Dados salvos com sucesso: {arquivo_salvo}")
             else:
@@ -124,46 +143,70 @@ def test_lidar_x2l():
             except Exception as e:
                 logger.error(f"Erro ao desconectar LiDAR: {e}")
 
-def salvar_pontos(pontos_data):
-    """Salvar pontos do LiDAR em arquivo CSV com timestamp e validação"""
-    try:
-        if not pontos_data:
-            logger.warning("Nenhum ponto para salvar")
-            return None
-        
-        # Criar nome do arquivo com timestamp
+def iniciar_metricas():
+    """Cria o registro de métricas e inicia os exportadores habilitados (HTTP e JSON)"""
+    metricas = PipelineMetrics()
+    exportadores = []
+    if METRICS_PORT is not None:
+        try:
+            exportadores.append(MetricsServer(metricas, port=METRICS_PORT).start())
+        except OSError as e:
+            logger.warning(f"Servidor de métricas indisponível na porta {METRICS_PORT}: {e}")
+    if METRICS_JSON_DIR is not None:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"pontos_{timestamp}.csv"
-        
-        # Criar diretório se não existir
-        data_dir = 'data/pontos_reais'
-        os.makedirs(data_dir, exist_ok=True)
-        filepath = os.path.join(data_dir, filename)
+        caminho = os.path.join(METRICS_JSON_DIR, f"metricas_{timestamp}.jsonl")
+        exportadores.append(JsonSnapshotter(metricas, caminho, interval=METRICS_INTERVAL).start())
+    return metricas, exportadores
+
+def finalizar_metricas(metricas, exportadores):
+    """Para os exportadores e registra o resumo por estágio"""
+    for exportador in exportadores:
+        exportador.stop()
+    for estagio, resumo in metricas.snapshot()['stages'].items():
+        logger.info(f"Latência {estagio}: p50={resumo['p50_ms']:.2f}ms p99={resumo['p99_ms']:.2f}ms max={resumo['max_ms']:.2f}ms")
+
+def criar_gravador(fsync_interval=5.0, metricas=None):
+    """Criar gravação (.x2lrec ou sessão Parquet) com timestamp, gravada durante a captura"""
+    if FORMATO_GRAVACAO == "parquet":
+        from lidar_parquet import ParquetRecorder
+        return ParquetRecorder(PARQUET_DIR, settings=X2L_SETTINGS, fsync_interval=fsync_interval, metrics=metricas,
+                               stats=CaptureStats())
+    
+    # Criar nome do arquivo com timestamp
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"pontos_{timestamp}{RECORDING_EXT}"
+    
+    # Diretório criado na primeira revolução gravada
+    data_dir = 'data/pontos_reais'
+    filepath = os.path.join(data_dir, filename)
+    
+    # Uma revolução por bloco, cabeçalho com LaserConfig e X2L_SETTINGS
+    return StreamingRecorder(filepath, settings=X2L_SETTINGS, fsync_interval=fsync_interval, metrics=metricas,
+                             stats=CaptureStats())
+
+def finalizar_gravacao(gravador):
+    """Fechar gravação pendente e validar o arquivo gerado"""
+    try:
+        filepath = gravador.close()
+        if filepath is None:
+            return None  # nenhuma revolução chegou a ser gravada
         
-        # Validar dados antes de salvar
-        if len(pontos_data) == 0:
+        # Validar dados gravados
+        if gravador.points == 0:
             raise ValueError("Lista de pontos está vazia")
         
-        # Criar DataFrame e salvar
-        df = pd.DataFrame(pontos_data, columns=['x', 'y', 'angulo', 'distancia'])
-        
-        # Validar DataFrame
-        if df.empty:
-            raise ValueError("DataFrame está vazio")
-        
-        # Salvar arquivo
-        df.to_csv(filepath, index=False)
-        
         # Verificar se arquivo foi criado
         if not os.path.exists(filepath):
             raise IOError(f"Arquivo não foi criado: {filepath}")
         
         # Verificar tamanho do arquivo
-        file_size = os.path.getsize(filepath)
+        file_size = recording_size(filepath)
         if file_size == 0:
             raise IOError("Arquivo criado está vazio")
         
-        logger.info(f"Pontos salvos: {filepath} ({len(pontos_data)} pontos, {file_size} bytes)")
+        logger.info(f"Pontos salvos: {filepath} ({gravador.points} pontos, {file_size} bytes)")
+        for linha in gravador.stats.describe():
+            logger.info(f"Captura - {linha}")
         return filepath
         
     except ValueError as e:
@@ -2,36 +2,68 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
+import numpy as np
+from lidar_pointcloud import load_point_cloud, cache_is_valid, voxel_downsample_to, valid_points_mask, LayerIndex, CENTROID
+from lidar_spatial import GridIndex
+from lidar_catalog import RecordingCatalog, describe, DATA_DIR
+from lidar_recording import RecordingReader, is_recording
+from lidar_stats import CaptureStats
 
 VERSION = "1.2"
 
-def filter_invalid_points(data):
-    """Filtrar pontos inválidos"""
-    original_count = len(data)
+# Pontos lidos do cache (um por célula da grade) e plotados sem nova redução
+MAX_LOADED_POINTS = 20000
+
+# Grade do downsampling: None = célula estimada pelo orçamento de pontos
+VOXEL_SIZE = None
+VOXEL_REPRESENTATIVE = CENTROID
+
+# Isolamento do objeto: cilindro vertical (x, y, raio) em m; None = nuvem inteira
+OBJECT_CYLINDER = None
+# Remoção de outliers: pontos com menos de OUTLIER_MIN_NEIGHBORS vizinhos a
+# OUTLIER_RADIUS m são descartados; None = desativada
+OUTLIER_RADIUS = None
+OUTLIER_MIN_NEIGHBORS = 3
+
+# Gravações listadas ao abrir (as mais recentes do catálogo)
+CATALOG_LIST_LIMIT = 30
+
+def valid_rows(cloud):
+    """Índices dos pontos válidos (máscara única só sobre X/Y/Z/Distance do cache)"""
+    coords = tuple(name for name in ('X', 'Y', 'Z') if name in cloud)
+    colunas = {name: cloud[name] for name in coords + ('Distance',) if name in cloud}
+    mask, counts = valid_points_mask(colunas, coords=coords)
     
-    if 'Distance' in data.columns:
-        data = data[data['Distance'] > 0.01]
+    filtered_count = counts['total'] - counts['valid']
+    if filtered_count > 0:
+        print(f"⚠️  Filtrados {filtered_count} pontos inválidos ({filtered_count/counts['total']*100:.1f}%)")
+        print(f"   distância mínima: {counts['min_range']} | não finitos: {counts['non_finite']} | acima do percentil: {counts['percentile']}")
     
-    data = data.dropna(subset=['X', 'Y'])
-    data = data[~data['X'].isin([float('inf'), float('-inf')])]
-    data = data[~data['Y'].isin([float('inf'), float('-inf')])]
+    return np.flatnonzero(mask)
+
+def isolate_object(data, cylinder=OBJECT_CYLINDER, outlier_radius=OUTLIER_RADIUS,
+                   min_neighbors=OUTLIER_MIN_NEIGHBORS):
+    """Recortar o objeto (cilindro) e remover outliers isolados com índice espacial em grade"""
+    if cylinder is None and outlier_radius is None:
+        return data
     
-    if 'Distance' in data.columns:
-        q99 = data['Distance'].quantile(0.99)
-        data = data[data['Distance'] <= q99 * 1.5]
+    coords = [col for col in ['X', 'Y', 'Z'] if col in data.columns and data[col].nunique() > 1]
+    points = data[coords].to_numpy(dtype=np.float64)
+    index = GridIndex(points, outlier_radius or cylinder[2])
+    original_count = len(data)
     
-    filtered_count = original_count - len(data)
-    if filtered_count > 0:
-        print(f"⚠️  Filtrados {filtered_count} pontos inválidos ({filtered_count/original_count*100:.1f}%)")
+    if cylinder is not None:
+        x, y, raio = cylinder
+        data = data.iloc[np.sort(index.cylinder((x, y), raio))]
+        print(f"✂️  Recorte do objeto: {len(data)} de {original_count} pontos (r={raio*100:.0f}cm)")
+        if outlier_radius is not None:
+            index = GridIndex(data[coords].to_numpy(dtype=np.float64), outlier_radius)
+    
+    if outlier_radius is not None:
+        outliers = index.radius_outliers(outlier_radius, min_neighbors)
+        data = data[~outliers]
+        print(f"🧹 Outliers removidos: {int(outliers.sum())} (< {min_neighbors} vizinhos em {outlier_radius*100:.1f}cm)")
     
-    return data
-
-def downsample_data(data, max_points=50000):
-    """Reduzir pontos para melhorar performance"""
-    if len(data) > max_points:
-        sample_ratio = max_points / len(data)
-        data = data.sample(frac=sample_ratio, random_state=42)
-        print(f"📉 Downsampling: {len(data)} pontos (ratio: {sample_ratio:.2%})")
     return data
 
 def detect_point_type(data):
@@ -48,10 +80,29 @@ def detect_point_type(data):
     
     return '3D' if has_variation else '2D'
 
-def plot_2d(data):
+def capture_stats(csv_file, cloud):
+    """Estatísticas da captura inteira (não da amostra plotada)
+
+    Usa as gravadas no .x2lrec; senão faz uma passada sobre as colunas
+    mapeadas do cache.
+    """
+    if is_recording(csv_file):
+        with RecordingReader(csv_file) as reader:
+            stats = reader.stats
+        if stats is not None:
+            return stats
+    nomes = (('x', 'X'), ('y', 'Y'), ('z', 'Z'), ('distancia', 'Distance'), ('angulo', 'Angle'), ('altura', 'altura'))
+    colunas = {nome: cloud[origem] for nome, origem in nomes if origem in cloud}
+    if 'distancia' not in colunas:
+        colunas['distancia'] = np.hypot(colunas['x'], colunas['y'])
+    return CaptureStats().update(colunas, revolutions=0)
+
+def print_capture_stats(data, stats):
+    print(f"Pontos exibidos: {len(data)} (estatísticas da captura completa)")
+    print("\n".join(stats.describe()))
+
+def plot_2d(data, stats=None):
     """Visualizar nuvem de pontos 2D"""
-    data = downsample_data(data, max_points=10000)
-    
     fig = plt.figure(figsize=(14, 6))
     
     # Plot XY
@@ -93,6 +144,9 @@ def plot_2d(data):
     plt.show()
     
     print(f"\n=== ESTATÍSTICAS 2D ===")
+    if stats is not None:
+        print_capture_stats(data, stats)
+        return
     print(f"Pontos válidos: {len(data)}")
     print(f"X: {data['X'].min():.3f} a {data['X'].max():.3f}m (Δ={data['X'].max()-data['X'].min():.3f}m)")
     print(f"Y: {data['Y'].min():.3f} a {data['Y'].max():.3f}m (Δ={data['Y'].max()-data['Y'].min():.3f}m)")
@@ -101,10 +155,8 @@ def plot_2d(data):
     if 'Angle' in data.columns:
         print(f"Ângulo: {data['Angle'].min():.3f} a {data['Angle'].max():.3f} rad")
 
-def plot_3d(data):
+def plot_3d(data, stats=None):
     """Visualizar nuvem de pontos 3D"""
-    data = downsample_data(data, max_points=20000)
-    
     fig = plt.figure(figsize=(15, 10))
     
     # Plot 3D principal
@@ -153,13 +205,17 @@ def plot_3d(data):
     plt.show()
     
     print(f"\n=== ESTATÍSTICAS 3D ===")
+    if stats is not None:
+        print_capture_stats(data, stats)
+        return
     print(f"Pontos válidos: {len(data)}")
     print(f"X: {data['X'].min():.3f} a {data['X'].max():.3f}m (Δ={data['X'].max()-data['X'].min():.3f}m)")
     print(f"Y: {data['Y'].min():.3f} a {data['Y'].max():.3f}m (Δ={data['Y'].max()-data['Y'].min():.3f}m)") 
     print(f"Z: {data['Z'].min():.3f} a {data['Z'].max():.3f}m (Δ={data['Z'].max()-data['Z'].min():.3f}m)")
     if 'altura' in data.columns:
-        print(f"Camadas únicas: {data['altura'].nunique()}")
-        print(f"Alturas: {sorted(data['altura'].unique())}")
+        camadas = LayerIndex.build(data['altura'].to_numpy())
+        print(f"Camadas únicas: {len(camadas)}")
+        print(f"Alturas: {camadas.heights.tolist()}")
 
 def load_and_view(csv_file):
     """Carregar e visualizar nuvem de pontos (2D ou 3D)"""
@@ -168,38 +224,31 @@ def load_and_view(csv_file):
             print(f"❌ Erro: Arquivo '{csv_file}' não encontrado")
             return
         
-        print(f"📁 Nome do arquivo CSV: {os.path.basename(csv_file)}")
-        print(f"📂 Carregando arquivo...")
-        data = pd.read_csv(csv_file)
-        print(f"✅ Carregados {len(data)} pontos")
-        print(f"📋 Colunas: {list(data.columns)}")
-        
-        # Mapear colunas
-        col_map = {}
-        for col in data.columns:
-            col_lower = col.lower().strip()
-            if col_lower in ['x', 'pos_x', 'position_x']:
-                col_map[col] = 'X'
-            elif col_lower in ['y', 'pos_y', 'position_y']:
-                col_map[col] = 'Y'
-            elif col_lower in ['z', 'pos_z', 'position_z', 'height']:
-                col_map[col] = 'Z'
-            elif col_lower in ['distance', 'dist', 'distancia', 'range']:
-                col_map[col] = 'Distance'
-            elif col_lower in ['angle', 'angulo', 'theta']:
-                col_map[col] = 'Angle'
+        print(f"📁 Nome do arquivo: {os.path.basename(csv_file)}")
+        print(f"📂 Carregando arquivo{'' if cache_is_valid(csv_file) else ' (construindo cache)'}...")
+        cloud = load_point_cloud(csv_file)
+        print(f"✅ Carregados {len(cloud)} pontos (cache mapeado em memória)")
+        print(f"📋 Colunas: {list(cloud.columns)}")
         
-        if col_map:
-            data = data.rename(columns=col_map)
-            print(f"🔄 Mapeamento: {col_map}")
-        
-        if 'X' not in data.columns or 'Y' not in data.columns:
+        if 'X' not in cloud or 'Y' not in cloud:
             print(f"❌ Erro: Colunas X e Y não encontradas")
-            print(f"Disponíveis: {list(data.columns)}")
+            print(f"Disponíveis: {list(cloud.columns)}")
             return
         
-        # Filtrar pontos inválidos
-        data = filter_invalid_points(data)
+        stats = capture_stats(csv_file, cloud)
+        
+        # Pontos inválidos saem antes da grade (não entram nos centroides nem
+        # no limite do percentil); a grade usa só X/Y/Z das linhas válidas e
+        # das demais colunas só os representativos são lidos do cache
+        rows = valid_rows(cloud)
+        colunas, cell_size = voxel_downsample_to(cloud.columns, MAX_LOADED_POINTS, cell_size=VOXEL_SIZE,
+                                                 representative=VOXEL_REPRESENTATIVE, rows=rows)
+        data = pd.DataFrame(colunas)
+        if cell_size:
+            print(f"📉 Grade carregada: {len(data)} de {len(rows)} pontos válidos (célula: {cell_size*100:.1f}cm)")
+        
+        # Isolar o objeto
+        data = isolate_object(data)
         
         if len(data) == 0:
             print("❌ Nenhum ponto válido após filtragem")
@@ -209,9 +258,9 @@ def load_and_view(csv_file):
         print(f"🎯 Tipo detectado: {point_type}")
         
         if point_type == '3D':
-            plot_3d(data)
+            plot_3d(data, stats)
         else:
-            plot_2d(data)
+            plot_2d(data, stats)
         
     except Exception as e:
         print(f"❌ Erro: {e}")
@@ -224,22 +273,29 @@ if __name__ == "__main__":
     print(f"  Detecção automática 2D/3D")
     print(f"{'='*50}\n")
     
-    filename = input("📁 Nome do arquivo CSV: ").strip()
+    # Catálogo de data/: só arquivos novos ou alterados são lidos
+    with RecordingCatalog(DATA_DIR) as catalogo:
+        atualizacao = catalogo.update()
+        gravacoes = catalogo.search()
+        print(f"📚 {len(gravacoes)} gravações em {DATA_DIR} "
+              f"({atualizacao.added + atualizacao.updated} indexadas agora)")
+        for i, entry in enumerate(gravacoes[:CATALOG_LIST_LIMIT], 1):
+            camadas = f", {len(entry.layers)} camadas" if entry.layers else ""
+            print(f"  {i:3d}. {entry.path} ({entry.points} pontos{camadas})")
+        
+        escolha = input("\n📁 Número ou nome do arquivo (CSV ou .x2lrec): ").strip()
+        filename = None
+        if escolha.isdigit() and 1 <= int(escolha) <= len(gravacoes):
+            filename = os.path.join(catalogo.root, gravacoes[int(escolha) - 1].path)
+        elif escolha:
+            filename = catalogo.resolve(escolha) or escolha
+        
+        if filename:
+            entry = catalogo.get(os.path.relpath(os.path.abspath(filename), catalogo.root))
+            if entry is not None:
+                print("\n".join(describe(entry)))
     
     if filename:
-        if not os.path.exists(filename) and not os.path.isabs(filename):
-            # Tentar em diferentes diretórios
-            possible_paths = [
-                os.path.join(os.path.dirname(__file__), '..', 'data', 'pontos_reais', filename),
-                os.path.join(os.path.dirname(__file__), '..', 'data', 'pontos_camadas', filename),
-                os.path.join(os.path.dirname(__file__), '..', 'data', 'pontos_camadas_simulados', filename),
-            ]
-            
-            for path in possible_paths:
-                if os.path.exists(path):
-                    filename = path
-                    break
-        
         load_and_view(filename)
     else:
         print("❌ Nenhum arquivo especificado")
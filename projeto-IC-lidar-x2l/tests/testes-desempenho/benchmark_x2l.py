@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""Benchmarks dos caminhos de captura, conversão, armazenamento e visualização
+
+Roda offline sobre scans sintéticos (lidar_simulation) em tamanhos de uma
+revolução até 50M pontos e sobre os CSVs reais de data/. Cada resultado
+(mínimo/mediana de várias repetições) vai para um JSON em resultados/, para
+comparar versões do SDK e do projeto com --compare.
+
+Uso:
+    python3 benchmark_x2l.py                         # até 1M pontos
+    python3 benchmark_x2l.py --max-points 50000000   # inclui 10M e 50M
+    python3 benchmark_x2l.py -k filtro -k grade      # só benchmarks com esses nomes
+    python3 benchmark_x2l.py --compare resultados/anterior.json
+"""
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+sys.path.insert(0, ROOT)
+from lidar_capture import PolarConverter
+from lidar_recording import RecordingWriter, RecordingReader
+from lidar_pointcloud import (load_point_cloud, valid_points_mask, voxel_downsample_to, map_columns,
+                              LayeredColumns)
+from lidar_simulation import ScanSimulator
+from lidar_range_image import RangeImageConverter
+import lidar_parquet
+
+VERSION = "1.0"
+
+POINT_COUNTS = [500, 10_000, 100_000, 1_000_000, 10_000_000, 50_000_000]
+DEFAULT_MAX_POINTS = 1_000_000
+# Caminhos ponto a ponto (referência antiga) ficam inviáveis acima disto
+PER_POINT_LIMIT = 1_000_000
+# Orçamento dos benchmarks de downsampling: o do visualizador, limitado a
+# 10% da entrada para que entradas pequenas também sejam reduzidas
+DOWNSAMPLE_MAX_POINTS = 20000
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados')
+
+BENCHMARKS = []
+
+
+def benchmark(nome, max_points=None):
+    """Registra um benchmark: fn(dados, tmpdir) retorna a função cronometrada"""
+    def register(fn):
+        BENCHMARKS.append((nome, fn, max_points))
+        return fn
+    return register
+
+
+def downsample_budget(n):
+    return min(DOWNSAMPLE_MAX_POINTS, max(1, n // 10))
+
+
+# ----------------------------------------------------------------------
+# Dados de entrada
+# ----------------------------------------------------------------------
+def synthetic_cloud(n, seed=0, chunk=1_000_000):
+    """Nuvem em camadas com n pontos gerada pelo simulador, em blocos de revoluções"""
+    simulator = ScanSimulator(seed=seed)
+    per_rev = simulator.points_per_revolution
+    revs = -(-n // per_rev)
+    alturas = np.round(np.linspace(0.0, 0.5, 51), 2)
+    altura_rev = alturas[np.arange(revs) * len(alturas) // revs]
+
+    partes = {'angulo': [], 'distancia': [], 'altura': []}
+    step = max(1, chunk // per_rev)
+    for start in range(0, revs, step):
+        lote = altura_rev[start:start + step]
+        angle, distance, _ = simulator.revolutions(lote)
+        partes['angulo'].append(angle.ravel())
+        partes['distancia'].append(distance.ravel())
+        partes['altura'].append(np.repeat(lote.astype(np.float32), per_rev))
+    colunas = {nome: np.concatenate(valores)[:n] for nome, valores in partes.items()}
+    colunas['x'] = colunas['distancia'] * np.cos(colunas['angulo'])
+    colunas['y'] = colunas['distancia'] * np.sin(colunas['angulo'])
+    colunas['z'] = colunas['altura']
+    return colunas
+
+
+def as_frame(colunas):
+    """DataFrame com os nomes do visualizador (X, Y, Z, Distance, Angle)"""
+    data = pd.DataFrame(colunas)
+    return data.rename(columns=map_columns(data.columns))
+
+
+# ----------------------------------------------------------------------
+# Implementações de referência (versões anteriores dos scripts)
+# ----------------------------------------------------------------------
+def filter_invalid_points_pandas(data):
+    if 'Distance' in data.columns:
+        data = data[data['Distance'] > 0.01]
+    data = data.dropna(subset=['X', 'Y'])
+    data = data[~data['X'].isin([float('inf'), float('-inf')])]
+    data = data[~data['Y'].isin([float('inf'), float('-inf')])]
+    if 'Distance' in data.columns:
+        q99 = data['Distance'].quantile(0.99)
+        data = data[data['Distance'] <= q99 * 1.5]
+    return data
+
+
+def salvar_pontos_csv_writer(pontos_data, filepath):
+    with open(filepath, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['x', 'y', 'angulo', 'distancia'])
+        for ponto in pontos_data:
+            writer.writerow([ponto['x'], ponto['y'], ponto['angulo'], ponto['distancia']])
+
+
+# ----------------------------------------------------------------------
+# Benchmarks
+# ----------------------------------------------------------------------
+@benchmark("conversao/revolucoes_vetorizado")
+def bench_conversao(colunas, tmpdir):
+    conversor = PolarConverter()
+    per_rev = 500
+    angle, distance = colunas['angulo'], colunas['distancia']
+
+    def run():
+        for start in range(0, len(distance), per_rev):
+            conversor.convert(angle[start:start + per_rev], distance[start:start + per_rev])
+    return run
+
+
+@benchmark("conversao/range_image")
+def bench_range_image(colunas, tmpdir):
+    conversor = RangeImageConverter()
+    per_rev = 500
+    angle, distance = colunas['angulo'], colunas['distancia']
+    revolucoes = [(angle[start:start + per_rev], distance[start:start + per_rev], None)
+                  for start in range(0, len(distance), per_rev)]
+    return lambda: conversor.convert_batch(revolucoes)
+
+
+@benchmark("conversao/ponto_a_ponto", max_points=PER_POINT_LIMIT)
+def bench_conversao_ponto(colunas, tmpdir):
+    angle, distance = colunas['angulo'].tolist(), colunas['distancia'].tolist()
+
+    def run():
+        pontos = []
+        for a, r in zip(angle, distance):
+            if 0.0 <= r <= 50.0:
+                pontos.append({'x': r * np.cos(a), 'y': r * np.sin(a), 'angulo': a, 'distancia': r})
+        return pontos
+    return run
+
+
+@benchmark("salvar/csv_writer", max_points=PER_POINT_LIMIT)
+def bench_salvar_csv_writer(colunas, tmpdir):
+    pontos = pd.DataFrame({k: colunas[k] for k in ('x', 'y', 'angulo', 'distancia')}).to_dict('records')
+    return lambda: salvar_pontos_csv_writer(pontos, os.path.join(tmpdir, 'pontos.csv'))
+
+
+@benchmark("salvar/pandas_to_csv")
+def bench_salvar_pandas(colunas, tmpdir):
+    data = pd.DataFrame(colunas)
+    return lambda: data.to_csv(os.path.join(tmpdir, 'pontos.csv'), index=False)
+
+
+@benchmark("salvar/x2lrec")
+def bench_salvar_x2lrec(colunas, tmpdir):
+    path = os.path.join(tmpdir, 'pontos.x2lrec')
+
+    def run():
+        if os.path.exists(path):
+            os.remove(path)
+        with RecordingWriter(path) as writer:
+            for start in range(0, len(colunas['x']), 500_000):
+                fatia = slice(start, start + 500_000)
+                writer.write(0, colunas['angulo'][fatia], colunas['distancia'][fatia],
+                             altura=float(colunas['altura'][start]))
+    return run
+
+
+def _write_inputs(colunas, tmpdir):
+    csv_path = os.path.join(tmpdir, 'entrada.csv')
+    rec_path = os.path.join(tmpdir, 'entrada.x2lrec')
+    if not os.path.exists(csv_path):
+        pd.DataFrame(colunas).to_csv(csv_path, index=False)
+        with RecordingWriter(rec_path) as writer:
+            writer.write(0, colunas['angulo'], colunas['distancia'])
+    return csv_path, rec_path
+
+
+@benchmark("carregar/read_csv")
+def bench_carregar_csv(colunas, tmpdir):
+    csv_path, _ = _write_inputs(colunas, tmpdir)
+    return lambda: pd.read_csv(csv_path)
+
+
+@benchmark("carregar/x2lrec")
+def bench_carregar_x2lrec(colunas, tmpdir):
+    _, rec_path = _write_inputs(colunas, tmpdir)
+
+    def run():
+        with RecordingReader(rec_path) as reader:
+            return reader.columns()
+    return run
+
+
+@benchmark("carregar/cache_mmap")
+def bench_carregar_cache(colunas, tmpdir):
+    csv_path, _ = _write_inputs(colunas, tmpdir)
+    load_point_cloud(csv_path)  # constrói o cache fora da medição
+    return lambda: float(load_point_cloud(csv_path)['X'].sum())
+
+
+def _write_dataset(colunas, tmpdir):
+    root = os.path.join(tmpdir, 'dataset')
+    if not os.path.exists(root):
+        altura = colunas['altura']
+        bounds = np.concatenate(([0], np.flatnonzero(np.diff(altura)) + 1, [len(altura)]))
+        with lidar_parquet.ParquetDatasetWriter(root, '20260101_000000') as writer:
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                writer.write(0, colunas['angulo'][start:end], colunas['distancia'][start:end],
+                             altura=float(altura[start]))
+    return root
+
+
+@benchmark("consulta/csv_camadas")
+def bench_consulta_csv(colunas, tmpdir):
+    csv_path, _ = _write_inputs(colunas, tmpdir)
+
+    def run():
+        data = pd.read_csv(csv_path)
+        return data[(data['altura'] >= 0.1) & (data['altura'] <= 0.2)]
+    return run
+
+
+@benchmark("consulta/parquet_camadas")
+def bench_consulta_parquet(colunas, tmpdir):
+    if lidar_parquet.pa is None:
+        return None
+    root = _write_dataset(colunas, tmpdir)
+    return lambda: lidar_parquet.read_dataset(root, 0.1, 0.2).to_pandas()
+
+
+@benchmark("filtro/pandas")
+def bench_filtro_pandas(colunas, tmpdir):
+    data = as_frame(colunas)
+    return lambda: filter_invalid_points_pandas(data)
+
+
+@benchmark("filtro/mascara_unica")
+def bench_filtro_mascara(colunas, tmpdir):
+    data = as_frame(colunas)
+
+    def run():
+        mask, _ = valid_points_mask({c: data[c].to_numpy() for c in ('X', 'Y', 'Distance')})
+        return data[mask]
+    return run
+
+
+@benchmark("downsample/sample")
+def bench_downsample_sample(colunas, tmpdir):
+    data = as_frame(colunas)
+    return lambda: data.sample(n=downsample_budget(len(data)), random_state=42)
+
+
+@benchmark("downsample/grade")
+def bench_downsample_grade(colunas, tmpdir):
+    colunas = {k: v.to_numpy() for k, v in as_frame(colunas).items()}
+    budget = downsample_budget(len(colunas['X']))
+    return lambda: voxel_downsample_to(colunas, budget)
+
+
+@benchmark("camadas/groupby")
+def bench_camadas_groupby(colunas, tmpdir):
+    data = pd.DataFrame(colunas)
+    return lambda: {altura: grupo for altura, grupo in data.groupby('altura')}
+
+
+@benchmark("camadas/indice")
+def bench_camadas_indice(colunas, tmpdir):
+    data = {k: v.to_numpy() for k, v in as_frame(colunas).items()}
+
+    def run():
+        camadas = LayeredColumns.from_columns(data, column='altura')
+        return [camadas.layer(i) for i in range(len(camadas))]
+    return run
+
+
+@benchmark("visualizacao/render_3d")
+def bench_render(colunas, tmpdir):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    data = {k: v.to_numpy() for k, v in as_frame(colunas).items()}
+    budget = downsample_budget(len(data['X']))
+
+    def run():
+        reduzido, _ = voxel_downsample_to(data, budget)
+        fig = plt.figure(figsize=(8, 6))
+        ax = fig.add_subplot(projection='3d')
+        ax.scatter(reduzido['X'], reduzido['Y'], reduzido['Z'], c=reduzido['Z'], s=1)
+        fig.canvas.draw()
+        plt.close(fig)
+    return run
+
+
+# ----------------------------------------------------------------------
+# Execução
+# ----------------------------------------------------------------------
+def time_call(fn, repeat, budget):
+    """Tempos de repeat execuções (para antes se passar do orçamento em segundos)"""
+    times = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+        if time.perf_counter() - start > budget:
+            break
+    return times
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    try:
+        import ydlidar  # type: ignore
+        sdk = getattr(ydlidar, '__version__', 'instalado')
+    except ImportError:
+        sdk = None
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'pyarrow': lidar_parquet.pa.__version__ if lidar_parquet.pa is not None else None,
+        'ydlidar': sdk,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def run_benchmarks(sizes, selected, repeat, budget, real_data):
+    resultados = []
+    tmpdir = tempfile.mkdtemp(prefix='x2l-bench-')
+    try:
+        datasets = [(f"sintetico-{n}", n, None) for n in sizes]
+        if real_data:
+            for path in sorted(glob.glob(os.path.join(ROOT, 'data', '**', '*.csv'), recursive=True)):
+                datasets.append((os.path.basename(path), None, path))
+
+        for nome_dados, n, path in datasets:
+            if path is None:
+                colunas = synthetic_cloud(n)
+            else:
+                colunas = {k: v.to_numpy(np.float32) for k, v in pd.read_csv(path).items()}
+                if 'altura' not in colunas:
+                    colunas['altura'] = np.zeros(len(colunas['x']), dtype=np.float32)
+                    colunas['z'] = colunas['altura']
+                n = len(colunas['x'])
+            workdir = os.path.join(tmpdir, nome_dados)
+            os.makedirs(workdir)
+
+            for nome, factory, max_points in BENCHMARKS:
+                if selected and not any(k in nome for k in selected):
+                    continue
+                if max_points is not None and n > max_points:
+                    continue
+                fn = factory(colunas, workdir)
+                if fn is None:
+                    continue  # dependência opcional ausente (ex.: pyarrow)
+                times = time_call(fn, repeat, budget)
+                best = min(times)
+                resultado = {
+                    'benchmark': nome, 'dataset': nome_dados, 'points': n,
+                    'repeat': len(times), 'min': best, 'median': float(np.median(times)),
+                    'points_per_s': n / best if best > 0 else None,
+                }
+                resultados.append(resultado)
+                print(f"{nome:34s} {nome_dados:40s} {best*1e3:10.2f} ms  {n / best / 1e6:8.2f} Mpts/s")
+            shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return resultados
+
+
+def compare(resultados, anterior_path):
+    with open(anterior_path, encoding='utf-8') as f:
+        anterior = {(r['benchmark'], r['dataset']): r for r in json.load(f)['results']}
+    print(f"\n=== Comparação com {os.path.basename(anterior_path)} (>1 = mais lento agora) ===")
+    for r in resultados:
+        old = anterior.get((r['benchmark'], r['dataset']))
+        if old:
+            ratio = r['min'] / old['min']
+            flag = "  ⚠️" if ratio > 1.2 else ""
+            print(f"{r['benchmark']:34s} {r['dataset']:40s} {ratio:6.2f}x{flag}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do projeto LiDAR X2L")
+    parser.add_argument('--max-points', type=int, default=DEFAULT_MAX_POINTS)
+    parser.add_argument('--sizes', type=int, nargs='*', help="tamanhos sintéticos (substitui a lista padrão)")
+    parser.add_argument('-k', action='append', default=[], help="só benchmarks contendo este texto")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=10.0, help="segundos máximos por benchmark")
+    parser.add_argument('--no-real-data', action='store_true', help="ignora os CSVs de data/")
+    parser.add_argument('--out', help="arquivo JSON de saída")
+    parser.add_argument('--compare', help="JSON anterior para comparar")
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes or [n for n in POINT_COUNTS if n <= args.max_points]
+    resultados = run_benchmarks(sizes, args.k, args.repeat, args.budget, not args.no_real_data)
+
+    out = args.out
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump({'metadata': metadata(), 'results': resultados}, f, indent=2)
+    print(f"\nResultados salvos em {out}")
+
+    if args.compare:
+        compare(resultados, args.compare)
+
+
+if __name__ == "__main__":
+    main()
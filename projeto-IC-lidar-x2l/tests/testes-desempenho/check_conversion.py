@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Verifica a conversão de CSVs de captura para .x2lrec e Parquet
+
+Para um CSV real (ângulos em radianos) e um simulado (ângulos em graus):
+
+1. read_csv_columns detecta a unidade e entrega angulo em radianos.
+2. convert_csv -> RecordingReader.columns(): mesmo número de pontos,
+   distância preservada e x/y iguais aos calculados do angulo na unidade
+   certa. No simulado também iguais aos x/y do próprio CSV; nos reais os
+   x/y do CSV são legados (np.radians sobre radianos) e não servem.
+3. convert_to_parquet -> read_dataset(): os mesmos pontos (se houver pyarrow).
+
+Uso:
+    python3 check_conversion.py     # sai com código 1 se algo falhar
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+sys.path.insert(0, ROOT)
+from lidar_recording import RecordingReader, convert_csv, read_csv_columns
+
+VERSION = "1.0"
+
+# (nome, caminho, unidade do angulo no arquivo, x/y do CSV corretos)
+CSVS = (
+    ("real", os.path.join(ROOT, 'data', 'pontos-reais', 'pontos-20260302-155642-v1.2.csv'), 'rad', False),
+    ("simulado", os.path.join(ROOT, 'tests', 'testes-simulados', 'data', 'pontos-camadas-simulados',
+                              'pontos-camadas-SIM-20260220-010620.csv'), 'deg', True),
+)
+
+# float32 no arquivo: ~1e-7 relativo em distâncias de poucos metros; x/y do CSV com 4 casas
+TOLERANCIA = 1e-3
+
+
+def check(nome, ok, detalhe=""):
+    print(f"{'✅' if ok else '❌'} {nome}" + (f": {detalhe}" if detalhe and not ok else ""))
+    return not ok
+
+
+def cartesian_error(x, y, ref_x, ref_y):
+    """Maior distância entre dois conjuntos de x/y"""
+    return float(np.max(np.hypot(x - ref_x, y - ref_y)))
+
+
+def sorted_points(colunas):
+    """Pontos (altura, angulo, distancia) em ordem canônica, para comparar sem depender da ordem"""
+    altura = colunas.get('altura', np.zeros(len(colunas['angulo'])))
+    pontos = np.column_stack([altura, colunas['angulo'], colunas['distancia']]).astype(np.float32)
+    return pontos[np.lexsort(pontos.T[::-1])]
+
+
+def main():
+    falhas = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        for nome, caminho, unidade, xy_corretos in CSVS:
+            if not os.path.exists(caminho):
+                falhas += check(f"{nome}: {os.path.basename(caminho)}", False, "arquivo não encontrado")
+                continue
+            # Colunas cruas, sem conversão de unidade, como referência de x/y e distância
+            with open(caminho, encoding='utf-8') as f:
+                header = [c.strip().lower() for c in f.readline().split(',')]
+            cru = np.loadtxt(caminho, delimiter=',', skiprows=1, ndmin=2)
+            csv = {c: cru[:, i] for i, c in enumerate(header)}
+            angulo = np.radians(csv['angulo']) if unidade == 'deg' else csv['angulo']
+            ref_x = csv['distancia'] * np.cos(angulo)
+            ref_y = csv['distancia'] * np.sin(angulo)
+
+            esperado = read_csv_columns(caminho)
+            falhas += check(f"{nome}: angulo em radianos ({unidade} no CSV)",
+                            np.allclose(esperado['angulo'], angulo, rtol=0, atol=1e-12))
+
+            destino = convert_csv(caminho, os.path.join(tmp, f"{nome}.x2lrec"))
+            with RecordingReader(destino) as reader:
+                lido = {k: np.asarray(v, dtype=np.float64) for k, v in reader.columns().items()}
+            falhas += check(f"{nome}: pontos", len(lido['distancia']) == len(csv['distancia']),
+                            f"{len(lido['distancia'])} != {len(csv['distancia'])}")
+            if len(lido['distancia']) != len(csv['distancia']):
+                continue
+            falhas += check(f"{nome}: distância", np.allclose(lido['distancia'], csv['distancia'], atol=1e-5))
+            erro = cartesian_error(lido['x'], lido['y'], ref_x, ref_y)
+            falhas += check(f"{nome}: x/y de angulo/distancia", erro <= TOLERANCIA, f"erro máximo {erro:.4f} m")
+            if xy_corretos:
+                erro = cartesian_error(lido['x'], lido['y'], csv['x'], csv['y'])
+                falhas += check(f"{nome}: x/y iguais aos do CSV", erro <= TOLERANCIA, f"erro máximo {erro:.4f} m")
+
+            try:
+                from lidar_parquet import convert_to_parquet, read_dataset
+                sessao = convert_to_parquet(caminho, os.path.join(tmp, 'parquet'), sessao=nome)
+            except ImportError:
+                print(f"⏭️  {nome}: Parquet (pyarrow não instalado)")
+                continue
+            tabela = read_dataset(os.path.join(tmp, 'parquet'), columns=['sessao', 'altura', 'angulo', 'distancia'])
+            tabela = tabela.to_pandas()
+            tabela = tabela[tabela['sessao'] == os.path.basename(sessao).split('=', 1)[1]]
+            parquet = {c: tabela[c].to_numpy(np.float64) for c in ('altura', 'angulo', 'distancia')}
+            if 'altura' not in esperado:
+                parquet.pop('altura')
+            falhas += check(f"{nome}: Parquet", np.allclose(sorted_points(parquet), sorted_points(esperado), atol=1e-5))
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
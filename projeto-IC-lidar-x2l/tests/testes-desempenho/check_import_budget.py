@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Verifica o orçamento de importação do lidar_cli
+
+1. `import lidar_cli` (python -X importtime, melhor de várias execuções)
+   precisa ficar abaixo de lidar_cli.IMPORT_BUDGET_MS.
+2. Cada subcomando roda em um interpretador novo e não pode ter carregado
+   nenhum módulo de lidar_cli.HEADLESS_FORBIDDEN. Subcomandos que precisam
+   do sensor (capture, layers) só carregam seus scripts, com um módulo
+   ydlidar vazio no lugar da extensão se ela não estiver instalada; convert,
+   stats, replay e catalog rodam de verdade sobre uma cópia de um CSV real
+   de data/. Um subcomando que falha conta como falha.
+
+Uso:
+    python3 check_import_budget.py            # sai com código 1 se algo estourar
+    python3 check_import_budget.py --runs 10
+"""
+import os
+import sys
+import glob
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+sys.path.insert(0, ROOT)
+import lidar_cli
+
+VERSION = "1.0"
+
+# Roda o subcomando (ou só carrega o script) e imprime os módulos pesados carregados
+PROBE = """
+import sys, json, contextlib, io, types, importlib.util
+sys.path.insert(0, {root!r})
+import lidar_cli
+comando, argv = {comando!r}, {argv!r}
+if comando in ('capture', 'layers') and importlib.util.find_spec('ydlidar') is None:
+    # Sem a extensão (máquina sem o SDK): os scripts só usam ydlidar com o sensor
+    stub = types.ModuleType('ydlidar')
+    stub.__getattr__ = lambda name: None
+    sys.modules['ydlidar'] = stub
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        if comando in ('capture', 'layers'):
+            lidar_cli.load_script({{'capture': lidar_cli.CAPTURE_SCRIPT, 'layers': lidar_cli.LAYERS_SCRIPT}}[comando])
+        else:
+            lidar_cli.main(([comando] if comando else []) + argv)
+    except SystemExit as e:
+        if e.code:  # só --help pode sair
+            raise
+pesados = sorted({{name.split('.')[0] for name in sys.modules}} & set({forbidden!r}))
+print(json.dumps(pesados))
+"""
+
+
+def import_time_ms(runs):
+    """Melhor tempo cumulativo de `import lidar_cli` em ms"""
+    best = None
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import lidar_cli"],
+                              cwd=ROOT, capture_output=True, text=True, check=True)
+        for line in proc.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == "lidar_cli":
+                ms = int(parts[1]) / 1000
+                best = ms if best is None else min(best, ms)
+    return best
+
+
+def loaded_modules(comando, argv, forbidden, cwd):
+    code = PROBE.format(root=ROOT, comando=comando, argv=argv, forbidden=list(forbidden))
+    proc = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{comando}: {proc.stderr.strip().splitlines()[-1:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="execuções para o tempo de importação")
+    args = parser.parse_args()
+    falhas = 0
+
+    ms = import_time_ms(args.runs)
+    ok = ms is not None and ms <= lidar_cli.IMPORT_BUDGET_MS
+    falhas += not ok
+    print(f"{'✅' if ok else '❌'} import lidar_cli: {ms:.1f} ms (orçamento {lidar_cli.IMPORT_BUDGET_MS:.0f} ms)")
+
+    tmpdir = tempfile.mkdtemp(prefix="x2l-budget-")
+    try:
+        csvs = sorted(glob.glob(os.path.join(ROOT, 'data', '*', '*.csv')))
+        csv_path = shutil.copy(csvs[0], tmpdir) if csvs else None
+        rec_path = os.path.splitext(csv_path)[0] + ".x2lrec" if csv_path else None
+        casos = [
+            (None, ["--help"]),
+            ("capture", None),
+            ("layers", None),
+            ("convert", [csv_path]),
+            ("stats", [csv_path, rec_path]),
+            ("replay", [rec_path]),
+            ("catalog", ["--root", tmpdir]),
+        ]
+        for comando, argv in casos:
+            forbidden = lidar_cli.HEADLESS_FORBIDDEN[comando]
+            nome = comando or "--help"
+            if argv is not None and None in argv:
+                print(f"⏭️  {nome}: sem CSV em data/")
+                continue
+            try:
+                pesados = loaded_modules(comando, argv, forbidden, tmpdir)
+            except RuntimeError as e:
+                print(f"❌ {e}")
+                falhas += 1
+                continue
+            falhas += bool(pesados)
+            print(f"{'❌' if pesados else '✅'} {nome}: " + (f"carregou {', '.join(pesados)}" if pesados
+                                                          else f"sem {', '.join(forbidden)}"))
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
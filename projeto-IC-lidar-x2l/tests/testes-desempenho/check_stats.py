@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Verifica lidar_stats contra o numpy
+
+1. Momentos (média, variância, min, max) por grupo iguais aos do numpy,
+   acumulando em lotes e combinando metades com merge().
+2. Quantis do QuantileSketch a no máximo relative_accuracy do exato e
+   dentro de [min, max]; num fluxo constante todos os quantis são o valor.
+3. to_dict()/from_dict() preserva o sketch.
+
+Uso:
+    python3 check_stats.py     # sai com código 1 se algo falhar
+"""
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+sys.path.insert(0, ROOT)
+from lidar_stats import Moments, QuantileSketch
+
+VERSION = "1.0"
+
+QUANTIS = (0.0, 0.01, 0.25, 0.5, 0.9, 0.99, 1.0)
+
+
+def check(nome, ok, detalhe=""):
+    print(f"{'✅' if ok else '❌'} {nome}" + (f": {detalhe}" if detalhe and not ok else ""))
+    return not ok
+
+
+def main():
+    rng = np.random.default_rng(1)
+    falhas = 0
+
+    valores = rng.gamma(2, 1.5, 200_000)
+    grupos = rng.integers(0, 7, len(valores))
+    momentos = Moments(7)
+    for lote in np.array_split(np.arange(len(valores)), 37):
+        momentos.update(valores[lote], grupos[lote])
+    esperado = [valores[grupos == k] for k in range(7)]
+    falhas += check("momentos por grupo", all(
+        momentos.count[k] == len(ref) and np.isclose(momentos.mean[k], ref.mean(), rtol=1e-12)
+        and np.isclose(momentos.variance()[k], ref.var(), rtol=1e-10)
+        and momentos.min[k] == ref.min() and momentos.max[k] == ref.max()
+        for k, ref in enumerate(esperado)))
+    metade = Moments(7).update(valores[:1000], grupos[:1000]).merge(Moments(7).update(valores[1000:], grupos[1000:]))
+    falhas += check("merge de momentos", np.allclose(metade.mean, momentos.mean) and np.allclose(metade.m2, momentos.m2))
+
+    for nome, dados in (("sketch gamma", np.concatenate([valores, -valores[:100], np.zeros(10)])),
+                        ("sketch uniforme 0.5-5 m", rng.uniform(0.5, 5.0, 100_000)),
+                        ("sketch constante 1.5 m", np.full(1000, 1.5))):
+        sketch = QuantileSketch()
+        for lote in np.array_split(dados, 10):
+            sketch = sketch.merge(QuantileSketch().update(lote))
+        obtidos = sketch.quantiles(QUANTIS)
+        exatos = np.quantile(dados, QUANTIS, method='lower')
+        erro = np.abs(obtidos - exatos) <= sketch.relative_accuracy * np.abs(exatos) + 1e-12
+        faixa = (obtidos >= dados.min()) & (obtidos <= dados.max())
+        extremos = obtidos[0] == dados.min() and obtidos[-1] == dados.max()
+        falhas += check(nome, erro.all() and faixa.all() and extremos, f"{obtidos} != {exatos}")
+
+    copia = QuantileSketch.from_dict(sketch.to_dict())
+    falhas += check("to_dict/from_dict", np.array_equal(copia.quantiles(QUANTIS), sketch.quantiles(QUANTIS)))
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,54 +1,37 @@
 #!/usr/bin/env python3
 import time
 import pandas as pd
-import numpy as np
 from datetime import datetime
 import os
+import sys
 import logging
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from lidar_capture import concat_revolutions, count_points
+from lidar_simulation import ScanSimulator
+from lidar_fusion import AngleBinFusion, fusion_summary
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def simular_scan_circular(altura, num_pontos=360, raio_min=0.5, raio_max=5.0):
-    """Simula um scan circular do LiDAR com obstáculos aleatórios"""
-    pontos = []
-    
-    for i in range(num_pontos):
-        angulo = i  # 0 a 359 graus
-        # Simula distâncias variadas com alguns obstáculos
-        distancia = np.random.uniform(raio_min, raio_max)
-        
-        # Adiciona alguns "obstáculos" em ângulos específicos
-        if 45 <= angulo <= 55 or 135 <= angulo <= 145:
-            distancia = np.random.uniform(raio_min, raio_min + 1.0)
-        elif 225 <= angulo <= 235 or 315 <= angulo <= 325:
-            distancia = np.random.uniform(raio_max - 1.0, raio_max)
-        
-        pontos.append({
-            'altura': altura,
-            'angulo': angulo,
-            'distancia': distancia,
-            'x': distancia * np.cos(np.radians(angulo)),
-            'y': distancia * np.sin(np.radians(angulo)),
-            'z': altura
-        })
-    
-    return pontos
+# Cena sintética (sala + jarro + coluna) com ruído do X2L
+SIMULADOR = ScanSimulator()
+FUSAO = AngleBinFusion()
 
 def coletar_camada_simulada(altura, num_scans=5):
-    """Simula coleta de dados de uma única camada"""
-    pontos_camada = []
-    
+    """Simula coleta de dados de uma única camada, fundindo as revoluções por faixa angular"""
     logger.info(f"Coletando camada na altura {altura}m...")
     input(f"[SIMULAÇÃO] Posicione o LiDAR na altura {altura}m e pressione ENTER para iniciar a varredura...")
     
+    revolucoes = []
     for i in range(num_scans):
         logger.info(f"  Scan {i+1}/{num_scans}...")
-        pontos = simular_scan_circular(altura)
-        pontos_camada.extend(pontos)
+        revolucoes.append(SIMULADOR.revolution(altura))
         time.sleep(0.2)
     
-    logger.info(f"Camada {altura}m: {num_scans}/{num_scans} scans válidos, {len(pontos_camada)} pontos")
+    pontos_camada = FUSAO.fuse_revolutions(revolucoes, altura=altura)
+    logger.info(f"  Fusão: {fusion_summary(pontos_camada)}")
+    logger.info(f"Camada {altura}m: {num_scans}/{num_scans} scans válidos, {count_points(pontos_camada)} pontos")
     return pontos_camada
 
 def test_lidar_camadas_simulado():
@@ -78,12 +61,9 @@ def test_lidar_camadas_simulado():
         time.sleep(0.5)
         
         # Coletar todas as camadas
-        todos_pontos = []
-        for altura in alturas:
-            pontos = coletar_camada_simulada(altura)
-            todos_pontos.extend(pontos)
+        todos_pontos = concat_revolutions([coletar_camada_simulada(altura) for altura in alturas])
         
-        logger.info(f"Coleta finalizada: {len(todos_pontos)} pontos totais")
+        logger.info(f"Coleta finalizada: {count_points(todos_pontos)} pontos totais")
         
         # Salvar dados
         if todos_pontos:
@@ -123,13 +103,13 @@ def salvar_pontos_camadas(pontos_data, altura_inicial, altura_final, intervalo):
         os.makedirs(data_dir, exist_ok=True)
         filepath = os.path.join(data_dir, filename)
         
-        df = pd.DataFrame(pontos_data, columns=['altura', 'angulo', 'distancia', 'x', 'y', 'z'])
+        df = pd.DataFrame({col: pontos_data[col] for col in ['altura', 'angulo', 'distancia', 'x', 'y', 'z', 'variancia', 'amostras']})
         df.to_csv(filepath, index=False)
         
         if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
             raise IOError("Erro ao criar arquivo")
         
-        logger.info(f"Arquivo salvo: {len(pontos_data)} pontos, {os.path.getsize(filepath)} bytes")
+        logger.info(f"Arquivo salvo: {count_points(pontos_data)} pontos, {os.path.getsize(filepath)} bytes")
         return filepath
         
     except Exception as e:
@@ -2,19 +2,23 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider
-import pandas as pd
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+from lidar_pointcloud import load_point_cloud
 
 class LayerAnalyzer:
     def __init__(self, csv_file=None):
         self.data = None
-        self.layers = {}
+        self.layers = None
         if csv_file:
             self.load_data(csv_file)
     
     def load_data(self, csv_file):
-        """Carregar dados de varredura por camadas"""
+        """Carregar dados de varredura por camadas (cache mapeado em memória)"""
         try:
-            self.data = pd.read_csv(csv_file)
+            self.data = load_point_cloud(csv_file)
             self.organize_layers()
             print(f"Carregados {len(self.data)} pontos de {len(self.layers)} camadas")
         except Exception as e:
@@ -25,12 +29,8 @@ class LayerAnalyzer:
         if self.data is None:
             return
         
-        # Agrupar por altura (arredondada para 0.5cm)
-        self.data['HeightLayer'] = (self.data['Height'] // 0.5) * 0.5
-        
-        for height in self.data['HeightLayer'].unique():
-            layer_data = self.data[self.data['HeightLayer'] == height]
-            self.layers[height] = layer_data
+        # Agrupar por altura (arredondada para 0.5cm): índice ordenado, views por camada
+        self.layers = self.data.layers('Height', quantum=0.5)
     
     def create_interactive_viewer(self):
         """Criar visualizador interativo de camadas"""
@@ -49,7 +49,7 @@ class LayerAnalyzer:
         
         # Slider para seleção de camada
         ax_slider = plt.axes([0.2, 0.05, 0.5, 0.03])
-        height_range = [min(self.layers.keys()), max(self.layers.keys())]
+        height_range = [float(self.layers.heights[0]), float(self.layers.heights[-1])]
         slider = Slider(ax_slider, 'Altura (cm)', height_range[0], height_range[1], 
                        valinit=height_range[0], valfmt='%.1f')
         
@@ -57,10 +57,9 @@ class LayerAnalyzer:
             """Atualizar visualização para altura selecionada"""
             height = round(height * 2) / 2  # Arredondar para 0.5
             
-            if height not in self.layers:
-                return
-            
-            layer = self.layers[height]
+            i = self.layers.index.find(height)
+            height = float(self.layers.heights[i])
+            layer = self.layers.layer(i)
             
             # Limpar eixos
             for ax in [ax_layer, ax_3d, ax_profile, ax_stats]:
@@ -79,24 +78,19 @@ class LayerAnalyzer:
                 # Ordenar pontos por ângulo para criar contorno
                 angles = np.arctan2(layer['Y'], layer['X'])
                 sorted_indices = np.argsort(angles)
-                x_sorted = layer['X'].iloc[sorted_indices]
-                y_sorted = layer['Y'].iloc[sorted_indices]
+                x_sorted = layer['X'][sorted_indices]
+                y_sorted = layer['Y'][sorted_indices]
                 
                 ax_layer.plot(x_sorted, y_sorted, 'b-', alpha=0.5, linewidth=2)
             
             # 2. Vista 3D (simulada com cores)
-            all_heights = []
-            all_x = []
-            all_y = []
-            
-            for h in sorted(self.layers.keys()):
-                if abs(h - height) <= 5:  # Mostrar camadas próximas
-                    layer_data = self.layers[h]
-                    all_x.extend(layer_data['X'])
-                    all_y.extend(layer_data['Y'])
-                    all_heights.extend([h] * len(layer_data))
+            # Camadas próximas são contíguas no índice: uma única view
+            proximas = self.layers.between(height - 5, height + 5)
+            all_x = proximas['X']
+            all_y = proximas['Y']
+            all_heights = np.floor(proximas['Height'] / 0.5) * 0.5
             
-            if all_heights:
+            if len(all_heights):
                 scatter = ax_3d.scatter(all_x, all_y, c=all_heights, cmap='viridis', s=5, alpha=0.7)
                 ax_3d.set_title('Vista 3D (±5cm da camada atual)')
                 ax_3d.set_xlabel('X (m)')
@@ -112,7 +106,7 @@ class LayerAnalyzer:
                 
                 # Ordenar por ângulo
                 sorted_idx = np.argsort(angles_deg)
-                ax_profile.plot(angles_deg[sorted_idx], distances.iloc[sorted_idx], 'g-o', markersize=3)
+                ax_profile.plot(angles_deg[sorted_idx], distances[sorted_idx], 'g-o', markersize=3)
                 ax_profile.set_title(f'Perfil Radial - Camada {height}cm')
                 ax_profile.set_xlabel('Ângulo (graus)')
                 ax_profile.set_ylabel('Distância do centro (m)')
@@ -154,7 +148,7 @@ Coordenadas Y:
         slider.on_changed(update_display)
         
         # Mostrar primeira camada
-        update_display(min(self.layers.keys()))
+        update_display(float(self.layers.heights[0]))
         
         plt.suptitle('Analisador de Camadas - Varredura 3D', fontsize=14)
         plt.show()
@@ -1,32 +1,48 @@
 #!/usr/bin/env python3
 import numpy as np
 import matplotlib.pyplot as plt
-import matplotlib.animation as animation
 from matplotlib.widgets import Slider, Button
+import os
+import sys
 import time
 import threading
 import queue
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+from lidar_live_plot import PointHistory, BlitManager, grow_limits
+
+# Pontos mantidos na vista superior (histórico dizimado): limita o custo por quadro
+HISTORY_CAPACITY = 20000
+
 class RealtimeScanner:
     def __init__(self):
         self.fig, self.axes = plt.subplots(2, 2, figsize=(15, 10))
         self.data_queue = queue.Queue()
         self.scanning = False
-        self.point_cloud = []
+        self.point_cloud = []  # blocos (N x 6) recebidos, só para salvar
         self.current_height = 0
-        self.height_layers = {}
+        self.height_layers = {}  # altura -> lista de blocos (N x 6)
+        self.layer_sums = {}  # altura -> [soma das distâncias, pontos]
+        self.total_points = 0
+        self.history = PointHistory(HISTORY_CAPACITY, fields=3)
         
         # Configurar subplots
         self.setup_plots()
         self.setup_controls()
         
+        # Artistas persistentes redesenhados por blit
+        self.blit = BlitManager(self.fig.canvas, [
+            self.scatter_polar, self.scatter_top, self.scatter_layer, self.profile_line,
+            self.ax_polar.title, self.ax_top.title, self.ax_layer.title,
+        ])
+        
     def setup_plots(self):
         """Configurar os 4 painéis de visualização"""
         # Painel 1: Vista em tempo real (polar)
         self.ax_polar = plt.subplot(2, 2, 1, projection='polar')
         self.ax_polar.set_title('Varredura em Tempo Real')
-        self.ax_polar.set_ylim(0, 1.0)
-        self.scatter_polar = self.ax_polar.scatter([], [], c='red', s=2)
+        self.ax_polar.set_ylim(0.4, 0.6)
+        self.scatter_polar = self.ax_polar.scatter([], [], c='red', s=3)
         
         # Painel 2: Vista superior completa
         self.ax_top = self.axes[0, 1]
@@ -35,6 +51,10 @@ class RealtimeScanner:
         self.ax_top.set_ylabel('Y (m)')
         self.ax_top.grid(True, alpha=0.3)
         self.ax_top.set_aspect('equal')
+        self.ax_top.set_xlim(-0.6, 0.6)
+        self.ax_top.set_ylim(-0.6, 0.6)
+        self.scatter_top = self.ax_top.scatter(np.empty(0), np.empty(0), c=np.empty(0), cmap='viridis',
+                                               vmin=0, vmax=50, s=1, marker='s', linewidths=0)
         
         # Painel 3: Camada atual
         self.ax_layer = self.axes[1, 0]
@@ -43,13 +63,19 @@ class RealtimeScanner:
         self.ax_layer.set_ylabel('Y (m)')
         self.ax_layer.grid(True, alpha=0.3)
         self.ax_layer.set_aspect('equal')
+        self.ax_layer.set_xlim(-0.6, 0.6)
+        self.ax_layer.set_ylim(-0.6, 0.6)
+        self.scatter_layer = self.ax_layer.scatter([], [], c='orange', s=5)
         
         # Painel 4: Perfil vertical
         self.ax_profile = self.axes[1, 1]
-        self.ax_profile.set_title('Perfil Vertical')
-        self.ax_profile.set_xlabel('Distância (m)')
+        self.ax_profile.set_title('Perfil Vertical do Jarro')
+        self.ax_profile.set_xlabel('Distância Média (m)')
         self.ax_profile.set_ylabel('Altura (cm)')
         self.ax_profile.grid(True, alpha=0.3)
+        self.ax_profile.set_xlim(0.5, 0.6)
+        self.ax_profile.set_ylim(0, 50)
+        self.profile_line, = self.ax_profile.plot([], [], 'b-o', markersize=3)
         
     def setup_controls(self):
         """Configurar controles interativos"""
@@ -101,7 +127,7 @@ class RealtimeScanner:
                 z = height / 100.0  # Converter cm para metros
                 points.append([x, y, z, distance, angle, height])
             
-            self.data_queue.put(points)
+            self.data_queue.put(np.array(points))
             
             # Incrementar altura automaticamente
             self.current_height += 0.5
@@ -110,85 +136,75 @@ class RealtimeScanner:
                 
             time.sleep(0.1)
     
-    def update_plots(self, frame):
-        """Atualizar plots em tempo real"""
+    def update_plots(self, frame=None):
+        """Atualizar plots em tempo real (custo por quadro constante)"""
+        latest = None
         try:
-            while not self.data_queue.empty():
+            while True:
                 new_points = self.data_queue.get_nowait()
-                self.point_cloud.extend(new_points)
-                
-                # Organizar por camadas
-                for point in new_points:
-                    height_key = round(point[5], 1)  # Altura em cm agora é índice 5
-                    if height_key not in self.height_layers:
-                        self.height_layers[height_key] = []
-                    self.height_layers[height_key].append(point)
-                
-                # Atualizar vista polar (últimos pontos)
-                if new_points:
-                    angles = [p[4] for p in new_points]  # Ângulo agora é índice 4
-                    distances = [p[3] for p in new_points]  # Distância agora é índice 3
-                    self.ax_polar.clear()
-                    self.ax_polar.scatter(angles, distances, c='red', s=3)
-                    self.ax_polar.set_title(f'Tempo Real - Altura: {self.current_height:.1f}cm')
-                    self.ax_polar.set_ylim(0.4, 0.6)
-                
-                # Atualizar vista superior (todas as camadas)
-                if self.point_cloud:
-                    all_x = [p[0] for p in self.point_cloud]
-                    all_y = [p[1] for p in self.point_cloud]
-                    heights = [p[5] for p in self.point_cloud]  # Altura em cm agora é índice 5
-                    
-                    self.ax_top.clear()
-                    scatter = self.ax_top.scatter(all_x, all_y, c=heights, cmap='viridis', s=1, alpha=0.7)
-                    self.ax_top.set_title(f'Vista Superior - {len(self.point_cloud)} pontos')
-                    self.ax_top.set_xlabel('X (m)')
-                    self.ax_top.set_ylabel('Y (m)')
-                    self.ax_top.grid(True, alpha=0.3)
-                    self.ax_top.set_aspect('equal')
-                
-                # Atualizar perfil vertical
-                if len(self.height_layers) > 1:
-                    heights = list(self.height_layers.keys())
-                    avg_distances = []
-                    for h in heights:
-                        distances = [p[3] for p in self.height_layers[h]]  # Distância agora é índice 3
-                        avg_distances.append(np.mean(distances))
-                    
-                    self.ax_profile.clear()
-                    self.ax_profile.plot(avg_distances, heights, 'b-o', markersize=3)
-                    self.ax_profile.set_title('Perfil Vertical do Jarro')
-                    self.ax_profile.set_xlabel('Distância Média (m)')
-                    self.ax_profile.set_ylabel('Altura (cm)')
-                    self.ax_profile.grid(True, alpha=0.3)
-        
+                self.add_points(new_points)
+                latest = new_points
         except queue.Empty:
             pass
         
-        return []
+        if latest is None:
+            return
+        
+        # Vista polar: só a última revolução
+        self.scatter_polar.set_offsets(latest[:, [4, 3]])  # Ângulo, Distância
+        self.ax_polar.set_title(f'Tempo Real - Altura: {self.current_height:.1f}cm')
+        
+        # Vista superior: histórico limitado e dizimado de todas as camadas
+        history = self.history.view()
+        self.scatter_top.set_offsets(history[:, :2])
+        self.scatter_top.set_array(history[:, 2])
+        self.ax_top.set_title(f'Vista Superior - {self.total_points} pontos')
+        redraw = grow_limits(self.ax_top, latest[:, 0], latest[:, 1])
+        
+        # Perfil vertical a partir das somas acumuladas por camada
+        if len(self.layer_sums) > 1:
+            heights = sorted(self.layer_sums)
+            avg_distances = [self.layer_sums[h][0] / self.layer_sums[h][1] for h in heights]
+            self.profile_line.set_data(avg_distances, heights)
+            redraw |= grow_limits(self.ax_profile, avg_distances, heights)
+        
+        if redraw:
+            self.blit.redraw()
+        else:
+            self.blit.update()
+    
+    def add_points(self, new_points):
+        """Acumular um bloco (N x 6): camadas, somas do perfil e histórico"""
+        self.point_cloud.append(new_points)
+        self.total_points += len(new_points)
+        self.history.extend(new_points[:, [0, 1, 5]])  # X, Y, Altura (cm)
+        
+        # Organizar por camadas
+        height_keys = np.round(new_points[:, 5], 1)  # Altura em cm é índice 5
+        for height_key in np.unique(height_keys):
+            layer_points = new_points[height_keys == height_key]
+            height_key = float(height_key)
+            self.height_layers.setdefault(height_key, []).append(layer_points)
+            sums = self.layer_sums.setdefault(height_key, [0.0, 0])
+            sums[0] += float(layer_points[:, 3].sum())  # Distância é índice 3
+            sums[1] += len(layer_points)
     
     def update_layer(self, val):
         """Atualizar visualização da camada selecionada"""
         selected_height = round(self.height_slider.val, 1)
         
         if selected_height in self.height_layers:
-            layer_points = self.height_layers[selected_height]
-            x_coords = [p[0] for p in layer_points]
-            y_coords = [p[1] for p in layer_points]
-            
-            self.ax_layer.clear()
-            self.ax_layer.scatter(x_coords, y_coords, c='orange', s=5)
+            layer_points = np.concatenate(self.height_layers[selected_height])
+            self.scatter_layer.set_offsets(layer_points[:, :2])
             self.ax_layer.set_title(f'Camada: {selected_height}cm - {len(layer_points)} pontos')
-            self.ax_layer.set_xlabel('X (m)')
-            self.ax_layer.set_ylabel('Y (m)')
-            self.ax_layer.grid(True, alpha=0.3)
-            self.ax_layer.set_aspect('equal')
+            if grow_limits(self.ax_layer, layer_points[:, 0], layer_points[:, 1]):
+                self.blit.redraw()
+                return
         else:
-            self.ax_layer.clear()
+            self.scatter_layer.set_offsets(np.empty((0, 2)))
             self.ax_layer.set_title(f'Camada: {selected_height}cm - Sem dados')
-            self.ax_layer.grid(True, alpha=0.3)
         
-        plt.draw()
+        self.blit.update()
     
     def start_scan(self, event):
         """Iniciar varredura"""
@@ -215,19 +231,23 @@ class RealtimeScanner:
                 writer = csv.writer(file)
                 writer.writerow(['X', 'Y', 'Z', 'Distance', 'Angle', 'Height_cm', 'Layer'])
                 
-                for point in self.point_cloud:
-                    x, y, z, distance, angle, height = point
-                    layer = int(height / 0.5)  # Número da camada
-                    writer.writerow([x, y, z, distance, angle, height, layer])
+                cloud = np.concatenate(self.point_cloud)
+                layers = (cloud[:, 5] / 0.5).astype(int)  # Número da camada
+                for point, layer in zip(cloud.tolist(), layers.tolist()):
+                    writer.writerow([*point, layer])
             
             print(f"Nuvem de pontos 3D salva: {filename}")
-            print(f"Pontos: {len(self.point_cloud)}")
+            print(f"Pontos: {len(cloud)}")
             print(f"Camadas: {len(self.height_layers)}")
-            print(f"Altura: {max([p[5] for p in self.point_cloud]):.1f}cm")
+            print(f"Altura: {cloud[:, 5].max():.1f}cm")
     
     def run(self):
         """Executar scanner em tempo real"""
-        ani = animation.FuncAnimation(self.fig, self.update_plots, interval=100, blit=False)
+        # Timer próprio em vez de FuncAnimation: o BlitManager decide entre
+        # blit (quadro normal) e redesenho completo (limites mudaram)
+        self.timer = self.fig.canvas.new_timer(interval=100)
+        self.timer.add_callback(self.update_plots)
+        self.timer.start()
         plt.show()
 
 if __name__ == "__main__":
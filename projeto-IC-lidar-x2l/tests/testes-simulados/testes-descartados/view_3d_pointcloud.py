@@ -3,6 +3,11 @@ import pandas as pd
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 import numpy as np
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+from lidar_pointcloud import LayeredColumns
 
 def load_and_view_3d(csv_file):
     """Carregar e visualizar nuvem de pontos"""
@@ -43,15 +48,10 @@ def load_and_view_3d(csv_file):
         
         # Perfil por camadas
         ax4 = fig.add_subplot(2, 2, 4)
-        layers = data.groupby('Layer')
-        layer_heights = []
-        avg_radius = []
-        
-        for layer_num, layer_data in layers:
-            height = layer_data['Height'].mean()
-            radius = (layer_data['Distance'] - 0.5).mean()  # Subtrair distância base
-            layer_heights.append(height)
-            avg_radius.append(radius)
+        camadas = LayeredColumns.from_columns(
+            {col: data[col].to_numpy() for col in ['Layer', 'Height', 'Distance']}, column='Layer')
+        layer_heights = camadas.mean('Height')
+        avg_radius = camadas.mean('Distance') - 0.5  # Subtrair distância base
         
         ax4.plot(avg_radius, layer_heights, 'ro-', markersize=4)
         ax4.set_title('Perfil do Jarro (Raio vs Altura)')
@@ -69,8 +69,8 @@ def load_and_view_3d(csv_file):
         print(f"  Y: {data['Y'].min():.3f} a {data['Y'].max():.3f}m") 
         print(f"  Z: {data['Z'].min():.3f} a {data['Z'].max():.3f}m")
         print(f"Altura total: {data['Height'].max():.1f}cm")
-        print(f"Camadas: {data['Layer'].nunique()}")
-        print(f"Pontos por camada: {len(data) // data['Layer'].nunique():.0f}")
+        print(f"Camadas: {len(camadas)}")
+        print(f"Pontos por camada: {len(data) // len(camadas):.0f}")
         
     except Exception as e:
         print(f"Erro: {e}")
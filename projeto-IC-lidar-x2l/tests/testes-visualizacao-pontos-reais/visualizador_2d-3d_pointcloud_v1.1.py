@@ -2,6 +2,10 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from lidar_pointcloud import valid_points_mask
 # from mpl_toolkits.mplot3d import Axes3D
 # import numpy as np
 
@@ -9,23 +13,15 @@ import os
 VERSION = "1.1"
 
 def filter_invalid_points(data):
-    """Filtrar pontos inválidos"""
-    original_count = len(data)
-    
-    if 'Distance' in data.columns:
-        data = data[data['Distance'] > 0.01]
-    
-    data = data.dropna(subset=['X', 'Y'])
-    data = data[~data['X'].isin([float('inf'), float('-inf')])]
-    data = data[~data['Y'].isin([float('inf'), float('-inf')])]
-    
-    if 'Distance' in data.columns:
-        q99 = data['Distance'].quantile(0.99)
-        data = data[data['Distance'] <= q99 * 1.5]
+    """Filtrar pontos inválidos (máscara única, uma cópia)"""
+    colunas = {col: data[col].to_numpy() for col in ['X', 'Y', 'Distance'] if col in data.columns}
+    mask, counts = valid_points_mask(colunas)
     
-    filtered_count = original_count - len(data)
+    filtered_count = counts['total'] - counts['valid']
     if filtered_count > 0:
-        print(f"⚠️  Filtrados {filtered_count} pontos inválidos ({filtered_count/original_count*100:.1f}%)")
+        data = data[mask]
+        print(f"⚠️  Filtrados {filtered_count} pontos inválidos ({filtered_count/counts['total']*100:.1f}%)")
+        print(f"   distância mínima: {counts['min_range']} | não finitos: {counts['non_finite']} | acima do percentil: {counts['percentile']}")
     
     return data
 
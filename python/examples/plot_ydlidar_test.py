@@ -31,25 +31,24 @@ laser.setlidaropt(ydlidar.LidarPropSampleRate, 9);
 laser.setlidaropt(ydlidar.LidarPropSingleChannel, False);
 scan = ydlidar.LaserScan()
 
+# Persistent artist: each frame only replaces its offsets/colors and is blitted
+scatter = lidar_polar.scatter(np.empty(0), np.empty(0), c=np.empty(0), cmap='hsv', alpha=0.95, animated=True)
+
 def animate(num):
     
     r = laser.doProcessSimple(scan);
     if r:
-        angle = []
-        ran = []
-        intensity = []
-        for point in scan.points:
-            angle.append(point.angle);
-            ran.append(point.range);
-            intensity.append(point.intensity);
-        lidar_polar.clear()
-        lidar_polar.scatter(angle, ran, c=intensity, cmap='hsv', alpha=0.95)
+        points = scan.points_array()
+        scatter.set_offsets(np.column_stack((points['angle'], points['range'])))
+        scatter.set_array(points['intensity'])
+        scatter.autoscale()
+    return scatter,
 
 ret = laser.initialize();
 if ret:
     ret = laser.turnOn();
     if ret:
-        ani = animation.FuncAnimation(fig, animate, interval=50)
+        ani = animation.FuncAnimation(fig, animate, interval=50, blit=True, cache_frame_data=False)
         plt.show()
     laser.turnOff();
 laser.disconnecting();
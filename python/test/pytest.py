@@ -1,4 +1,5 @@
 import unittest
+import numpy
 import ydlidar
 
 
@@ -35,5 +36,29 @@ class PyTestTestCase(unittest.TestCase):
     self.assertTrue(ret);
     self.assertEqual(intensity, quality);
 
+  def testPointsArrayIsWrappedCorrectly(self):
+    print("test points array.......")
+    scan = ydlidar.LaserScan();
+    points = scan.points_array();
+    self.assertEqual(0, len(points));
+    self.assertEqual(('angle', 'range', 'intensity'), points.dtype.names);
+    self.assertEqual(12, points.dtype.itemsize);
+    self.assertEqual(0, len(scan.stamps_array()));
+  def testBatchFiltersAreWrappedCorrectly(self):
+    print("test batch filters.......")
+    angle = numpy.linspace(-numpy.pi, numpy.pi, 360, endpoint=False).astype(numpy.float32);
+    ranges = numpy.full(360, 2.0, dtype=numpy.float32);
+    ranges[10] = 0.0;
+    mask = ydlidar.noise_filter(angle, ranges, range_min=0.1, range_max=10.0, return_mask=True);
+    self.assertEqual((360,), mask.shape);
+    self.assertFalse(mask[10]);
+    a, r, i = ydlidar.strong_light_filter(angle, ranges);
+    self.assertEqual(len(a), len(r));
+    self.assertTrue((r > 0).all());
+    batch = ydlidar.noise_filter(numpy.stack([angle, angle]), numpy.stack([ranges, ranges]),
+                                 counts=[360, 100], return_mask=True);
+    self.assertEqual((2, 360), batch.shape);
+    self.assertFalse(batch[1, 100:].any());
+
 if __name__ == "__main__":
   unittest.main()
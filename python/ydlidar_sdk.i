@@ -1,4 +1,6 @@
-%module ydlidar
+%module(threads="1") ydlidar
+// Only calls that block on the device release the GIL (see %thread below).
+%nothread;
 %include "std_string.i"
 %include "std_vector.i"
 %include "std_map.i"
@@ -13,6 +15,14 @@
 #include "../core/base/typedef.h"
 #include "../core/common/ydlidar_datatype.h"
 #include "../core/common/ydlidar_def.h"
+#include "../src/filters/NoiseFilter.h"
+#include "../src/filters/StrongLightFilter.h"
+%}
+
+%include "numpy.i"
+
+%init %{
+  import_array();
 %}
 
 %define YDLIDAR_API
@@ -56,6 +66,69 @@ public:
   }
 }
 
+%extend LaserScan {
+public:
+  /**
+   * Structured (angle, range, intensity) float32 view over the points
+   * buffer. No copy is made: the view is only valid until the next
+   * doProcessSimple() on this scan.
+   */
+  PyObject *_points_view(PyObject *owner) {
+    PyArray_Descr *descr = NULL;
+    PyObject *spec = Py_BuildValue("[(s,s),(s,s),(s,s)]",
+                                   "angle", "<f4",
+                                   "range", "<f4",
+                                   "intensity", "<f4");
+    if (!spec || !PyArray_DescrConverter(spec, &descr)) {
+      Py_XDECREF(spec);
+      return NULL;
+    }
+    Py_DECREF(spec);
+
+    npy_intp dims[1] = {(npy_intp)$self->points.size()};
+    void *data = $self->points.empty() ? NULL : (void *)$self->points.data();
+    PyObject *array = PyArray_NewFromDescr(&PyArray_Type, descr, 1, dims,
+                                           NULL, data, NPY_ARRAY_CARRAY, NULL);
+    if (!array || !data) {
+      return array;
+    }
+    Py_INCREF(owner);
+    if (PyArray_SetBaseObject((PyArrayObject *)array, owner) < 0) {
+      Py_DECREF(array);
+      return NULL;
+    }
+    return array;
+  }
+
+  /**
+   * Per-point timestamps in nanoseconds:
+   * stamp + i * config.time_increment * 1e9
+   */
+  PyObject *stamps_array() {
+    npy_intp dims[1] = {(npy_intp)$self->points.size()};
+    PyObject *array = PyArray_SimpleNew(1, dims, NPY_UINT64);
+    if (!array) {
+      return NULL;
+    }
+    npy_uint64 *out = (npy_uint64 *)PyArray_DATA((PyArrayObject *)array);
+    double step = $self->config.time_increment * 1e9;
+    for (npy_intp i = 0; i < dims[0]; i++) {
+      out[i] = $self->stamp + (npy_uint64)(i * step + 0.5);
+    }
+    return array;
+  }
+
+%pythoncode %{
+  def points_array(self):
+      """Return points as a structured float32 array (angle, range, intensity).
+
+      The array shares memory with the scan; copy it before calling
+      doProcessSimple() again on the same LaserScan.
+      """
+      return self._points_view(self)
+%}
+}
+
 %apply int *OUTPUT { int *optval};
 %apply float *OUTPUT { float *optval};
 %apply bool *OUTPUT { bool *optval};
@@ -80,8 +153,173 @@ public:
   $1 = PyLong_AsUnsignedLong($input);
 }
 
+%thread CYdLidar::initialize;
+%thread CYdLidar::turnOn;
+%thread CYdLidar::doProcessSimple;
+%thread CYdLidar::turnOff;
+%thread CYdLidar::disconnecting;
+%thread CYdLidar::getDeviceInfo;
+%thread CYdLidar::ota;
+%thread lidarPortList;
+
 %include "../src/CYdLidar.h"
 %include "../core/base/typedef.h"
 %include "../core/common/ydlidar_datatype.h"
 %include "../core/common/ydlidar_def.h"
+%warnfilter(325) StrongLightFilter::Point;
+%include "../src/filters/FilterInterface.h"
+%include "../src/filters/NoiseFilter.h"
+%include "../src/filters/StrongLightFilter.h"
+
+%inline %{
+/**
+ * Run a filter over a batch of revolutions stored as zero-padded rows
+ * (rows x cols float32 angle/range, int64 point count per row) and
+ * return a rows x cols bool mask of the points the filter keeps.
+ * Each point is tagged with its index in the intensity field, which the
+ * filters copy through unchanged, so reordering filters still map back
+ * to their input. The GIL is released while filtering.
+ */
+PyObject *_filter_mask(FilterInterface *filter, PyObject *angle_obj,
+                       PyObject *range_obj, PyObject *counts_obj,
+                       float min_range, float max_range) {
+  PyArrayObject *angle = (PyArrayObject *)PyArray_FROMANY(
+      angle_obj, NPY_FLOAT32, 2, 2, NPY_ARRAY_IN_ARRAY);
+  PyArrayObject *range = (PyArrayObject *)PyArray_FROMANY(
+      range_obj, NPY_FLOAT32, 2, 2, NPY_ARRAY_IN_ARRAY);
+  PyArrayObject *counts = (PyArrayObject *)PyArray_FROMANY(
+      counts_obj, NPY_INT64, 1, 1, NPY_ARRAY_IN_ARRAY);
+  PyArrayObject *mask = NULL;
+
+  if (!angle || !range || !counts) {
+    goto done;
+  }
+  if (!PyArray_SAMESHAPE(angle, range) ||
+      PyArray_DIM(counts, 0) != PyArray_DIM(angle, 0)) {
+    PyErr_SetString(PyExc_ValueError,
+                    "angle/range must have the same shape and counts one entry per row");
+    goto done;
+  }
+
+  {
+    npy_intp rows = PyArray_DIM(angle, 0);
+    npy_intp cols = PyArray_DIM(angle, 1);
+    const float *a = (const float *)PyArray_DATA(angle);
+    const float *r = (const float *)PyArray_DATA(range);
+    const npy_int64 *n = (const npy_int64 *)PyArray_DATA(counts);
+
+    for (npy_intp row = 0; row < rows; row++) {
+      if (n[row] < 0 || n[row] > cols) {
+        PyErr_SetString(PyExc_ValueError, "point count out of range");
+        goto done;
+      }
+    }
+
+    mask = (PyArrayObject *)PyArray_ZEROS(2, PyArray_DIMS(angle), NPY_BOOL, 0);
+    if (!mask) {
+      goto done;
+    }
+    npy_bool *m = (npy_bool *)PyArray_DATA(mask);
+    bool failed = false;
+
+    Py_BEGIN_ALLOW_THREADS
+    try {
+      LaserScan in, out;
+      in.config.min_range = min_range;
+      in.config.max_range = max_range;
+      for (npy_intp row = 0; row < rows; row++) {
+        npy_intp size = (npy_intp)n[row];
+        in.points.resize(size);
+        for (npy_intp i = 0; i < size; i++) {
+          in.points[i].angle = a[row * cols + i];
+          in.points[i].range = r[row * cols + i];
+          in.points[i].intensity = (float)i;
+        }
+        filter->filter(in, 0, 0, out);
+        for (size_t k = 0; k < out.points.size(); k++) {
+          npy_intp i = (npy_intp)out.points[k].intensity;
+          if (out.points[k].range > 0 && i >= 0 && i < size) {
+            m[row * cols + i] = NPY_TRUE;
+          }
+        }
+      }
+    } catch (...) {
+      failed = true;
+    }
+    Py_END_ALLOW_THREADS
+
+    if (failed) {
+      PyErr_SetString(PyExc_RuntimeError, "filter failed");
+      Py_CLEAR(mask);
+    }
+  }
+
+done:
+  Py_XDECREF(angle);
+  Py_XDECREF(range);
+  Py_XDECREF(counts);
+  return (PyObject *)mask;
+}
+%}
+
+%pythoncode %{
+import numpy as _np
+
+
+def _filter_batch(filter, angle, range, intensity, counts, range_min, range_max, return_mask):
+    angle = _np.asarray(angle, dtype=_np.float32)
+    range = _np.asarray(range, dtype=_np.float32)
+    single = angle.ndim == 1
+    angle2 = _np.atleast_2d(angle)
+    range2 = _np.atleast_2d(range)
+    if counts is None:
+        counts = _np.full(angle2.shape[0], angle2.shape[1], dtype=_np.int64)
+    else:
+        counts = _np.atleast_1d(_np.asarray(counts, dtype=_np.int64))
+
+    mask = _filter_mask(filter, angle2, range2, counts, range_min, range_max)
+    if return_mask:
+        return mask[0] if single else mask
+
+    if intensity is None:
+        intensity = _np.zeros_like(angle)
+    intensity2 = _np.atleast_2d(_np.asarray(intensity, dtype=_np.float32))
+    result = []
+    for row, n in enumerate(counts):
+        keep = mask[row, :n]
+        result.append((angle2[row, :n][keep],
+                       range2[row, :n][keep],
+                       intensity2[row, :n][keep]))
+    return result[0] if single else result
+
+
+def noise_filter(angle, range, intensity=None, strategy=NoiseFilter.FS_Normal,
+                 range_min=0.0, range_max=float('inf'), counts=None, return_mask=False):
+    """Run NoiseFilter over one revolution (1-D arrays) or a batch (2-D rows).
+
+    Batches are zero-padded rows with the valid length of each row in
+    `counts`. Returns (angle, range, intensity) with the rejected points
+    removed (a list of them for a batch), or the boolean keep mask if
+    return_mask is True.
+    """
+    f = NoiseFilter()
+    f.setStrategy(strategy)
+    return _filter_batch(f, angle, range, intensity, counts, range_min, range_max, return_mask)
+
+
+def strong_light_filter(angle, range, intensity=None, strategy=StrongLightFilter.FS_2,
+                        max_dist=0.05, max_angle=12.0, min_noise=2,
+                        counts=None, return_mask=False):
+    """Run StrongLightFilter over one revolution or a batch; see noise_filter().
+
+    The filter drops zero ranges and sorts points by angle internally; the
+    mask and compacted output keep the input order.
+    """
+    f = StrongLightFilter()
+    f.setStrategy(strategy)
+    f.setMaxDist(max_dist)
+    f.setMaxAngle(max_angle)
+    f.setMinNoise(min_noise)
+    return _filter_batch(f, angle, range, intensity, counts, 0.0, float('inf'), return_mask)
+%}
 
@@ -76,6 +76,7 @@ setup(
     url='https://github.com/YDLIDAR/YDLidar-SDK',
     description='YDLIDAR python SDK',
     long_description='',
+    install_requires=['numpy'],
     ext_modules=[CMakeExtension('ydlidar')],
     cmdclass=dict(build_ext=CMakeBuild),
     zip_safe=False,